@@ -0,0 +1,108 @@
+"""
+nxtool startup benchmark.
+
+Times complete `nxtool` invocations, interpreter start included, the way shell
+prompts and scripts run them. Must be started from inside a workspace.
+
+- cold: every run starts from an empty bytecode cache, so nxtool and the
+  modules it imports are compiled from source (first run after an install)
+- warm: runs share a bytecode cache that was populated by a first, untimed run
+
+The startup target applies to warm runs.
+
+Usage:
+    python benchmarks/startup.py [--runs N] [--target-ms MS] [--json FILE]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from pathlib import Path
+
+COMMANDS: list[list[str]] = [
+    ["topdir"],
+    ["info", "project"],
+]
+
+def _run(args: list[str], env: dict[str, str]) -> float:
+    start: float = time.perf_counter()
+    subprocess.run(
+        [sys.executable, "-m", "nxtool"] + args,
+        env=env, stdout=subprocess.DEVNULL, check=True
+    )
+    return (time.perf_counter() - start) * 1000
+
+def measure(args: list[str], runs: int) -> dict[str, dict[str, float]]:
+    """
+    Time `nxtool <args>` cold and warm.
+
+    :return: min/median/max wall time in milliseconds for both modes.
+    """
+    env: dict[str, str] = dict(os.environ)
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    env["PYTHONPATH"] = os.pathsep.join(
+        [str(Path(__file__).resolve().parents[1])] + env.get("PYTHONPATH", "").split(os.pathsep)
+    ).rstrip(os.pathsep)
+
+    results: dict[str, list[float]] = {"cold": [], "warm": []}
+    for _ in range(runs):
+        with tempfile.TemporaryDirectory() as cache:
+            results["cold"].append(_run(args, env | {"PYTHONPYCACHEPREFIX": cache}))
+
+    with tempfile.TemporaryDirectory() as cache:
+        _run(args, env | {"PYTHONPYCACHEPREFIX": cache})
+        for _ in range(runs):
+            results["warm"].append(_run(args, env | {"PYTHONPYCACHEPREFIX": cache}))
+
+    return {
+        mode: {
+            "min": min(times),
+            "median": statistics.median(times),
+            "max": max(times),
+        }
+        for mode, times in results.items()
+    }
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10, help="runs per command and mode")
+    parser.add_argument("--target-ms", type=float, default=100.0, help="warm median target")
+    parser.add_argument("--json", type=Path, help="write results to this file")
+    args = parser.parse_args()
+
+    # Reference point, the interpreter alone
+    baseline: list[float] = []
+    for _ in range(args.runs):
+        start: float = time.perf_counter()
+        subprocess.run([sys.executable, "-c", "pass"], check=True)
+        baseline.append((time.perf_counter() - start) * 1000)
+
+    report: dict = {"python": statistics.median(baseline), "commands": {}}
+    print(f"{'python -c pass':<16} median {report['python']:6.1f} ms")
+
+    failed: bool = False
+    for cmd in COMMANDS:
+        name: str = " ".join(cmd)
+        res = measure(cmd, args.runs)
+        report["commands"][name] = res
+        for mode, t in res.items():
+            print(
+                f"{name:<16} {mode:<4} min {t['min']:6.1f} ms  "
+                f"median {t['median']:6.1f} ms  max {t['max']:6.1f} ms"
+            )
+        failed |= res["warm"]["median"] > args.target_ms
+
+    if args.json is not None:
+        args.json.write_text(json.dumps(report, indent=2), encoding="utf-8")
+
+    if failed is True:
+        print(f"warm median above the {args.target_ms:.0f} ms target")
+    return 1 if failed is True else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
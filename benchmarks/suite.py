@@ -0,0 +1,227 @@
+"""
+nxtool benchmark suite.
+
+Generates a synthetic workspace of every requested size (see synthetic.py)
+and measures nxtool's own overhead in it, offline and without a toolchain:
+
+- topdir: from the workspace root and from a defconfig directory
+- BoardsStore: cold, without an index, and warm, with an up to date index
+- ToolsStore: parse of tools/CMakeLists.txt
+- ProjectStore: load, and dump of a modified store
+- cli: complete nxtool invocations, interpreter start included, with the
+  cmake, make and git stand-ins first in PATH
+
+Results are saved as JSON. `--compare` prints the change of every median
+against an earlier result file, e.g. one taken with another nxtool version.
+
+Usage:
+    python benchmarks/suite.py [--sizes small,medium] [--runs N] [--json FILE] [--compare FILE]
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+from synthetic import SIZES, TreeSize, generate
+
+REPO: Path = Path(__file__).resolve().parents[1]
+sys.path.insert(0, f"{REPO}")
+
+# pylint: disable=wrong-import-position
+from nxtool.config.configuration import BoardsStore, ProjectStore, ToolsStore
+from nxtool.config.paths import PathsStore
+from nxtool.utils.topdir import topdir
+
+CLI_COMMANDS: list[list[str]] = [
+    ["topdir"],
+    ["info", "project"],
+    ["info", "projects"],
+    ["info", "boards"],
+    ["info", "tools"],
+    ["info", "configs", "--with", "NX_SYM_0"],
+    ["build"],
+]
+
+Stats = dict[str, float]
+
+def _stats(times: list[float]) -> Stats:
+    return {
+        "min": min(times),
+        "median": statistics.median(times),
+        "max": max(times),
+        "runs": len(times),
+    }
+
+def measure(
+    func: Callable[[], Any],
+    runs: int,
+    setup: Callable[[], Any] | None = None
+) -> Stats:
+    """
+    Time `func`, in milliseconds.
+
+    :param func: The code measured.
+    :type func: Callable[[], Any]
+    :param runs: Number of timed calls.
+    :type runs: int
+    :param setup: Run before every call, not timed.
+    :type setup: Callable[[], Any] | None
+    :return: min/median/max of the calls.
+    :rtype: Stats
+    """
+    times: list[float] = []
+    for _ in range(runs):
+        if setup is not None:
+            setup()
+        start: float = time.perf_counter()
+        func()
+        times.append((time.perf_counter() - start) * 1000)
+    return _stats(times)
+
+def bench_api(root: Path, runs: int) -> dict[str, Stats]:
+    """
+    Time the stores and helpers in process, from inside the workspace at `root`.
+    """
+    results: dict[str, Stats] = {}
+    cwd: Path = Path.cwd()
+    deep: Path = next((root / "nuttx" / "boards").glob("*/*/*/configs/*"))
+    try:
+        os.chdir(deep)
+        results["topdir deep"] = measure(lambda: topdir(Path(".nxtool")), runs)
+        os.chdir(root)
+        results["topdir root"] = measure(lambda: topdir(Path(".nxtool")), runs)
+        PathsStore.setup()
+
+        results["BoardsStore cold"] = measure(
+            lambda: BoardsStore().load(), runs,
+            setup=lambda: PathsStore.nxtool_boards_index.unlink(missing_ok=True)
+        )
+        BoardsStore().load()
+        results["BoardsStore warm"] = measure(lambda: BoardsStore().load(), runs)
+        results["ToolsStore"] = measure(ToolsStore, runs)
+        results["ProjectStore load"] = measure(ProjectStore, runs)
+
+        store: ProjectStore = ProjectStore()
+        count: list[int] = [0]
+
+        def modify() -> None:
+            assert store.current is not None
+            count[0] += 1
+            store.current.opts["compiler"] = f"cc-{count[0]}"
+
+        results["ProjectStore dump"] = measure(store.dump, runs, setup=modify)
+    finally:
+        os.chdir(cwd)
+    return results
+
+def bench_cli(root: Path, runs: int) -> dict[str, Stats]:
+    """
+    Time complete nxtool invocations in the workspace at `root`, after an
+    untimed run that populates the bytecode cache and the nxtool indexes.
+    """
+    env: dict[str, str] = dict(os.environ)
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    env["PATH"] = os.pathsep.join([f"{root / 'bin'}", env.get("PATH", "")])
+    env["PYTHONPATH"] = os.pathsep.join(
+        [f"{REPO}"] + env.get("PYTHONPATH", "").split(os.pathsep)
+    ).rstrip(os.pathsep)
+
+    def run(args: list[str]) -> None:
+        subprocess.run(
+            [sys.executable, "-m", "nxtool"] + args,
+            cwd=root, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            check=True
+        )
+
+    results: dict[str, Stats] = {}
+    with tempfile.TemporaryDirectory() as cache:
+        env["PYTHONPYCACHEPREFIX"] = cache
+        for args in CLI_COMMANDS:
+            run(args)
+            results[f"cli {' '.join(args)}"] = measure(lambda a=args: run(a), runs)
+    return results
+
+def _version() -> str:
+    try:
+        return subprocess.run(
+            ["git", "-C", f"{REPO}", "describe", "--always", "--dirty"],
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, check=True, text=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def compare(report: dict[str, Any], baseline: dict[str, Any]) -> None:
+    """
+    Print the change of every median against a baseline report.
+    """
+    print(f"\ncompared to {baseline.get('nxtool', 'unknown')}")
+    for size, data in report["sizes"].items():
+        old: dict[str, Stats] = baseline.get("sizes", {}).get(size, {}).get("results", {})
+        for name, stats in data["results"].items():
+            if name not in old or old[name]["median"] <= 0:
+                continue
+            ratio: float = stats["median"] / old[name]["median"]
+            print(
+                f"{size:<7} {name:<32} {old[name]['median']:9.2f} -> "
+                f"{stats['median']:9.2f} ms  {(ratio - 1) * 100:+6.1f}%"
+            )
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument("--sizes", default="small,medium", help=f"comma separated, of {', '.join(SIZES)}")
+    parser.add_argument("--runs", type=int, default=10, help="timed runs per benchmark")
+    parser.add_argument("--no-cli", action="store_true", help="skip the cli benchmarks")
+    parser.add_argument("--workdir", type=Path, help="where workspaces are generated, kept")
+    parser.add_argument("--json", type=Path, help="write results to this file")
+    parser.add_argument("--compare", type=Path, help="results of an earlier run")
+    args = parser.parse_args()
+
+    sizes: list[str] = [s for s in args.sizes.split(",") if s]
+    unknown: list[str] = [s for s in sizes if s not in SIZES]
+    if unknown:
+        parser.error(f"unknown sizes {', '.join(unknown)}")
+
+    report: dict[str, Any] = {
+        "nxtool": _version(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "time": int(time.time()),
+        "runs": args.runs,
+        "sizes": {},
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir: Path = args.workdir or Path(tmp)
+        for size in sizes:
+            tree: TreeSize = SIZES[size]
+            root: Path = workdir / size
+            configs: int = len(generate(root, tree))
+            print(f"{size}: {tree.boards} boards, {configs} configurations, "
+                  f"{tree.symbols} symbols, {tree.projects} projects")
+
+            results: dict[str, Stats] = bench_api(root, args.runs)
+            if args.no_cli is False:
+                results |= bench_cli(root, args.runs)
+            for name, t in results.items():
+                print(
+                    f"  {name:<32} min {t['min']:9.2f} ms  "
+                    f"median {t['median']:9.2f} ms  max {t['max']:9.2f} ms"
+                )
+            report["sizes"][size] = {"tree": vars(tree), "results": results}
+
+    if args.json is not None:
+        args.json.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    if args.compare is not None:
+        compare(report, json.loads(args.compare.read_text(encoding="utf-8")))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
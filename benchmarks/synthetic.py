@@ -0,0 +1,219 @@
+"""
+Synthetic nuttx workspace generator.
+
+Builds a workspace shaped like a real one, without the sources, so nxtool can
+be measured offline and without a toolchain:
+
+- nuttx/boards/<arch>/<chip>/<board>/configs/<config>/defconfig
+- nuttx/tools/CMakeLists.txt with the host tools
+- nuttx/Kconfig and apps/Kconfig declaring the symbols the defconfigs set
+- nuttx/.git and apps/.git with just a detached HEAD, enough for nxtool to
+  key its indexes on
+- .nxtool with the default config and a number of projects
+- bin/ with cmake, make and git stand-ins, put first in PATH by the suite
+
+The stand-ins log nothing and take no time: cmake and make write the files a
+build directory is expected to have (CMakeCache.txt, .config, nuttx), git
+answers the queries nxtool makes about a clean checkout.
+
+The same size and seed always give the same tree.
+
+Usage:
+    python benchmarks/synthetic.py DEST [--size small|medium|large] [--boards N] ...
+"""
+import argparse
+import random
+import shutil
+import stat
+import sys
+
+from dataclasses import dataclass
+from pathlib import Path
+
+ARCHS: tuple[str, ...] = ("arm", "arm64", "risc-v", "xtensa", "sim", "mips")
+
+# Fixed revision of the synthetic checkouts
+HEAD: str = "5eed" * 10
+
+@dataclass
+class TreeSize():
+    """
+    Size of a synthetic workspace.
+    """
+    boards: int
+    configs: int
+    symbols: int
+    tools: int
+    projects: int
+
+# Real trees have around 650 boards and 1700 configurations
+SIZES: dict[str, TreeSize] = {
+    "small": TreeSize(boards=20, configs=3, symbols=200, tools=10, projects=5),
+    "medium": TreeSize(boards=200, configs=4, symbols=1000, tools=20, projects=20),
+    "large": TreeSize(boards=650, configs=3, symbols=4000, tools=40, projects=100),
+}
+
+_CMAKE: str = r"""#!/bin/sh
+# cmake stand-in: configure writes the files of a configured build directory,
+# --build the outputs of a finished build
+dest=""
+config=""
+build=""
+while [ $# -gt 0 ]; do
+    case "$1" in
+        -B) dest="$2"; shift;;
+        --build) build="$2"; shift;;
+        -D) case "$2" in BOARD_CONFIG=*) config="${2#BOARD_CONFIG=}";; esac; shift;;
+        --version) echo "cmake version 3.28.0"; exit 0;;
+    esac
+    shift
+done
+if [ -n "$dest" ]; then
+    mkdir -p "$dest"
+    echo "CMAKE_C_COMPILER:FILEPATH=/bin/true" > "$dest/CMakeCache.txt"
+    : > "$dest/build.ninja"
+    echo "CONFIG_BOARD=\"$config\"" > "$dest/.config"
+    echo "[]" > "$dest/compile_commands.json"
+fi
+if [ -n "$build" ] && [ -f "$build/.config" ]; then
+    cp "$build/.config" "$build/nuttx"
+    cp "$build/.config" "$build/nuttx.bin"
+fi
+exit 0
+"""
+
+_MAKE: str = r"""#!/bin/sh
+# make stand-in: every target succeeds
+exit 0
+"""
+
+_GIT: str = rf"""#!/bin/sh
+# git stand-in for a clean checkout at a fixed revision
+while [ $# -gt 0 ]; do
+    case "$1" in
+        -C) shift 2;;
+        *) break;;
+    esac
+done
+case "$1" in
+    rev-parse) echo "{HEAD}";;
+    status|fetch|worktree|checkout|clone) ;;
+    --version) echo "git version 2.43.0";;
+esac
+exit 0
+"""
+
+def _write(path: Path, text: str, executable: bool = False) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text, encoding='utf-8')
+    if executable is True:
+        path.chmod(path.stat().st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+
+def _kconfig(names: list[str], menu: str) -> str:
+    lines: list[str] = [f'menu "{menu}"', ""]
+    for i, name in enumerate(names):
+        lines += [f"config {name}", f'\tbool "{name.lower()}"']
+        # A share of the symbols depends on the previous one
+        if i % 4 == 3:
+            lines.append(f"\tdepends on {names[i - 1]}")
+        if i % 7 == 0:
+            lines.append("\tdefault y")
+        lines.append("")
+    lines.append("endmenu")
+    return "\n".join(lines) + "\n"
+
+def generate(root: Path, size: TreeSize, seed: int = 0) -> list[str]:
+    """
+    Generate a synthetic workspace, replacing anything at `root`.
+
+    :param root: The workspace root.
+    :type root: Path
+    :param size: Size of the tree.
+    :type size: TreeSize
+    :param seed: Seed of the symbols set by every defconfig.
+    :type seed: int
+    :return: The `board:config` names of the tree.
+    :rtype: list[str]
+    """
+    rng: random.Random = random.Random(seed)
+    if root.exists():
+        shutil.rmtree(root)
+    nuttx: Path = root / "nuttx"
+    apps: Path = root / "apps"
+
+    # Kconfig trees, apps symbols are sourced from nuttx like in the real tree
+    nuttx_syms: list[str] = [f"NX_SYM_{i}" for i in range(size.symbols * 3 // 4)]
+    apps_syms: list[str] = [f"APP_SYM_{i}" for i in range(size.symbols - len(nuttx_syms))]
+    _write(nuttx / "Kconfig", (
+        'mainmenu "synthetic nuttx"\n\n'
+        'config ARCH\n\tstring "arch"\n\tdefault "sim"\n\n'
+        'config ARCH_BOARD\n\tstring "board"\n\n'
+        + _kconfig(nuttx_syms, "nuttx")
+        + '\nsource "$(APPSDIR)/Kconfig"\n'
+    ))
+    _write(apps / "Kconfig", _kconfig(apps_syms, "apps"))
+
+    tools: list[str] = [f"tool{i}" for i in range(size.tools)]
+    _write(nuttx / "tools" / "CMakeLists.txt", "".join(
+        f"add_executable({t} {t}.c cfgdefine.c)\n" for t in tools
+    ))
+
+    names: list[str] = []
+    symbols: list[str] = nuttx_syms + apps_syms
+    for b in range(size.boards):
+        arch: str = ARCHS[b % len(ARCHS)]
+        board: str = f"board{b}"
+        for c in range(size.configs):
+            config: str = "nsh" if c == 0 else f"cfg{c}"
+            enabled: list[str] = rng.sample(symbols, min(len(symbols), 30))
+            _write(
+                nuttx / "boards" / arch / f"chip{b % 40}" / board / "configs" / config / "defconfig",
+                f'CONFIG_ARCH="{arch}"\nCONFIG_ARCH_BOARD="{board}"\n'
+                + "".join(f"CONFIG_{s}=y\n" for s in sorted(enabled))
+            )
+            names.append(f"{board}:{config}")
+
+    for repo in (nuttx, apps):
+        _write(repo / ".git" / "HEAD", f"{HEAD}\n")
+
+    nxdir: Path = root / ".nxtool"
+    data: Path = Path(__file__).resolve().parents[1] / "nxtool" / "data"
+    nxdir.mkdir(parents=True)
+    shutil.copy(data / "config.toml", nxdir / "config.toml")
+    projects: list[str] = [
+        f'[[projects]]\nname = "p{i}"\nconfig = "{names[i % len(names)]}"\n\n'
+        for i in range(size.projects)
+    ]
+    _write(nxdir / "projects.toml", "".join(projects) + '[current]\nname = "p0"\n')
+
+    bindir: Path = root / "bin"
+    _write(bindir / "cmake", _CMAKE, executable=True)
+    _write(bindir / "make", _MAKE, executable=True)
+    _write(bindir / "git", _GIT, executable=True)
+    return names
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument("dest", type=Path, help="workspace root, replaced")
+    parser.add_argument("--size", choices=list(SIZES), default="medium", help="preset size")
+    parser.add_argument("--boards", type=int, help="boards, overrides the preset")
+    parser.add_argument("--configs", type=int, help="configurations per board")
+    parser.add_argument("--symbols", type=int, help="Kconfig symbols")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the defconfig contents")
+    args = parser.parse_args()
+
+    preset: TreeSize = SIZES[args.size]
+    size: TreeSize = TreeSize(
+        boards=args.boards or preset.boards,
+        configs=args.configs or preset.configs,
+        symbols=args.symbols or preset.symbols,
+        tools=preset.tools,
+        projects=preset.projects,
+    )
+    names: list[str] = generate(args.dest, size, args.seed)
+    print(f"{args.dest}: {len(names)} configurations, {size.symbols} symbols")
+    print(f"export PATH={(args.dest / 'bin').resolve()}:$PATH")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,3 +1,14 @@
-from nxtool.main import NxApp
+import sys
 
-nxapp: NxApp = NxApp()
+from nxtool import fastpath
+
+def main() -> None:
+    if fastpath.run(sys.argv[1:]) is True:
+        return
+
+    # typer and the command modules are only imported when actually needed
+    from nxtool.main import NxApp
+    NxApp().start()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Change impact command module.
+
+Lists the board configurations a change of the nuttx and apps checkouts can
+affect, see `nxtool.utils.impact`, so CI builds those instead of the whole
+configuration list. The plain listing is a valid `nxtool build matrix` list file.
+
+Classes:
+    AffectedCmd:
+        Command handler selecting the configurations affected by a change.
+"""
+import sys
+
+from pathlib import Path
+from typing import Any
+
+from nxtool.config.configuration import BoardsStore, PathsStore, SymbolsStore
+from nxtool.utils.git import changed_files, merge_base
+from nxtool.utils.impact import Impact, ImpactAnalysis
+from nxtool.utils.output import Format, emit
+
+REPOS: tuple[str, ...] = ("nuttx", "apps")
+
+class AffectedCmd():
+    """
+    Command handler selecting the configurations affected by a change.
+
+    A checkout is compared with the commit it forked from `since`, like a pull
+    request with its target branch, uncommitted and untracked files included.
+    """
+    def __init__(self, jobs: int | None = None):
+        """
+        :param jobs: Worker processes resolving configurations for the symbols
+            index, defaults to the number of cpus.
+        :type jobs: int | None
+        """
+        self.jobs: int | None = jobs
+        self.roots: dict[str, Path] = {name: PathsStore.nxtool_root / name for name in REPOS}
+        self._symbols: SymbolsStore | None = None
+        self._enabling: dict[str, frozenset[str] | None] = {}
+        self._failed: bool = False
+
+    def enabling(self, name: str) -> frozenset[str] | None:
+        """
+        Configurations enabling a symbol once resolved, `None` if the resolved
+        symbols index cannot be built. The index is only loaded when needed.
+        """
+        if name in self._enabling:
+            return self._enabling[name]
+        if self._symbols is None and self._failed is False:
+            try:
+                symbols: SymbolsStore = SymbolsStore(resolved=True, jobs=self.jobs)
+                symbols.load()
+                self._symbols = symbols
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                # kconfiglib missing or reporting errors with its own exception type
+                print(f"Kconfig symbols not used, every guarded file counts: {e}", file=sys.stderr)
+                self._failed = True
+        self._enabling[name] = (
+            frozenset(self._symbols.query([name], [])) if self._symbols is not None else None
+        )
+        return self._enabling[name]
+
+    def changes(
+        self,
+        since: str,
+        apps_since: str | None = None
+    ) -> dict[str, tuple[str, list[tuple[str, str]]]]:
+        """
+        Changed files of every checkout.
+
+        :param since: Revision the checkouts are compared with.
+        :type since: str
+        :param apps_since: Revision of apps, defaults to `since`.
+        :type apps_since: str | None
+        :return: The base commit and the changed files of every checkout that has the revision.
+        :rtype: dict[str, tuple[str, list[tuple[str, str]]]]
+        :raises RuntimeError: If the nuttx checkout does not have the revision,
+            or git fails.
+        """
+        found: dict[str, tuple[str, list[tuple[str, str]]]] = {}
+        for name, rev in (("nuttx", since), ("apps", apps_since or since)):
+            base: str | None = merge_base(self.roots[name], rev)
+            if base is None:
+                if name == "nuttx" or apps_since is not None:
+                    raise RuntimeError(f"Unknown revision {rev} in {self.roots[name]}")
+                print(f"apps has no revision {rev}, not compared", file=sys.stderr)
+                continue
+            files: list[tuple[str, str]] | None = changed_files(self.roots[name], base)
+            if files is None:
+                raise RuntimeError(f"Failed to list the changes of {self.roots[name]}")
+            found[name] = (base, files)
+        return found
+
+    def affected(
+        self,
+        since: str,
+        apps_since: str | None = None,
+        fmt: Format = "text"
+    ) -> list[str]:
+        """
+        Print the configurations a change can affect.
+
+        The listing goes to stdout, one `board:config` per line in text
+        format. How every changed file was scoped goes to stderr.
+
+        :param since: Revision the checkouts are compared with.
+        :type since: str
+        :param apps_since: Revision of apps, defaults to `since`.
+        :type apps_since: str | None
+        :return: The affected configurations, sorted.
+        :rtype: list[str]
+        """
+        changes = self.changes(since, apps_since)
+        analysis: ImpactAnalysis = ImpactAnalysis(
+            BoardsStore().defconfigs(), self.roots, self.enabling
+        )
+
+        by_config: dict[str, list[str]] = {}
+        for name, (base, files) in changes.items():
+            for status, path in sorted(files, key=lambda f: f[1]):
+                impact: Impact = analysis.impact(name, status, path, base)
+                print(
+                    f"{name}/{path}: {len(impact.configs)} configurations, {impact.reason}",
+                    file=sys.stderr
+                )
+                for config in impact.configs:
+                    by_config.setdefault(config, []).append(f"{name}/{path}")
+
+        configs: list[str] = sorted(by_config)
+        print(
+            f"{len(configs)} of {len(analysis.all)} configurations affected",
+            file=sys.stderr
+        )
+        if fmt != "text":
+            rows: list[dict[str, Any]] = [{"config": c, "changes": by_config[c]} for c in configs]
+            emit(rows, fmt, ["config", "changes"])
+        else:
+            for config in configs:
+                print(config)
+        return configs
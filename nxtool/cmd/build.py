@@ -6,21 +6,36 @@ providing functionality to configure, build, clean projects within a workspace.
 
 Classes:
     BuildCmd:
-        Command handler for managing configuration, building, cleaning 
+        Command handler for managing configuration, building, cleaning
         projects within a workspace.
+    BuildAllCmd:
+        Command handler for building several workspace projects concurrently.
 """
+import dataclasses
+import os
+import queue
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from pathlib import Path
-from nxtool.config.configuration import PathsStore, ProjectStore, BoardsStore, ProjectInstance
-from nxtool.utils.builders import CMakeBuilder, Builder
+from nxtool.config.configuration import ProjectStore, BoardsStore, ProjectInstance
+from nxtool.utils.artifacts import ArtifactCache
+from nxtool.utils.builddirs import BuildDirPool
+from nxtool.utils.builders import Builder, in_tree, project_builder
+from nxtool.utils.ccache import CompilerCache, workspace_cache
+from nxtool.utils.compdb import WorkspaceIndex
+from nxtool.utils.diagnostics import DiagnosticsStore
+from nxtool.utils.process import ProcessResult, ProcessRunner
 
 class BuildCmd():
     """
-    Command handler for interacting with nuttx's cmake build system.
+    Command handler for interacting with nuttx's build systems.
 
-    The `BuildCmd` class provides functionality to configure, build, clean 
-    cmake projects in a workspace.
+    The `BuildCmd` class provides functionality to configure, build, clean
+    projects in a workspace, with the backend selected by the project options.
     """
-    def __init__(self):
+    def __init__(self, runner: ProcessRunner | None = None):
         self.prj: ProjectStore = ProjectStore()
 
         if self.prj.current is None:
@@ -28,30 +43,51 @@ class BuildCmd():
 
         self.brd: BoardsStore = BoardsStore()
         self.inst: ProjectInstance = self.prj.current
+        self.pool: BuildDirPool = BuildDirPool()
+        self.artifacts: ArtifactCache = ArtifactCache()
+        self.diagnostics: DiagnosticsStore = DiagnosticsStore()
 
-        dest_path = PathsStore.nxtool_root / Path(f"build_{self.inst.name}")
-        src_path = PathsStore.nxtool_root / Path("nuttx")
-
-        self.builder: Builder = CMakeBuilder(src_path, dest_path)
+        self.runner: ProcessRunner | None = runner
+        self.cache: CompilerCache | None = workspace_cache()
+        self.builder: Builder = project_builder(self.inst, self.cache, self.runner)
 
-    def __del__(self):
-        if hasattr(self, "inst") is True:
-            self.prj.current = self.inst
-            self.prj.dump()
-    
-    def config(self, config: str | None = None) -> None:
+    def config(self, config: str | None = None, force: bool = False) -> int:
         """
-        run project configuration
+        run project configuration, skipped if nothing changed since the last one
+        unless `force` is set, returns the configure tool exit code
         """
         if config is not None and self.brd.search(config) is not None:
-            self.inst.config = config
-        self.builder.configure(self.inst.config)
+            with self.prj.transaction():
+                inst: ProjectInstance | None = self.prj.search(self.inst.name)
+                if inst is None:
+                    raise RuntimeError(f"Project {self.inst.name} was removed")
+                inst.config = config
+                self.inst = inst
+        # Every configuration has its own warm build directory
+        self.builder = project_builder(
+            self.inst, self.cache, self.runner, self.pool.use(self.inst)
+        )
+        ret: int = self.builder.configure(
+            self.inst.config, defconfig=self.brd.defconfig(self.inst.config), force=force
+        )
+        self.pool.update([self.inst.build_key])
+        return ret
 
-    def build(self) -> None:
+    def build(self) -> int:
         """
-        run project build
+        run project build, outputs already built from the same sources and
+        configuration are restored from the artifact cache instead. The
+        workspace compilation database follows the build, and the compiler
+        diagnostics of the configuration are recorded when it actually ran.
+        Returns the build tool exit code, 0 on a cache hit.
         """
-        self.builder.build()
+        self.pool.use(self.inst)
+        ret: int = self.artifacts.build(self.builder)
+        if self.builder.result is not None:
+            self.diagnostics.record(self.inst.config, self.builder.diagnostics, ret == 0)
+        self.pool.update([self.inst.build_key])
+        WorkspaceIndex(self.prj).update([self.inst.name])
+        return ret
 
     def clean(self, full: bool = False) -> None:
         """
@@ -59,3 +95,146 @@ class BuildCmd():
         """
         self.builder.clean() if full is False else self.builder.fullclean()
 
+# Minimum jobs handed to a single build before another build is started
+# in parallel, configure and link steps are serial anyway
+MIN_JOBS_PER_BUILD: int = 4
+
+def job_shares(jobs: int | None, parallel: int | None, count: int) -> queue.Queue[int]:
+    """
+    Split a global job budget across concurrent builds.
+
+    Every concurrent build takes a share from the queue and puts it back once
+    done, the queue size is the number of builds that run at the same time.
+
+    :param jobs: Global job budget, defaults to the number of cpus.
+    :type jobs: int | None
+    :param parallel: Number of builds run at the same time, by default
+        derived from the job budget.
+    :type parallel: int | None
+    :param count: Number of builds.
+    :type count: int
+    :return: One job share per concurrent build.
+    :rtype: queue.Queue[int]
+    """
+    jobs = max(1, jobs or os.cpu_count() or 1)
+    if parallel is None:
+        parallel = jobs // MIN_JOBS_PER_BUILD
+    parallel = max(1, min(parallel, jobs, count))
+
+    # The remainder of the budget is spread over the first shares so no job
+    # slot is left unused
+    shares: queue.Queue[int] = queue.Queue()
+    for i in range(parallel):
+        shares.put(jobs // parallel + (1 if i < jobs % parallel else 0))
+    return shares
+
+@dataclass
+class BuildResult():
+    """
+    Outcome of a single project build run by `BuildAllCmd`.
+    """
+    name: str
+    success: bool
+    duration: float
+
+class BuildAllCmd():
+    """
+    Command handler for building several workspace projects at the same time.
+
+    Every project is configured and built in its own build directory.
+    A global job budget is split across the concurrent builds, so the host is
+    kept busy without being oversubscribed, see `job_shares`.
+    """
+    def __init__(self, names: list[str] | None = None, runner: ProcessRunner | None = None):
+        """
+        :param names: Projects to build, `None` selects every workspace project.
+        :type names: list[str] | None
+        :param runner: Process runner template, each build gets a copy prefixed
+            with the project name.
+        :type runner: ProcessRunner | None
+        """
+        self.runner: ProcessRunner = runner or ProcessRunner()
+        self.prj: ProjectStore = ProjectStore()
+        self.targets: list[ProjectInstance] = []
+
+        if names is None:
+            self.targets = sorted(self.prj.projects.values(), key=lambda p: p.name)
+        else:
+            for name in names:
+                inst: ProjectInstance | None = self.prj.search(name)
+                if inst is None:
+                    raise RuntimeError(f"Project {name} not found")
+                self.targets.append(inst)
+
+        if len(self.targets) == 0:
+            raise RuntimeError("No projects to build")
+
+        shared: list[str] = [inst.name for inst in self.targets if in_tree(inst)]
+        if len(shared) > 1:
+            raise RuntimeError(
+                f"Projects {', '.join(shared)} all build inside the nuttx checkout, "
+                "set their snapshot option to build them concurrently"
+            )
+
+        brd: BoardsStore = BoardsStore()
+        self.defconfigs: dict[str, Path | None] = {
+            inst.name: brd.defconfig(inst.config) for inst in self.targets
+        }
+        self.cache: CompilerCache | None = workspace_cache()
+        self.pool: BuildDirPool = BuildDirPool()
+        self.artifacts: ArtifactCache = ArtifactCache()
+        self.diagnostics: DiagnosticsStore = DiagnosticsStore()
+
+    def _build_one(self, inst: ProjectInstance, shares: queue.Queue[int]) -> BuildResult:
+        jobs: int = shares.get()
+        start: float = time.monotonic()
+        try:
+            builder: Builder = project_builder(
+                inst, self.cache, dataclasses.replace(self.runner, prefix=f"[{inst.name}] "),
+                self.pool.use(inst)
+            )
+
+            # Cheap when the project is already configured, see CMakeBuilder.configure
+            ret: int = builder.configure(inst.config, defconfig=self.defconfigs[inst.name])
+            if ret == 0:
+                configured: ProcessResult | None = builder.result
+                ret = self.artifacts.build(builder, jobs)
+                # Outputs restored from the artifact cache ran no compiler
+                if builder.result is not configured:
+                    self.diagnostics.record(inst.config, builder.diagnostics, ret == 0)
+            return BuildResult(inst.name, ret == 0, time.monotonic() - start)
+        except OSError as e:
+            print(f"[{inst.name}] {e}")
+            return BuildResult(inst.name, False, time.monotonic() - start)
+        finally:
+            shares.put(jobs)
+
+    def build(self, jobs: int | None = None, parallel: int | None = None) -> bool:
+        """
+        Configure and build all selected projects concurrently.
+
+        :param jobs: Global job budget, defaults to the number of cpus.
+        :type jobs: int | None
+        :param parallel: Number of projects built at the same time, by default
+            derived from the job budget.
+        :type parallel: int | None
+        :return: `True` if every project built successfully.
+        :rtype: bool
+        """
+        shares: queue.Queue[int] = job_shares(jobs, parallel, len(self.targets))
+        with ThreadPoolExecutor(max_workers=shares.qsize()) as pool:
+            results: list[BuildResult] = list(pool.map(
+                lambda inst: self._build_one(inst, shares), self.targets
+            ))
+        self.pool.update([inst.build_key for inst in self.targets])
+        WorkspaceIndex(self.prj).update([inst.name for inst in self.targets])
+
+        self._summary(results)
+        return all(r.success for r in results)
+
+    def _summary(self, results: list[BuildResult]) -> None:
+        width: int = max(len("project"), *(len(r.name) for r in results))
+        print(f"\n{'project':<{width}}  status  time")
+        for r in results:
+            status: str = "pass" if r.success is True else "FAIL"
+            print(f"{r.name:<{width}}  {status:<6}  {r.duration:.1f}s")
@@ -0,0 +1,204 @@
+"""
+Defconfig maintenance commands module.
+
+nuttx's tools/refresh.sh configures every board and runs `make savedefconfig`,
+one configuration after the other. Here the Kconfig tree is parsed once with
+kconfiglib and forked workers apply the defconfigs, see
+`nxtool.utils.kconfig.fork_map`. make and cmake are never run.
+
+Classes:
+    ConfigsCmd:
+        Command handler checking and refreshing the defconfigs of the nuttx tree.
+"""
+import fnmatch
+import sys
+import time
+
+from pathlib import Path
+from typing import Any, Iterator
+
+from nxtool.config.configuration import BoardsStore, PathsStore
+from nxtool.utils import kconfig
+from nxtool.utils.fs import atomic_write
+from nxtool.utils.output import Format, emit
+
+def _stub_dir() -> Path:
+    return PathsStore.nxtool_index_dir / "kconfig"
+
+def _check_worker(item: tuple[str, str]) -> dict[str, Any]:
+    """
+    Check a defconfig in a `fork_map` worker.
+
+    :return: The outcome of `kconfig.check`, with "normalized" the content
+        `make savedefconfig` would write, `None` if the file already has it.
+    """
+    label, path = item
+    defconfig: Path = PathsStore.nxtool_root / "nuttx" / path
+    try:
+        kconf: Any = kconfig.current()
+        result: dict[str, Any] = kconfig.check(kconf, defconfig)
+        normalized: str = kconfig.savedefconfig(kconf, _stub_dir())
+        current: str = defconfig.read_text(encoding='utf-8')
+    except Exception as e:  # pylint: disable=broad-exception-caught
+        # kconfiglib reports errors with its own exception type
+        return {"config": label, "path": path, "error": f"{e}"}
+    return {
+        "config": label,
+        "path": path,
+        **result,
+        "normalized": normalized if normalized != current else None,
+    }
+
+class ConfigsCmd():
+    """
+    Command handler checking and refreshing the defconfigs of the nuttx tree.
+
+    Every selected defconfig is applied to the Kconfig tree. Assignments to
+    symbols the tree does not define and assignments Kconfig overrides (unmet
+    dependencies, selected symbols, choices) are reported. A defconfig is
+    stale when `make savedefconfig` would write something else, refresh writes
+    that instead.
+    """
+    def __init__(self):
+        self.brd: BoardsStore = BoardsStore()
+
+    def select(self, pattern: str | None) -> list[tuple[str, str]]:
+        """
+        Configurations matching a glob.
+
+        :param pattern: Glob over `board:config` names, `None` selects all of them.
+        :type pattern: str | None
+        :return: `board:config` names with the defconfig path relative to nuttx.
+        :rtype: list[tuple[str, str]]
+        :raises RuntimeError: If nothing matches.
+        """
+        selected: list[tuple[str, str]] = sorted(
+            (label, path) for label, path in self.brd.defconfigs()
+            if pattern is None or fnmatch.fnmatchcase(label, pattern)
+        )
+        if len(selected) == 0:
+            raise RuntimeError(f"No configuration matches {pattern}")
+        return selected
+
+    def _run(self, pattern: str | None, jobs: int | None) -> Iterator[dict[str, Any]]:
+        selected: list[tuple[str, str]] = self.select(pattern)
+        try:
+            kconf: Any = kconfig.load_kconfig(
+                PathsStore.nxtool_root / "nuttx", PathsStore.nxtool_root / "apps", _stub_dir()
+            )
+        except ImportError as e:
+            raise RuntimeError(f"Checking configurations needs kconfiglib: {e}") from e
+        except Exception as e:
+            # kconfiglib reports parse errors with its own exception type
+            raise RuntimeError(f"Failed to load the Kconfig tree: {e}") from e
+
+        start: float = time.monotonic()
+        results: list[dict[str, Any]] = sorted(
+            kconfig.fork_map(kconf, _check_worker, selected, jobs), key=lambda r: r["config"]
+        )
+        yield from results
+        print(
+            f"{len(results)} configurations in {time.monotonic() - start:.1f}s",
+            file=sys.stderr
+        )
+
+    @staticmethod
+    def _issues(result: dict[str, Any]) -> Iterator[dict[str, str]]:
+        label: str = result["config"]
+        if "error" in result:
+            yield {"config": label, "kind": "error", "symbol": "", "detail": result["error"]}
+            return
+        for name in result["unknown"]:
+            yield {"config": label, "kind": "unknown", "symbol": name, "detail": "undefined symbol"}
+        for unmet in result["unmet"]:
+            yield {
+                "config": label, "kind": "unmet", "symbol": unmet["symbol"],
+                "detail": f"{unmet['value']} but got {unmet['got'] or 'n'}, {unmet['reason']}",
+            }
+
+    @staticmethod
+    def _print(rows: list[dict[str, str]]) -> None:
+        for row in rows:
+            symbol: str = f" CONFIG_{row['symbol']}" if row["symbol"] else ""
+            print(f"{row['config']}: {row['kind']}{symbol}: {row['detail']}")
+
+    def check(
+        self,
+        pattern: str | None = None,
+        jobs: int | None = None,
+        fmt: Format = "text"
+    ) -> bool:
+        """
+        Check defconfigs without modifying them.
+
+        :param pattern: Glob over `board:config` names, all of them by default.
+        :type pattern: str | None
+        :param jobs: Worker processes, defaults to the number of cpus.
+        :type jobs: int | None
+        :return: `True` if every defconfig applies cleanly and is up to date.
+        :rtype: bool
+        """
+        rows: list[dict[str, str]] = []
+        for result in self._run(pattern, jobs):
+            rows.extend(self._issues(result))
+            if result.get("normalized") is not None:
+                rows.append({
+                    "config": result["config"], "kind": "stale", "symbol": "",
+                    "detail": "differs from savedefconfig, run configs refresh",
+                })
+        if fmt != "text":
+            emit(rows, fmt, ["config", "kind", "symbol", "detail"])
+        else:
+            self._print(rows)
+        return len(rows) == 0
+
+    def refresh(
+        self,
+        pattern: str | None = None,
+        jobs: int | None = None,
+        dry_run: bool = False,
+        fmt: Format = "text"
+    ) -> bool:
+        """
+        Write back stale defconfigs the way `make savedefconfig` writes them.
+
+        Assignments that do not hold are reported, the refreshed defconfig
+        drops or corrects them like savedefconfig does.
+
+        :param pattern: Glob over `board:config` names, all of them by default.
+        :type pattern: str | None
+        :param jobs: Worker processes, defaults to the number of cpus.
+        :type jobs: int | None
+        :param dry_run: Only list the defconfigs that would be written.
+        :type dry_run: bool
+        :return: `False` if a defconfig could not be checked or written.
+        :rtype: bool
+        """
+        rows: list[dict[str, str]] = []
+        success: bool = True
+        for result in self._run(pattern, jobs):
+            issues: list[dict[str, str]] = list(self._issues(result))
+            rows.extend(issues)
+            success &= not any(i["kind"] == "error" for i in issues)
+            normalized: str | None = result.get("normalized")
+            if normalized is None:
+                continue
+            path: Path = PathsStore.nxtool_root / "nuttx" / result["path"]
+            if dry_run is False:
+                try:
+                    atomic_write(path, normalized)
+                except OSError as e:
+                    rows.append({
+                        "config": result["config"], "kind": "error", "symbol": "", "detail": f"{e}"
+                    })
+                    success = False
+                    continue
+            rows.append({
+                "config": result["config"], "kind": "refreshed", "symbol": "",
+                "detail": f"{'would write' if dry_run is True else 'wrote'} {result['path']}",
+            })
+        if fmt != "text":
+            emit(rows, fmt, ["config", "kind", "symbol", "detail"])
+        else:
+            self._print(rows)
+        return success
@@ -0,0 +1,360 @@
+"""
+Workspace daemon command module.
+
+Editor plugins, shell prompts and scripts query the workspace all the time.
+The daemon keeps the project, board, tools and Kconfig symbol stores of one
+workspace loaded and answers those queries over a Unix socket in
+.nxtool/daemon.sock, see `nxtool.utils.daemon` for the protocol. The cli
+asks it first for the queries it serves (see `nxtool.fastpath`) and runs
+everything in process when no daemon is running.
+
+Stores are dropped and loaded again when the files behind them change:
+projects.toml, nuttx/tools/CMakeLists.txt and the nuttx and apps HEADs are
+checked on every request, the board tree is rescanned every `POLL_INTERVAL`
+seconds by a background thread.
+
+Classes:
+    DaemonServer:
+        Unix socket server answering queries from loaded stores.
+    DaemonCmd:
+        Command handler for starting, stopping and querying the daemon.
+"""
+import contextlib
+import glob
+import io
+import json
+import os
+import signal
+import socketserver
+import subprocess
+import sys
+import threading
+import time
+
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+from nxtool.cmd.info import InfoCmd
+from nxtool.config.paths import PathsStore
+from nxtool.utils.daemon import request
+from nxtool.utils.git import head
+from nxtool.utils.output import FORMATS
+
+# Seconds between two scans of the board tree
+POLL_INTERVAL: float = 2.0
+
+# Options of the info queries the daemon answers, by query: option name to
+# the InfoCmd parameter it sets and its kind ("flag", "value", "int" or
+# "list" for repeatable values)
+_FORMAT: dict[str, tuple[str, str]] = {"--format": ("fmt", "value"), "-f": ("fmt", "value")}
+QUERIES: dict[str, dict[str, tuple[str, str]]] = {
+    "project": _FORMAT,
+    "projects": _FORMAT,
+    "boards": _FORMAT | {
+        "--match": ("match", "value"), "-m": ("match", "value"),
+        "--limit": ("limit", "int"), "-n": ("limit", "int"),
+    },
+    "configs": _FORMAT | {
+        "--with": ("with_syms", "list"), "-w": ("with_syms", "list"),
+        "--without": ("without_syms", "list"), "-W": ("without_syms", "list"),
+        "--resolved": ("resolved", "flag"),
+    },
+}
+
+def parse_args(args: list[str], options: dict[str, tuple[str, str]]) -> dict[str, Any] | None:
+    """
+    Parameters of an info query, see `QUERIES`.
+
+    :param args: Arguments following the query name.
+    :type args: list[str]
+    :param options: Options the daemon accepts for the query.
+    :type options: dict[str, tuple[str, str]]
+    :return: Keyword arguments of the `InfoCmd` method, `None` for arguments
+        left to the cli (--rebuild, --help, malformed options, ...).
+    :rtype: dict[str, Any] | None
+    """
+    params: dict[str, Any] = {}
+    rest: list[str] = list(args)
+    while len(rest) > 0:
+        arg: str = rest.pop(0)
+        name, eq, value = arg.partition("=")
+        if name not in options:
+            return None
+        param, kind = options[name]
+        if kind == "flag":
+            if eq != "":
+                return None
+            params[param] = True
+            continue
+        if eq == "":
+            if len(rest) == 0:
+                return None
+            value = rest.pop(0)
+        if kind == "list":
+            params.setdefault(param, []).append(value)
+        elif kind == "int":
+            try:
+                params[param] = int(value)
+            except ValueError:
+                return None
+        else:
+            params[param] = value
+    return params
+
+def _signature(path: Path) -> tuple[int, int] | None:
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+class _Handler(socketserver.StreamRequestHandler):
+    server: "DaemonServer"
+
+    def handle(self) -> None:
+        try:
+            message: dict[str, Any] = json.loads(self.rfile.readline())
+        except ValueError:
+            return
+        reply: dict[str, Any] = self.server.dispatch(message)
+        self.wfile.write(json.dumps(reply).encode('utf-8') + b"\n")
+
+class DaemonServer(socketserver.UnixStreamServer):
+    """
+    Unix socket server answering queries from loaded stores.
+
+    Requests are served one at a time, a query takes a few milliseconds once
+    the stores are loaded.
+    """
+    def __init__(self, path: Path):
+        """
+        :param path: Socket to listen on, only accessible by the user.
+        :type path: Path
+        """
+        umask: int = os.umask(0o077)
+        try:
+            super().__init__(f"{path}", _Handler)
+        finally:
+            os.umask(umask)
+        self.path: Path = path
+        self.info: InfoCmd = InfoCmd()
+        self.lock: threading.Lock = threading.Lock()
+        self.started: float = time.time()
+        self.served: int = 0
+
+        nuttx: Path = PathsStore.nxtool_root / "nuttx"
+        # Files checked on every request and the stores depending on them
+        self._watched: dict[Path, tuple[str, ...]] = {
+            PathsStore.nxtool_projects: ("prj",),
+            nuttx / "tools" / "CMakeLists.txt": ("tls",),
+        }
+        self._files: dict[Path, tuple[int, int] | None] = {
+            p: _signature(p) for p in self._watched
+        }
+        self._heads: tuple[str | None, str | None] = self._revisions()
+        self._tree: int = self._tree_signature()
+        self._stop: threading.Event = threading.Event()
+
+    @staticmethod
+    def _revisions() -> tuple[str | None, str | None]:
+        return (head(PathsStore.nxtool_root / "nuttx"), head(PathsStore.nxtool_root / "apps"))
+
+    @staticmethod
+    def _tree_signature() -> int:
+        """
+        Changes with any defconfig added, removed or modified.
+        """
+        nuttx: Path = PathsStore.nxtool_root / "nuttx"
+        files: list[str] = glob.glob("boards/*/*/*/configs/*/defconfig", root_dir=nuttx)
+        return hash(tuple((f, _signature(nuttx / f)) for f in sorted(files)))
+
+    def _check(self) -> None:
+        """
+        Drop the stores whose files changed since they were loaded.
+        """
+        for path, stores in self._watched.items():
+            sig: tuple[int, int] | None = _signature(path)
+            if sig != self._files[path]:
+                self._files[path] = sig
+                self.info.invalidate(*stores)
+
+        heads: tuple[str | None, str | None] = self._revisions()
+        if heads != self._heads:
+            self._heads = heads
+            self.info.invalidate(*InfoCmd.STORES)
+
+    def _poll(self) -> None:
+        while not self._stop.wait(POLL_INTERVAL):
+            tree: int = self._tree_signature()
+            if tree != self._tree:
+                with self.lock:
+                    self._tree = tree
+                    self.info.invalidate("brd", "sym")
+
+    def _handler(self, argv: list[str]) -> Callable[[], None] | None:
+        if len(argv) < 2 or argv[0] != "info" or argv[1] not in QUERIES:
+            return None
+        params: dict[str, Any] | None = parse_args(argv[2:], QUERIES[argv[1]])
+        if params is None or params.get("fmt", "text") not in FORMATS:
+            return None
+        method: Callable[..., None] = getattr(self.info, argv[1])
+        return lambda: method(**params)
+
+    def _run(self, argv: list[str]) -> dict[str, Any]:
+        handler: Callable[[], None] | None = self._handler(argv)
+        if handler is None:
+            return {"handled": False}
+
+        out: io.StringIO = io.StringIO()
+        code: int = 0
+        with self.lock, contextlib.redirect_stdout(out):
+            self._check()
+            try:
+                handler()
+            except RuntimeError as e:
+                # Same outcome as the typer command
+                print(e)
+                code = 1
+            except Exception:  # pylint: disable=broad-exception-caught
+                # Let the cli run it and report the error itself
+                return {"handled": False}
+        self.served += 1
+        return {"handled": True, "code": code, "out": out.getvalue()}
+
+    def dispatch(self, message: dict[str, Any]) -> dict[str, Any]:
+        """
+        Answer a request, see `nxtool.utils.daemon`.
+        """
+        op: Any = message.get("op")
+        if op == "run" and isinstance(message.get("argv"), list):
+            return self._run([f"{a}" for a in message["argv"]])
+        if op == "status":
+            return {
+                "handled": True,
+                "pid": os.getpid(),
+                "root": f"{PathsStore.nxtool_root}",
+                "uptime": round(time.time() - self.started, 1),
+                "served": self.served,
+            }
+        if op == "stop":
+            # shutdown waits for the serving loop, which is running this request
+            threading.Thread(target=self.shutdown, daemon=True).start()
+            return {"handled": True}
+        return {"handled": False}
+
+    def warm(self) -> None:
+        """
+        Load the stores served to clients.
+        """
+        with self.lock, contextlib.redirect_stdout(io.StringIO()):
+            for argv in (["info", "projects"], ["info", "boards"], ["info", "configs"]):
+                handler: Callable[[], None] | None = self._handler(argv)
+                assert handler is not None
+                try:
+                    handler()
+                except Exception:  # pylint: disable=broad-exception-caught
+                    # Reported to the client issuing the query
+                    pass
+
+    def run(self) -> None:
+        """
+        Serve requests until stopped by a "stop" request, SIGTERM or SIGINT.
+        """
+        def stop(signum: int, frame: Any) -> None:
+            threading.Thread(target=self.shutdown, daemon=True).start()
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+        poller: threading.Thread = threading.Thread(target=self._poll, daemon=True)
+        poller.start()
+        try:
+            self.serve_forever()
+        finally:
+            self._stop.set()
+            self.server_close()
+            self.path.unlink(missing_ok=True)
+
+class DaemonCmd():
+    """
+    Command handler for the workspace daemon.
+    """
+    # Seconds `start` waits for the daemon to answer
+    START_TIMEOUT: float = 10.0
+
+    def __init__(self):
+        self.socket: Path = PathsStore.nxtool_socket
+        self.log: Path = PathsStore.nxtool_logs_dir / "daemon.log"
+
+    def _status(self) -> dict[str, Any] | None:
+        return request(self.socket, {"op": "status"})
+
+    def run(self) -> None:
+        """
+        Run the daemon in the foreground.
+        """
+        if self._status() is not None:
+            raise RuntimeError(f"Daemon already running on {self.socket}")
+        # Left behind by a daemon that did not exit cleanly
+        self.socket.unlink(missing_ok=True)
+        try:
+            server: DaemonServer = DaemonServer(self.socket)
+        except OSError as e:
+            raise RuntimeError(f"Cannot listen on {self.socket}: {e}") from e
+        server.warm()
+        print(f"daemon {os.getpid()} listening on {self.socket}", flush=True)
+        server.run()
+
+    def start(self) -> None:
+        """
+        Start the daemon in the background, its output goes to .nxtool/logs/daemon.log.
+        """
+        status: dict[str, Any] | None = self._status()
+        if status is not None:
+            print(f"daemon already running, pid {status['pid']}")
+            return
+
+        self.log.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.log, 'a', encoding='utf-8') as log:
+            proc: subprocess.Popen = subprocess.Popen(
+                [sys.executable, "-m", "nxtool", "daemon", "run"],
+                cwd=PathsStore.nxtool_root,
+                stdin=subprocess.DEVNULL,
+                stdout=log,
+                stderr=subprocess.STDOUT,
+                start_new_session=True
+            )
+
+        deadline: float = time.monotonic() + self.START_TIMEOUT
+        while time.monotonic() < deadline:
+            status = self._status()
+            if status is not None:
+                print(f"daemon started, pid {status['pid']}")
+                return
+            if proc.poll() is not None:
+                break
+            time.sleep(0.05)
+        raise RuntimeError(f"Daemon failed to start, see {self.log}")
+
+    def stop(self) -> None:
+        """
+        Stop the running daemon.
+        """
+        if request(self.socket, {"op": "stop"}) is None:
+            raise RuntimeError("Daemon not running")
+        deadline: float = time.monotonic() + self.START_TIMEOUT
+        while self.socket.exists() and time.monotonic() < deadline:
+            time.sleep(0.05)
+        print("daemon stopped")
+
+    def status(self) -> None:
+        """
+        Print the state of the daemon.
+        """
+        status: dict[str, Any] | None = self._status()
+        if status is None:
+            raise RuntimeError("Daemon not running")
+        print(f"pid:    {status['pid']}")
+        print(f"socket: {self.socket}")
+        print(f"uptime: {status['uptime']}s")
+        print(f"served: {status['served']} requests")
@@ -0,0 +1,122 @@
+"""
+Build diagnostics command module.
+
+Shows the compiler warnings and errors of the last build of every
+configuration, from the summaries recorded while building (see
+`nxtool.utils.diagnostics`), the raw build logs are never read.
+
+Classes:
+    DiagnosticsCmd:
+        Command handler for reporting build diagnostics across configurations.
+"""
+import fnmatch
+import time
+
+from typing import Any
+
+from nxtool.utils.diagnostics import DiagnosticsStore
+from nxtool.utils.output import Format, emit
+
+class DiagnosticsCmd():
+    """
+    Command handler for build diagnostics.
+
+    Diagnostics reported by several configurations, a warning in a shared
+    header for instance, are shown once with the number of configurations
+    reporting them.
+    """
+    def __init__(self):
+        self.store: DiagnosticsStore = DiagnosticsStore()
+
+    def select(self, pattern: str | None) -> list[dict[str, Any]]:
+        """
+        Recorded summaries of the configurations matching a glob.
+
+        :param pattern: Glob over `board:config` names, `None` selects all of them.
+        :type pattern: str | None
+        :raises RuntimeError: If no build diagnostics match.
+        """
+        selected: list[dict[str, Any]] = [
+            s for s in self.store.summaries()
+            if pattern is None or fnmatch.fnmatchcase(s["config"], pattern)
+        ]
+        if len(selected) == 0:
+            raise RuntimeError(
+                "No build diagnostics recorded" if pattern is None
+                else f"No build diagnostics recorded for {pattern}"
+            )
+        return selected
+
+    @staticmethod
+    def _rows(summaries: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        return [
+            {
+                "config": s["config"],
+                "status": "pass" if s["success"] is True else "fail",
+                "errors": s["counts"].get("error", 0),
+                "warnings": s["counts"].get("warning", 0),
+                "unique": len(s["items"]) + s["dropped"],
+                "built": time.strftime("%Y-%m-%d %H:%M", time.localtime(s["time"])),
+            }
+            for s in summaries
+        ]
+
+    @staticmethod
+    def grouped(summaries: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        """
+        Diagnostics of several configurations, each one once.
+
+        :return: The diagnostics with "count", the times they were reported,
+            and "configs", the configurations reporting them. Errors first,
+            then by number of configurations.
+        :rtype: list[dict[str, Any]]
+        """
+        found: dict[tuple[str, int, str], dict[str, Any]] = {}
+        for s in summaries:
+            for file, line, severity, message, flag, count in s["items"]:
+                diag: dict[str, Any] = found.setdefault((file, line, message), {
+                    "file": file, "line": line, "severity": severity,
+                    "message": message, "flag": flag, "count": 0, "configs": [],
+                })
+                diag["count"] += count
+                diag["configs"].append(s["config"])
+        return sorted(
+            found.values(),
+            key=lambda d: (d["severity"] != "error", -len(d["configs"]), -d["count"],
+                           d["file"], d["line"])
+        )
+
+    def show(self, pattern: str | None = None, top: int = 10, fmt: Format = "text") -> None:
+        """
+        Show the diagnostics counts of every configuration and the most
+        widespread diagnostics.
+
+        :param pattern: Glob over `board:config` names, all of them by default.
+        :type pattern: str | None
+        :param top: Number of diagnostics shown, in text format.
+        :type top: int
+        """
+        summaries: list[dict[str, Any]] = self.select(pattern)
+        rows: list[dict[str, Any]] = self._rows(summaries)
+        if fmt != "text":
+            emit(rows, fmt, ["config", "status", "errors", "warnings", "unique", "built"])
+            return
+
+        width: int = max(len("config"), *(len(r["config"]) for r in rows))
+        print(f"{'config':<{width}}  status  errors  warnings  unique  built")
+        for r in rows:
+            print(
+                f"{r['config']:<{width}}  {r['status']:<6}  {r['errors']:>6}  "
+                f"{r['warnings']:>8}  {r['unique']:>6}  {r['built']}"
+            )
+
+        grouped: list[dict[str, Any]] = self.grouped(summaries)
+        if top <= 0 or len(grouped) == 0:
+            return
+        print(f"\n{min(top, len(grouped))} of {len(grouped)} distinct diagnostics")
+        for d in grouped[:top]:
+            flag: str = f" [{d['flag']}]" if d["flag"] else ""
+            print(
+                f"{len(d['configs']):>4} configs {d['count']:>6}x  "
+                f"{d['file']}:{d['line']}: {d['severity']}: {d['message']}{flag}"
+            )
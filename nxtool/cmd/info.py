@@ -1,24 +1,302 @@
 """
 List command is intended to be used in shell scripts rather than interactive
 Think of apt vs apt-get
+
+Every listing takes a `fmt`: "text" for the human readable output, "json",
+"jsonl" or "tsv" for scripts, see `nxtool.utils.output`.
 """
 
-from nxtool.config.configuration import ProjectStore, BoardsStore, ToolsStore
+from functools import cached_property
+from typing import Any, Iterator
+
+from nxtool.config.configuration import ProjectStore, BoardsStore, SymbolsStore, ToolsStore
+from nxtool.utils.output import Format, emit
 
 class InfoCmd():
-    def __init__(self):
-        self.prj: ProjectStore = ProjectStore()
-        self.brd: BoardsStore = BoardsStore()
-        self.tls: ToolsStore = ToolsStore()
+    # Stores are only loaded by the subcommands that need them, and kept for
+    # later calls when the instance is long lived (see `nxtool.cmd.daemon`)
+    STORES: tuple[str, ...] = ("prj", "brd", "tls", "sym")
+
+    def __init__(self) -> None:
+        self._symbols: dict[bool, SymbolsStore] = {}
+
+    @cached_property
+    def prj(self) -> ProjectStore:
+        return ProjectStore()
+
+    @cached_property
+    def brd(self) -> BoardsStore:
+        return BoardsStore()
+
+    @cached_property
+    def tls(self) -> ToolsStore:
+        return ToolsStore()
+
+    def invalidate(self, *stores: str) -> None:
+        """
+        Drop loaded stores, they are loaded again on next use.
+
+        :param stores: Names from `STORES`, "sym" being the Kconfig symbol indexes.
+        :type stores: str
+        """
+        for name in stores:
+            if name == "sym":
+                self._symbols.clear()
+            else:
+                self.__dict__.pop(name, None)
+
+    def boards(self, fmt: Format = "text", match: str | None = None, limit: int | None = None):
+        if match is not None:
+            found: list[tuple[str, float]] = self.brd.match(match, limit)
+            if fmt == "text":
+                for label, score in found:
+                    print(f"{label:<48} {score:.3f}")
+                return
+            emit((
+                {"board": label.partition(":")[0], "config": label.partition(":")[2], "score": score}
+                for label, score in found
+            ), fmt, ["board", "config", "score"])
+            return
+
+        if fmt == "text":
+            print(self.brd.boards_dict)
+            return
+        emit((
+            {"board": label.partition(":")[0], "config": label.partition(":")[2], "path": path}
+            for label, path in self.brd.defconfigs()
+        ), fmt, ["board", "config", "path"])
+
+    def _project_rows(self, current_only: bool) -> Iterator[dict[str, Any]]:
+        current: str | None = self.prj.current.name if self.prj.current else None
+        for inst in self.prj.projects.values():
+            if current_only is True and inst.name != current:
+                continue
+            yield {
+                "name": inst.name,
+                "config": inst.config,
+                "current": inst.name == current,
+                "opts": dict(inst.opts),
+            }
+
+    def projects(self, fmt: Format = "text"):
+        if fmt == "text":
+            print(list(self.prj.projects.values()))
+            return
+        emit(self._project_rows(False), fmt, ["name", "config", "current", "opts"])
+
+    def project(self, fmt: Format = "text"):
+        if fmt == "text":
+            print(self.prj.current)
+            return
+        emit(self._project_rows(True), fmt, ["name", "config", "current", "opts"])
+
+    def tools(self, fmt: Format = "text"):
+        from nxtool.utils.hosttools import HostTools
+
+        tools: HostTools = HostTools()
+        if fmt != "text":
+            emit((
+                {"tool": name, "state": state, "rev": tools.rev}
+                for name, state in tools.state().items()
+            ), fmt, ["tool", "state", "rev"])
+            return
+        rev: str = (tools.rev or "unknown")[:12]
+        print(f"nuttx {rev}, binaries in {tools.bin_dir}")
+        print("used by make builds only, cmake builds build their own host tools")
+        for name, state in tools.state().items():
+            print(f"{name:<24} {state}")
+
+    def configs(
+        self,
+        with_syms: list[str] | None = None,
+        without_syms: list[str] | None = None,
+        resolved: bool = False,
+        rebuild: bool = False,
+        jobs: int | None = None,
+        fmt: Format = "text"
+    ):
+        sym: SymbolsStore | None = self._symbols.get(resolved)
+        if sym is None or rebuild is True:
+            sym = SymbolsStore(resolved=resolved, jobs=jobs)
+            try:
+                sym.load(rebuild)
+            except ImportError as e:
+                raise RuntimeError(f"--resolved needs kconfiglib: {e}") from e
+            except Exception as e:
+                # kconfiglib reports parse errors with its own exception type
+                raise RuntimeError(f"Failed to load the Kconfig tree: {e}") from e
+            self._symbols[resolved] = sym
+        configs: list[str] = sym.query(with_syms or [], without_syms or [])
+        if fmt != "text":
+            emit(({"config": c} for c in configs), fmt, ["config"])
+            return
+        for config in configs:
+            print(config)
+
+    def builddirs(self, fmt: Format = "text"):
+        import time
+        from nxtool.utils.builddirs import BuildDir, BuildDirPool
+        from nxtool.utils.fs import format_size
+
+        pool: BuildDirPool = BuildDirPool()
+        entries: list[BuildDir] = pool.entries()
+        current: str | None = self.prj.current.build_key if self.prj.current else None
+        if fmt != "text":
+            emit((
+                {"key": e.key, "size": e.size, "last_used": e.last_used, "current": e.key == current}
+                for e in entries
+            ), fmt, ["key", "size", "last_used", "current"])
+            return
+
+        total: int = 0
+        for entry in entries:
+            size: str = "n/a" if entry.size is None else format_size(entry.size)
+            used: str = time.strftime("%Y-%m-%d %H:%M", time.localtime(entry.last_used))
+            mark: str = "*" if entry.key == current else " "
+            print(f"{mark} {entry.key:<40} {size:>10}  {used}")
+            total += entry.size or 0
+
+        quota: str = "none" if pool.quota is None else format_size(pool.quota)
+        print(f"total {format_size(total)}, quota {quota}")
+
+    def artifacts(self, fmt: Format = "text"):
+        from nxtool.utils.artifacts import ArtifactCache
+        from nxtool.utils.fs import format_size
+
+        cache: ArtifactCache = ArtifactCache()
+        entries, size = cache.usage()
+        if fmt != "text":
+            emit([{
+                "enabled": cache.enabled, "entries": entries, "size": size, "quota": cache.quota,
+            }], fmt, ["enabled", "entries", "size", "quota"])
+            return
+        quota: str = "none" if cache.quota is None else format_size(cache.quota)
+        print(f"enabled:   {'yes' if cache.enabled is True else 'no'}")
+        print(f"directory: {cache.root}")
+        print(f"entries:   {entries}")
+        print(f"size:      {format_size(size)} / {quota}")
+
+    def worktrees(self, fmt: Format = "text"):
+        import time
+        from nxtool.utils.git import head
+        from nxtool.utils.worktrees import STAMP, Worktree
+
+        rows: list[dict[str, Any]] = []
+        for inst in self.prj.projects.values():
+            worktree: Worktree | None = Worktree.of(inst)
+            if worktree is None:
+                continue
+            row: dict[str, Any] | None = next(
+                (r for r in rows if r["directory"] == f"{worktree.root}"), None
+            )
+            if row is None:
+                try:
+                    used: float | None = (worktree.root / STAMP).stat().st_mtime
+                except OSError:
+                    # Added by the first build
+                    used = None
+                row = {
+                    "directory": f"{worktree.root}",
+                    "nuttx_rev": worktree.pins.get("nuttx"),
+                    "apps_rev": worktree.pins.get("apps"),
+                    "nuttx": head(worktree.root / "nuttx"),
+                    "apps": head(worktree.root / "apps"),
+                    "last_used": used,
+                    "projects": [],
+                }
+                rows.append(row)
+            row["projects"].append(inst.name)
+
+        if fmt != "text":
+            emit(rows, fmt, [
+                "directory", "nuttx_rev", "apps_rev", "nuttx", "apps", "last_used", "projects",
+            ])
+            return
+        for row in rows:
+            used = "never" if row["last_used"] is None else \
+                time.strftime("%Y-%m-%d %H:%M", time.localtime(row["last_used"]))
+            print(f"{row['directory']}  (last used {used})")
+            for repo in ("nuttx", "apps"):
+                commit: str = (row[repo] or "not added")[:12]
+                print(f"    {repo:<6} {row[f'{repo}_rev'] or 'HEAD'} at {commit}")
+            print(f"    projects: {', '.join(row['projects'])}")
+
+    def includes(self, header: str, fmt: Format = "text"):
+        import os
+        from nxtool.utils.compdb import WorkspaceIndex
+
+        rows: list[dict[str, str]] = WorkspaceIndex(self.prj).affected(header)
+        if fmt != "text":
+            emit(rows, fmt, ["project", "header", "unit"])
+            return
+        if len(rows) == 0:
+            raise RuntimeError(f"No translation unit of a built project includes {header}")
+
+        def relative(path: str) -> str:
+            rel: str = os.path.relpath(path)
+            return path if rel.startswith("..") else rel
+
+        last: tuple[str, str] | None = None
+        for row in rows:
+            if (row["project"], row["header"]) != last:
+                last = (row["project"], row["header"])
+                count: int = sum(1 for r in rows if (r["project"], r["header"]) == last)
+                print(f"{row['project']}: {relative(row['header'])} ({count} translation units)")
+            print(f"    {relative(row['unit'])}")
+
+    def cache(self, zero: bool = False, fmt: Format = "text"):
+        import subprocess
+        import sys
+        from nxtool.utils.ccache import CacheStats, CompilerCache, workspace_cache
+        from nxtool.utils.fs import format_size
+
+        # Notes go to stderr when the output is meant for a script
+        notes = sys.stdout if fmt == "text" else sys.stderr
+        columns: list[str] = [
+            "launcher", "directory", "hits", "misses", "hit_rate",
+            "size", "max_size", "files", "evictions",
+        ]
+
+        cache: CompilerCache | None = workspace_cache()
+        if cache is None:
+            print("compiler cache disabled or no launcher found", file=notes)
+            if fmt != "text":
+                emit([], fmt, columns)
+            return
 
-    def boards(self):
-        print(self.brd.boards_dict)
+        try:
+            stats: CacheStats = cache.stats()
+            if zero is True:
+                cache.zero()
+        except (OSError, subprocess.CalledProcessError) as e:
+            print(f"{cache.kind} statistics not available: {e}", file=notes)
+            if fmt != "text":
+                emit([], fmt, columns)
+            return
 
-    def projects(self):
-        print(self.prj.projects)
+        if fmt != "text":
+            emit([{
+                "launcher": f"{cache.launcher}",
+                "directory": f"{cache.cache_dir}",
+                "hits": stats.hits,
+                "misses": stats.misses,
+                "hit_rate": stats.hit_rate,
+                "size": stats.size,
+                "max_size": stats.max_size,
+                "files": stats.files,
+                "evictions": stats.evictions,
+            }], fmt, columns)
+            return
 
-    def project(self):
-        print(self.prj.current)
+        def size(value: int | None) -> str:
+            return "n/a" if value is None else format_size(value)
 
-    def tools(self):
-        print(self.tls.tools_list)
+        rate: str = "n/a" if stats.hit_rate is None else f"{stats.hit_rate:.1%}"
+        print(f"launcher:  {cache.launcher}")
+        print(f"directory: {cache.cache_dir}")
+        print(f"hits:      {stats.hits}")
+        print(f"misses:    {stats.misses}")
+        print(f"hit rate:  {rate}")
+        print(f"size:      {size(stats.size)} / {size(stats.max_size)}")
+        print(f"files:     {'n/a' if stats.files is None else stats.files}")
+        print(f"evictions: {'n/a' if stats.evictions is None else stats.evictions}")
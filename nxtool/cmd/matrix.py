@@ -0,0 +1,427 @@
+"""
+Matrix build command module.
+
+Builds many board configurations at once, in the spirit of nuttx's
+tools/testbuild.sh but concurrently. Every target gets its own build directory
+under .nxtool/build/matrix, so repeated runs only rebuild what changed.
+
+Results are streamed as JSON lines while targets finish, and recorded in
+.nxtool/build/matrix/results.jsonl for `--resume`.
+
+The targets can be split across machines with `--shard i/n`, see
+`shard_targets`. Every shard records its results in its own file, which
+`merge_results` puts back together.
+
+Classes:
+    MatrixCmd:
+        Command handler for building a list of `board:config` targets.
+"""
+import dataclasses
+import fnmatch
+import hashlib
+import heapq
+import json
+import queue
+import statistics
+import sys
+import time
+
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, TextIO
+
+from nxtool.cmd.build import job_shares
+from nxtool.config.configuration import PathsStore, BoardsStore
+from nxtool.utils.artifacts import ArtifactCache
+from nxtool.utils.builders import CMakeBuilder
+from nxtool.utils.ccache import CompilerCache, workspace_cache
+from nxtool.utils.diagnostics import DiagnosticsStore
+from nxtool.utils.fs import atomic_write
+from nxtool.utils.git import head
+from nxtool.utils.process import ProcessResult, ProcessRunner
+
+def select_targets(patterns: list[str], defconfigs: list[tuple[str, str]]) -> list[str]:
+    """
+    Select configurations with testbuild.sh style patterns.
+
+    A pattern is a glob over `board:config`, or over the board path when it
+    starts with "/" (e.g. "/arm/stm32/*"). A leading "-" excludes the matches
+    instead. Anything after a "," (testbuild.sh toolchain selection) is ignored.
+
+    :param patterns: Patterns, applied in order.
+    :type patterns: list[str]
+    :param defconfigs: Configurations of the tree, see `BoardsStore.defconfigs`.
+    :type defconfigs: list[tuple[str, str]]
+    :return: Selected `board:config` targets, sorted.
+    :rtype: list[str]
+    """
+    # "boards/arm/stm32/nucleo-f4/configs/nsh/defconfig" -> "/arm/stm32/nucleo-f4/configs/nsh"
+    paths: dict[str, str] = {
+        label: path[len("boards"):-len("/defconfig")] for label, path in defconfigs
+    }
+    selected: set[str] = set()
+    for pattern in patterns:
+        pattern = pattern.partition(",")[0].strip()
+        exclude: bool = pattern.startswith("-")
+        pattern = pattern.lstrip("-")
+        if not pattern:
+            continue
+
+        if pattern.startswith("/"):
+            matches = {label for label, path in paths.items() if fnmatch.fnmatchcase(path, pattern)}
+        else:
+            matches = {label for label in paths if fnmatch.fnmatchcase(label, pattern)}
+        selected = selected - matches if exclude is True else selected | matches
+    return sorted(selected)
+
+def read_patterns(spec: str) -> list[str]:
+    """
+    Patterns given on the command line, either a list file or a single pattern.
+
+    List files hold one pattern per line, blank lines and "#" comments are skipped.
+    """
+    path = Path(spec)
+    if not path.is_file():
+        return [spec]
+    with open(path, 'r', encoding='utf-8') as file:
+        return [
+            line.strip() for line in file
+            if line.strip() and not line.lstrip().startswith("#")
+        ]
+
+def parse_shard(spec: str) -> tuple[int, int]:
+    """
+    Parse a "i/n" shard selector, shards are numbered from 1.
+
+    :raises ValueError: If the selector is malformed or out of range.
+    """
+    index, sep, count = spec.partition("/")
+    try:
+        i, n = int(index), int(count)
+    except ValueError:
+        i, n = 0, 0
+    if sep == "" or n < 1 or not 1 <= i <= n:
+        raise ValueError(f"Invalid shard {spec}, expected i/n with 1 <= i <= n")
+    return i, n
+
+def load_durations(path: Path) -> dict[str, float]:
+    """
+    Last recorded build duration of every target in a results file.
+
+    Outputs restored from the artifact cache take no time and tell nothing
+    about the cost of a target, such records only count with the duration of
+    the last real build they carry as "built_duration".
+    """
+    durations: dict[str, float] = {}
+    try:
+        with open(path, 'r', encoding='utf-8') as file:
+            for line in file:
+                try:
+                    record: dict[str, Any] = json.loads(line)
+                except ValueError:
+                    continue
+                duration: Any = record.get(
+                    "built_duration" if record.get("cached") is True else "duration"
+                )
+                if isinstance(duration, (int, float)):
+                    durations[record["target"]] = float(duration)
+    except OSError:
+        pass
+    return durations
+
+def _stable_hash(target: str) -> int:
+    return int(hashlib.sha1(target.encode('utf-8')).hexdigest()[:8], 16)
+
+def shard_targets(
+    targets: list[str],
+    index: int,
+    count: int,
+    durations: dict[str, float]
+) -> list[str]:
+    """
+    Targets built by one of `count` shards.
+
+    Every shard computes the same partition on its own, so all of them must
+    be given the same targets and durations. With recorded durations, targets
+    are handed out longest first, each to the shard with the least work so
+    far; targets without history are estimated at the median duration.
+    Without any history, targets are split by a stable hash of their name.
+
+    :param targets: All targets.
+    :type targets: list[str]
+    :param index: The shard, from 1 to `count`.
+    :type index: int
+    :param count: Number of shards.
+    :type count: int
+    :param durations: Recorded build durations, see `load_durations`.
+    :type durations: dict[str, float]
+    :return: Targets of the shard, sorted.
+    :rtype: list[str]
+    """
+    known: dict[str, float] = {t: durations[t] for t in targets if t in durations}
+    if len(known) == 0:
+        return sorted(t for t in targets if _stable_hash(t) % count == index - 1)
+
+    estimate: float = statistics.median(known.values())
+    loads: list[tuple[float, int]] = [(0.0, i) for i in range(count)]
+    selected: list[str] = []
+    for target in sorted(targets, key=lambda t: (-known.get(t, estimate), t)):
+        load, shard = heapq.heappop(loads)
+        if shard == index - 1:
+            selected.append(target)
+        heapq.heappush(loads, (load + known.get(target, estimate), shard))
+    return sorted(selected)
+
+def merge_results(paths: list[Path], into: Path) -> dict[str, Any]:
+    """
+    Merge the results files of the shards of a matrix build.
+
+    The last record of every target is kept, by record time.
+
+    :param paths: Results files of the shards.
+    :type paths: list[Path]
+    :param into: Merged results file, usable as the history of the next run.
+    :type into: Path
+    :return: Summary: number of targets per status, and the shards missing
+        from `paths` (known from the "shard" field of the records).
+    :rtype: dict[str, Any]
+    """
+    records: dict[str, dict[str, Any]] = {}
+    shards: set[int] = set()
+    count: int | None = None
+    for path in paths:
+        try:
+            with open(path, 'r', encoding='utf-8') as file:
+                lines: list[str] = file.readlines()
+        except OSError as e:
+            raise RuntimeError(f"Cannot read {path}: {e}") from e
+        for line in lines:
+            try:
+                record: dict[str, Any] = json.loads(line)
+            except ValueError:
+                continue
+            if not isinstance(record, dict) or "target" not in record:
+                continue
+            if "shard" in record:
+                try:
+                    i, count = parse_shard(record["shard"])
+                    shards.add(i)
+                except ValueError:
+                    pass
+            previous: dict[str, Any] | None = records.get(record["target"])
+            if previous is None or record.get("time", 0) >= previous.get("time", 0):
+                records[record["target"]] = record
+
+    into.parent.mkdir(parents=True, exist_ok=True)
+    atomic_write(into, "".join(
+        json.dumps(records[t], separators=(",", ":")) + "\n" for t in sorted(records)
+    ))
+
+    status: dict[str, int] = {}
+    for record in records.values():
+        status[record["status"]] = status.get(record["status"], 0) + 1
+    return {
+        "targets": len(records),
+        "status": status,
+        "missing_shards": [] if count is None else sorted(set(range(1, count + 1)) - shards),
+    }
+
+class MatrixCmd():
+    """
+    Command handler for building many board configurations concurrently.
+
+    Targets are configured and built by a pool of workers, each driving the
+    build tool processes of one target at a time with a share of the global
+    job budget. A target that runs longer than its timeout is killed along
+    with its children and reported as timed out.
+    """
+    def __init__(
+        self,
+        spec: str,
+        runner: ProcessRunner | None = None,
+        results: Path | None = None,
+        shard: tuple[int, int] | None = None,
+        history: Path | None = None
+    ):
+        """
+        :param spec: List file or pattern selecting the targets, see `select_targets`.
+        :type spec: str
+        :param runner: Process runner template, each target gets a copy
+            prefixed with its name. Defaults to quiet, so only results are printed.
+        :type runner: ProcessRunner | None
+        :param results: Results file, defaults to .nxtool/build/matrix/results.jsonl,
+            or results-<i>-of-<n>.jsonl for a shard.
+        :type results: Path | None
+        :param shard: Build only shard i of n of the targets, see `shard_targets`.
+        :type shard: tuple[int, int] | None
+        :param history: Results file the shards are balanced with, defaults
+            to .nxtool/build/matrix/results.jsonl.
+        :type history: Path | None
+        """
+        self.runner: ProcessRunner = runner or ProcessRunner(mode="quiet")
+        self.build_root: Path = PathsStore.nxtool_build_dir / "matrix"
+        self.shard: str | None = None if shard is None else f"{shard[0]}/{shard[1]}"
+        self.results: Path = results or self.build_root / (
+            "results.jsonl" if shard is None else f"results-{shard[0]}-of-{shard[1]}.jsonl"
+        )
+
+        brd: BoardsStore = BoardsStore()
+        defconfigs: list[tuple[str, str]] = brd.defconfigs()
+        self.targets: list[str] = select_targets(read_patterns(spec), defconfigs)
+        if len(self.targets) == 0:
+            raise RuntimeError(f"No configurations match {spec}")
+        # Carried over by the records of cache hits, see `load_durations`
+        self.durations: dict[str, float] = load_durations(
+            history or self.build_root / "results.jsonl"
+        )
+        if shard is not None:
+            self.targets = shard_targets(self.targets, shard[0], shard[1], self.durations)
+
+        nuttx: Path = PathsStore.nxtool_root / "nuttx"
+        self.defconfigs: dict[str, Path] = {label: nuttx / path for label, path in defconfigs}
+        self.rev: dict[str, str | None] = {
+            "nuttx": head(nuttx),
+            "apps": head(PathsStore.nxtool_root / "apps"),
+        }
+        self.cache: CompilerCache | None = workspace_cache()
+        self.artifacts: ArtifactCache = ArtifactCache()
+        self.diagnostics: DiagnosticsStore = DiagnosticsStore()
+
+    def _passed(self) -> set[str]:
+        """
+        Targets recorded as passed at the current source revision.
+        """
+        passed: set[str] = set()
+        try:
+            with open(self.results, 'r', encoding='utf-8') as file:
+                for line in file:
+                    try:
+                        record: dict[str, Any] = json.loads(line)
+                    except ValueError:
+                        continue
+                    if record.get("rev") == self.rev and record.get("status") == "pass":
+                        passed.add(record["target"])
+        except OSError:
+            pass
+        return passed
+
+    def _build_one(
+        self,
+        target: str,
+        shares: queue.Queue[int],
+        timeout: float | None
+    ) -> dict[str, Any]:
+        jobs: int = shares.get()
+        start: float = time.monotonic()
+        board, _, config = target.partition(":")
+        build_dir: Path = self.build_root / board / config
+        record: dict[str, Any] = {
+            "target": target,
+            "status": "pass",
+            "stage": None,
+            "rev": self.rev,
+            "build_dir": f"{build_dir}",
+        }
+        if self.shard is not None:
+            record["shard"] = self.shard
+
+        builder: CMakeBuilder = CMakeBuilder(
+            PathsStore.nxtool_root / "nuttx", build_dir, self.cache,
+            dataclasses.replace(
+                self.runner,
+                prefix=f"[{target}] ",
+                # The timeout covers the configure and the build together
+                deadline=start + timeout if timeout is not None else None
+            )
+        )
+        try:
+            record["stage"] = "configure"
+            ret: int = builder.configure(target, defconfig=self.defconfigs.get(target))
+            if ret == 0:
+                record["stage"] = "build"
+                configured: ProcessResult | None = builder.result
+                ret = self.artifacts.build(builder, jobs)
+                # Outputs restored from the artifact cache ran no compiler
+                if builder.result is not configured:
+                    self.diagnostics.record(target, builder.diagnostics, ret == 0)
+                elif ret == 0:
+                    record["cached"] = True
+                    if target in self.durations:
+                        record["built_duration"] = self.durations[target]
+        except OSError as e:
+            ret = 127
+            record["error"] = f"{e}"
+        finally:
+            shares.put(jobs)
+
+        if ret != 0:
+            # A tool that failed to start leaves no result of its own
+            result = builder.result if "error" not in record else None
+            record["status"] = (
+                "timeout" if result is not None and result.timed_out is True else "fail"
+            )
+            if result is not None:
+                record["returncode"] = result.returncode
+                record["tail"] = result.tail
+                record["log"] = f"{result.log}" if result.log is not None else None
+        record["duration"] = round(time.monotonic() - start, 3)
+        record["time"] = int(time.time())
+        return record
+
+    def build(
+        self,
+        jobs: int | None = None,
+        parallel: int | None = None,
+        timeout: float | None = None,
+        resume: bool = False,
+        out: TextIO = sys.stdout
+    ) -> bool:
+        """
+        Build all targets, writing a JSON line per target to `out` as it finishes.
+
+        :param jobs: Global job budget, defaults to the number of cpus.
+        :type jobs: int | None
+        :param parallel: Number of targets built at the same time, by default
+            derived from the job budget.
+        :type parallel: int | None
+        :param timeout: Seconds a single target may take to configure and build.
+        :type timeout: float | None
+        :param resume: Skip targets that passed at the same nuttx and apps
+            revisions, otherwise previous results are discarded.
+        :type resume: bool
+        :param out: Stream the JSON lines are written to.
+        :type out: TextIO
+        :return: `True` if no target failed.
+        :rtype: bool
+        """
+        targets: list[str] = self.targets
+        if resume is True:
+            passed: set[str] = self._passed()
+            for target in targets:
+                if target in passed:
+                    self._emit(out, {"target": target, "status": "skipped", "rev": self.rev})
+            targets = [t for t in targets if t not in passed]
+
+        self.results.parent.mkdir(parents=True, exist_ok=True)
+        success: bool = True
+        with open(self.results, 'a' if resume is True else 'w', encoding='utf-8') as results:
+            if len(targets) == 0:
+                return True
+
+            shares: queue.Queue[int] = job_shares(jobs, parallel, len(targets))
+            with ThreadPoolExecutor(max_workers=shares.qsize()) as pool:
+                futures: list[Future[dict[str, Any]]] = [
+                    pool.submit(self._build_one, target, shares, timeout) for target in targets
+                ]
+                for future in as_completed(futures):
+                    record: dict[str, Any] = future.result()
+                    success = success and record["status"] == "pass"
+                    # Recorded right away, an interrupted run can be resumed
+                    self._emit(results, record)
+                    self._emit(out, record)
+        return success
+
+    @staticmethod
+    def _emit(stream: TextIO, record: dict[str, Any]) -> None:
+        stream.write(json.dumps(record, separators=(",", ":")) + "\n")
+        stream.flush()
@@ -17,6 +17,7 @@ Functions:
 """
 
 from nxtool.config.configuration import BoardsStore, ProjectStore, ProjectInstance
+from nxtool.utils.worktrees import OPTS as REV_OPTS, Worktree, prune
 
 class ProjectCmd():
     """
@@ -31,14 +32,11 @@ class ProjectCmd():
 
         Sets up instances for handling the `BoardsStore` and `ProjectStore`,
         establishing the foundation for managing projects and configurations.
+        Changes are written by each method in a store transaction.
         """
         self.brd: BoardsStore = BoardsStore()
         self.prj: ProjectStore = ProjectStore()
 
-    def __del__(self):
-        self.prj.dump()
-
-
     def add(self, project: str, config: str) -> bool:
         """
         Add a new project to the workspace.
@@ -51,42 +49,35 @@ class ProjectCmd():
         :return: `True` if the project was successfully added, `False` otherwise
         :rtype: bool
         """
-        if self.prj.search(project) is not None:
+        if self.brd.search(config) is None:
             return False
 
-        cfg: tuple[str, str] | None = self.brd.search(config)
-        if cfg is not None:
-            inst: ProjectInstance = ProjectInstance(name=project, config=config)
-            self.prj.projects.add(inst)
-            if self.prj.current is None:
-                self.prj.current = inst
-            return True
-
-        return False
+        with self.prj.transaction():
+            return self.prj.add(ProjectInstance(name=project, config=config))
 
     def remove(self, project: str) -> bool:
         """
         Remove an existing project from the workspace.
 
-        If sucessfully removed, updates the store accordingly.
+        If sucessfully removed, updates the store accordingly. The current
+        project cannot be removed.
 
         :param str project: The name of the project to remove.
         :return: `True` if the project was successfully removed, `False` otherwise
         :rtype: bool
         """
-        found: ProjectInstance | None = self.prj.search(project)
-        if found is None:
-            return False
+        with self.prj.transaction():
+            removed: bool = self.prj.remove(project)
+        if removed is True:
+            self._prune()
+        return removed
 
-        if found is self.prj.make:
-            return False
-
-        # Should handle this better
-        if self.prj.current is found.name:
-            return False
-
-        self.prj.projects.remove(found)
-        return True
+    def _prune(self) -> None:
+        """
+        Remove the worktrees of revisions no project pins anymore.
+        """
+        for path in prune(filter(None, map(Worktree.of, self.prj.projects.values()))):
+            print(f"removed unused worktrees {path.name}")
 
     def set_project(self, project: str) -> bool:
         """
@@ -98,35 +89,71 @@ class ProjectCmd():
         :return: `True` if the project was changes sucessfully, `False` otherwise.
         :rtype: bool
         """
+        with self.prj.transaction():
+            project_instance: ProjectInstance | None = self.prj.search(project)
 
-        project_instance: ProjectInstance | None = self.prj.search(project)
-
-        if project_instance is not None:
-            self.prj.current = project_instance
-            return True
+            if project_instance is not None:
+                self.prj.current = project_instance
+                return True
 
         return False
 
+    # Accepted values of every project option, `None` accepts any value
+    OPTS: dict[str, tuple[str, ...] | None] = {
+        "generator": None,
+        "compiler": None,
+        "snapshot": ("none", "hardlink", "worktree"),
+        "nuttx_rev": None,
+        "apps_rev": None,
+        "timing": ("off", "on"),
+    }
+
     def setopts(self, opt: tuple[str, str]) -> bool:
         """
-        Unset project options.variable = obj or default_value
+        Set an option of the active project.
 
-        Placeholder for unsetting specific options for the active project.
+        "generator" selects the build backend: "make", or a cmake generator
+        such as "Ninja" (default) or "Unix Makefiles". "snapshot" decides
+        where make projects build: "none" (in the nuttx checkout),
+        "hardlink" or "worktree" (a private copy of the sources).
+        "nuttx_rev" and "apps_rev" pin a branch, tag or commit, built from a
+        git worktree added on the next build, see `nxtool.utils.worktrees`.
+        "timing" set to "on" records the compile times of make projects for
+        `build report`, ninja records them for cmake projects anyway.
 
         :param Tuple[str, str] opt: Option key and value as a tuple.
-        :return: `False` as this is a placeholder method.
+        :return: `True` if the option was set, `False` for unknown options or values.
         :rtype: bool
         """
-        return False
+        key, value = opt
+        if key not in self.OPTS:
+            print(f"Unknown option {key}, expected one of {', '.join(self.OPTS)}")
+            return False
+        allowed: tuple[str, ...] | None = self.OPTS[key]
+        if allowed is not None and value not in allowed:
+            print(f"Invalid value {value} for {key}, expected one of {', '.join(allowed)}")
+            return False
 
-    def unsetopts(self, opt: tuple[str, str]) -> bool:
-        """
-        Unset project options.
+        with self.prj.transaction():
+            if self.prj.current is None:
+                return False
+            self.prj.current.opts[key] = value  # type: ignore[literal-required]
+        if key in REV_OPTS.values():
+            self._prune()
+        return True
 
-        Placeholder for unsetting specific options for the active project.
+    def unsetopts(self, key: str) -> bool:
+        """
+        Unset an option of the active project, restoring its default.
 
-        :param Tuple[str, str] opt: Option key and value as a tuple.
-        :return: `False` as this is a placeholder method.
+        :param str key: Option key.
+        :return: `True` if the option was set before.
         :rtype: bool
         """
-        return False
+        with self.prj.transaction():
+            if self.prj.current is None or key not in self.prj.current.opts:
+                return False
+            del self.prj.current.opts[key]  # type: ignore[misc]
+        if key in REV_OPTS.values():
+            self._prune()
+        return True
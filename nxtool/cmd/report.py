@@ -0,0 +1,149 @@
+"""
+Build report command module.
+
+Analyses the timing log of a project build directory and keeps a compact per
+project history of the results in .nxtool/reports, so build time regressions
+between commits or configurations show up right away.
+
+Classes:
+    ReportCmd:
+        Command handler for reporting where build time goes.
+"""
+import json
+import time
+
+from pathlib import Path
+from typing import Any
+
+from nxtool.config.configuration import PathsStore, ProjectStore, ProjectInstance
+from nxtool.utils.fs import atomic_write
+from nxtool.utils.git import head
+from nxtool.utils.ninjalog import BuildTiming, Step, analyze, find_log, parse
+
+class ReportCmd():
+    """
+    Command handler for build time reports.
+    """
+    # Number of builds kept in the history of a project
+    HISTORY_LIMIT: int = 200
+
+    def __init__(self, project: str | None = None):
+        """
+        :param project: Project to report on, defaults to the current one.
+        :type project: str | None
+        """
+        self.prj: ProjectStore = ProjectStore()
+        inst: ProjectInstance | None = (
+            self.prj.current if project is None else self.prj.search(project)
+        )
+        if inst is None:
+            raise RuntimeError(f"Project {project or '(current)'} not found")
+        self.inst: ProjectInstance = inst
+        self.history_file: Path = PathsStore.nxtool_reports_dir / f"{inst.name}.jsonl"
+
+    def _load_history(self) -> list[dict[str, Any]]:
+        try:
+            with open(self.history_file, 'r', encoding='utf-8') as file:
+                return [json.loads(line) for line in file if line.strip()]
+        except (OSError, ValueError):
+            return []
+
+    def _store(self, history: list[dict[str, Any]], record: dict[str, Any]) -> None:
+        self.history_file.parent.mkdir(parents=True, exist_ok=True)
+        if len(history) >= self.HISTORY_LIMIT:
+            history = history[-(self.HISTORY_LIMIT - 1):] + [record]
+            atomic_write(
+                self.history_file,
+                "".join(json.dumps(r, separators=(",", ":")) + "\n" for r in history)
+            )
+            return
+        with open(self.history_file, 'a', encoding='utf-8') as file:
+            file.write(json.dumps(record, separators=(",", ":")) + "\n")
+
+    def _record(self, timing: BuildTiming, log: Path, top: int) -> dict[str, Any]:
+        stat = log.stat()
+        slowest: list[Step] = timing.slowest("compile", top) + timing.slowest("link", top)
+        return {
+            "time": int(time.time()),
+            "config": self.inst.config,
+            "rev": head(PathsStore.nxtool_root / "nuttx"),
+            "log": f"{stat.st_mtime_ns}:{stat.st_size}",
+            "wall": timing.wall,
+            "cpu": timing.cpu,
+            "critical": timing.critical_time,
+            "steps": len(timing.steps),
+            "top": {s.name: s.duration for s in slowest},
+        }
+
+    def report(self, top: int = 10) -> None:
+        """
+        Print the build time report of the last build and compare it with the
+        previous one recorded in the history.
+
+        :param top: Number of slowest steps shown per kind.
+        :type top: int
+        """
+        log: Path | None = find_log(self.inst.build_dir)
+        if log is None:
+            raise RuntimeError(f"No build timing log found in {self.inst.build_dir}")
+
+        timing: BuildTiming = analyze(parse(log))
+        record: dict[str, Any] = self._record(timing, log, top)
+        history: list[dict[str, Any]] = self._load_history()
+
+        # Reporting twice on the same build must not record it twice
+        if len(history) > 0 and history[-1]["log"] == record["log"]:
+            previous: dict[str, Any] | None = history[-2] if len(history) > 1 else None
+        else:
+            previous = history[-1] if len(history) > 0 else None
+            self._store(history, record)
+
+        self._print(timing, record, top)
+        if previous is not None:
+            self._compare(record, previous)
+
+    @staticmethod
+    def _secs(ms: float) -> str:
+        return f"{ms / 1000:7.2f}s"
+
+    def _print(self, timing: BuildTiming, record: dict[str, Any], top: int) -> None:
+        rev: str = (record["rev"] or "unknown")[:12]
+        print(f"project {self.inst.name} ({self.inst.config}) at {rev}")
+        print(f"  wall time     {self._secs(timing.wall)}")
+        print(f"  cpu time      {self._secs(timing.cpu)}")
+        print(f"  parallelism   {timing.parallelism:7.2f}x")
+        print(f"  critical path {self._secs(timing.critical_time)} ({len(timing.critical)} steps)")
+        print(f"  steps         {len(timing.steps):8d}")
+
+        sections: list[tuple[str, list[Step]]] = [
+            ("critical path (estimated)", timing.critical[-top:]),
+            ("slowest compile steps", timing.slowest("compile", top)),
+            ("slowest link steps", timing.slowest("link", top)),
+        ]
+        for title, steps in sections:
+            if len(steps) == 0:
+                continue
+            print(f"\n{title}:")
+            for step in steps:
+                print(f"  {self._secs(step.duration)}  {step.name}")
+
+    def _compare(self, record: dict[str, Any], previous: dict[str, Any]) -> None:
+        rev: str = (previous["rev"] or "unknown")[:12]
+        print(f"\ncompared to previous build ({previous['config']} at {rev}):")
+        for key in ("wall", "cpu", "critical"):
+            delta: int = record[key] - previous[key]
+            pct: str = f" ({delta / previous[key]:+.1%})" if previous[key] else ""
+            print(f"  {key:<13} {delta / 1000:+8.2f}s{pct}")
+
+        slower: list[tuple[int, str]] = sorted(
+            (
+                (ms - previous["top"][name], name)
+                for name, ms in record["top"].items()
+                if name in previous["top"] and ms > previous["top"][name]
+            ),
+            reverse=True
+        )
+        if len(slower) > 0:
+            print("  slower steps:")
+            for delta, name in slower[:5]:
+                print(f"    {delta / 1000:+7.2f}s  {name}")
@@ -0,0 +1,264 @@
+"""
+Firmware size command module.
+
+Measures the nuttx binary of a project build: section totals from the ELF
+file, per object and library sizes from the linker map and per symbol sizes
+from the symbol table. A compact record of every measured build is kept in
+.nxtool/sizes/<project>, so footprint changes between commits, configurations
+or projects can be tracked down to the symbols responsible.
+
+Classes:
+    SizeCmd:
+        Command handler for reporting and comparing firmware sizes.
+"""
+import gzip
+import json
+import time
+
+from pathlib import Path
+from typing import Any
+
+from nxtool.config.configuration import PathsStore, ProjectStore, ProjectInstance
+from nxtool.utils import linkmap
+from nxtool.utils.builders import project_builder
+from nxtool.utils.elf import ElfFile
+from nxtool.utils.fs import atomic_write
+from nxtool.utils.git import head
+
+KINDS: tuple[str, ...] = ("text", "data", "bss")
+
+def _signed(value: int) -> str:
+    return f"{value:+d}" if value != 0 else "0"
+
+class SizeCmd():
+    """
+    Command handler for firmware size reports.
+    """
+    # Number of builds kept in the history of a project
+    HISTORY_LIMIT: int = 50
+
+    def __init__(self, project: str | None = None):
+        """
+        :param project: Project to measure, defaults to the current one.
+        :type project: str | None
+        """
+        self.prj: ProjectStore = ProjectStore()
+        self.inst: ProjectInstance = self._project(project)
+
+    def _project(self, name: str | None) -> ProjectInstance:
+        inst: ProjectInstance | None = (
+            self.prj.current if name is None else self.prj.search(name)
+        )
+        if inst is None:
+            raise RuntimeError(f"Project {name or '(current)'} not found")
+        return inst
+
+    @staticmethod
+    def _history_dir(inst: ProjectInstance) -> Path:
+        return PathsStore.nxtool_sizes_dir / inst.name
+
+    def _history(self, inst: ProjectInstance) -> list[Path]:
+        """
+        Records of a project, oldest first.
+        """
+        try:
+            return sorted(self._history_dir(inst).glob("*.json.gz"))
+        except OSError:
+            return []
+
+    @staticmethod
+    def _load(path: Path) -> dict[str, Any]:
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8') as file:
+                return json.load(file)
+        except (OSError, ValueError) as e:
+            raise RuntimeError(f"Size record {path} is unreadable: {e}") from e
+
+    @staticmethod
+    def _binaries(inst: ProjectInstance) -> tuple[Path, Path | None]:
+        """
+        ELF and linker map of the last build of a project.
+        """
+        output: Path = project_builder(inst).output_dir
+        elf: Path = output / "nuttx"
+        if not elf.is_file():
+            raise RuntimeError(f"No nuttx binary found in {output}, build {inst.name} first")
+        mapfile: Path | None = output / "nuttx.map"
+        if not mapfile.is_file():
+            mapfile = next(iter(sorted(output.glob("*.map"))), None)
+        return elf, mapfile
+
+    def _measure(self, inst: ProjectInstance) -> dict[str, Any]:
+        elf_path, map_path = self._binaries(inst)
+        try:
+            elf: ElfFile = ElfFile(elf_path)
+            objects: dict[str, list[int]] = (
+                linkmap.parse(map_path, elf.kinds(), elf_path.parent)
+                if map_path is not None else {}
+            )
+            symbols: dict[str, tuple[int, str]] = elf.symbols()
+            totals: dict[str, int] = elf.totals()
+        except (OSError, ValueError, IndexError) as e:
+            raise RuntimeError(f"Cannot measure {elf_path}: {e}") from e
+
+        stat = elf_path.stat()
+        return {
+            "time": int(time.time()),
+            "config": inst.config,
+            "rev": head(PathsStore.nxtool_root / "nuttx"),
+            "elf": f"{stat.st_mtime_ns}:{stat.st_size}",
+            "totals": totals,
+            "objects": objects,
+            "symbols": {name: list(v) for name, v in symbols.items()},
+        }
+
+    def record(self, inst: ProjectInstance) -> dict[str, Any]:
+        """
+        Measure the last build of a project and add it to the project history,
+        unless that build was already recorded.
+
+        :return: The record of the last build.
+        :rtype: dict[str, Any]
+        """
+        history: list[Path] = self._history(inst)
+        elf_path, _ = self._binaries(inst)
+        stat = elf_path.stat()
+        if len(history) > 0:
+            last: dict[str, Any] = self._load(history[-1])
+            if last["elf"] == f"{stat.st_mtime_ns}:{stat.st_size}":
+                return last
+
+        rec: dict[str, Any] = self._measure(inst)
+        rev: str = (rec["rev"] or "unknown")[:12]
+        path: Path = self._history_dir(inst) / f"{rec['time']:010d}-{rev}.json.gz"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        atomic_write(
+            path,
+            gzip.compress(json.dumps(rec, separators=(",", ":")).encode('utf-8'), mtime=0)
+        )
+        for old in history[:len(history) + 1 - self.HISTORY_LIMIT]:
+            old.unlink(missing_ok=True)
+        return rec
+
+    def _baseline(self, spec: str) -> tuple[str, dict[str, Any]]:
+        """
+        Record selected by `--diff`: "@N" for the Nth previous record of the
+        project, otherwise the last build of another project.
+        """
+        if spec.startswith("@"):
+            try:
+                back: int = int(spec[1:])
+            except ValueError as e:
+                raise RuntimeError(f"Invalid record selector {spec}, expected @N") from e
+            history: list[Path] = self._history(self.inst)
+            if back < 1 or back >= len(history):
+                raise RuntimeError(
+                    f"{self.inst.name} has {max(len(history) - 1, 0)} previous size records"
+                )
+            return f"{self.inst.name}{spec}", self._load(history[-1 - back])
+        other: ProjectInstance = self._project(spec)
+        return other.name, self.record(other)
+
+    def size(self, diff: str | None = None, top: int = 10) -> None:
+        """
+        Print the firmware size of the last build, or compare it with another one.
+
+        :param diff: Build to compare with, "@N" for the Nth previous record
+            of the project or the name of another project.
+        :type diff: str | None
+        :param top: Number of objects, libraries or symbols shown.
+        :type top: int
+        """
+        rec: dict[str, Any] = self.record(self.inst)
+        if diff is None:
+            self._print(rec, top)
+        else:
+            name, base = self._baseline(diff)
+            self._compare(rec, name, base, top)
+
+    @staticmethod
+    def _libraries(objects: dict[str, list[int]]) -> dict[str, list[int]]:
+        libs: dict[str, list[int]] = {}
+        for obj, sizes in objects.items():
+            total: list[int] = libs.setdefault(linkmap.library_name(obj), [0, 0, 0])
+            for i, size in enumerate(sizes):
+                total[i] += size
+        return libs
+
+    @staticmethod
+    def _table(title: str, rows: dict[str, list[int]], top: int) -> None:
+        if len(rows) == 0:
+            return
+        largest: list[tuple[str, list[int]]] = sorted(
+            rows.items(), key=lambda r: sum(r[1]), reverse=True
+        )[:top]
+        width: int = max(len(name) for name, _ in largest)
+        print(f"\n{title}")
+        print(f"  {'':<{width}}  {'text':>8}  {'data':>8}  {'bss':>8}")
+        for name, sizes in largest:
+            print(f"  {name:<{width}}  {sizes[0]:8d}  {sizes[1]:8d}  {sizes[2]:8d}")
+
+    def _print(self, rec: dict[str, Any], top: int) -> None:
+        rev: str = (rec["rev"] or "unknown")[:12]
+        totals: dict[str, int] = rec["totals"]
+        print(f"project {self.inst.name} ({rec['config']}) at {rev}")
+        for key in KINDS + ("flash", "ram"):
+            print(f"  {key:<6} {totals[key]:10d}")
+        if len(rec["objects"]) == 0:
+            print("\nno linker map found, per object sizes unavailable")
+            return
+        self._table("largest libraries", self._libraries(rec["objects"]), top)
+        self._table("largest objects", rec["objects"], top)
+
+    @staticmethod
+    def _deltas(
+        new: dict[str, list[int]],
+        old: dict[str, list[int]],
+        top: int
+    ) -> list[tuple[str, int, int]]:
+        """
+        Largest changes between two size tables, as name, old and new total.
+        """
+        changes: list[tuple[str, int, int]] = []
+        for name in new.keys() | old.keys():
+            a: int = sum(old.get(name, [0]))
+            b: int = sum(new.get(name, [0]))
+            if a != b:
+                changes.append((name, a, b))
+        changes.sort(key=lambda c: (-abs(c[2] - c[1]), c[0]))
+        return changes[:top]
+
+    @staticmethod
+    def _change_table(title: str, changes: list[tuple[str, int, int]]) -> None:
+        if len(changes) == 0:
+            return
+        width: int = max(len(name) for name, _, _ in changes)
+        print(f"\n{title}")
+        for name, a, b in changes:
+            print(f"  {name:<{width}}  {a:8d} -> {b:8d}  {_signed(b - a):>8}")
+
+    def _compare(self, rec: dict[str, Any], name: str, base: dict[str, Any], top: int) -> None:
+        print(
+            f"{self.inst.name} ({rec['config']}, {(rec['rev'] or 'unknown')[:12]}) "
+            f"against {name} ({base['config']}, {(base['rev'] or 'unknown')[:12]})"
+        )
+        for key in KINDS + ("flash", "ram"):
+            a: int = base["totals"][key]
+            b: int = rec["totals"][key]
+            print(f"  {key:<6} {a:10d} -> {b:10d}  {_signed(b - a):>8}")
+
+        if len(rec["objects"]) > 0 and len(base["objects"]) > 0:
+            self._change_table(
+                "library changes",
+                self._deltas(self._libraries(rec["objects"]), self._libraries(base["objects"]), top)
+            )
+            self._change_table(
+                "object changes", self._deltas(rec["objects"], base["objects"], top)
+            )
+
+        # Symbols keep their size under a single kind, [size, kind] -> [size]
+        self._change_table("symbol changes", self._deltas(
+            {s: v[:1] for s, v in rec["symbols"].items()},
+            {s: v[:1] for s, v in base["symbols"].items()},
+            top
+        ))
@@ -1,11 +1,15 @@
+from concurrent.futures import ThreadPoolExecutor
 from importlib.abc import Traversable
+import dataclasses
 import importlib.resources
 from pathlib import Path
 import shutil
 import os
+import time
 
 from nxtool.config.configuration import ConfigStore, PathsStore
 from nxtool.utils.git import GitWrapper
+from nxtool.utils.process import ProcessRunner
 
 class WorkspaceCmd():
     def __init__(self):
@@ -40,9 +44,86 @@ class WorkspaceCmd():
         except FileExistsError:
             print("Workspace already initialized. Aborting")
 
-    def update(self):
+    def _update_remote(
+        self,
+        name: str,
+        repo: str,
+        runner: ProcessRunner,
+        depth: int | None,
+        filter: str | None,
+        mirror: bool
+    ) -> tuple[str, str, bool, float]:
+        start: float = time.monotonic()
+        git: GitWrapper = GitWrapper(repo, dataclasses.replace(runner, prefix=f"[{name}] "))
+
+        reference: Path | None = None
+        if mirror is True:
+            reference = PathsStore.nxtool_git_dir / f"{name}.git"
+            if reference.is_dir():
+                ret: int = git.fetch(reference)
+            else:
+                reference.parent.mkdir(parents=True, exist_ok=True)
+                ret = git.clone(f"{reference}", filter=filter, mirror=True)
+            if ret != 0:
+                return (name, "mirror", False, time.monotonic() - start)
+
+        dest: Path = PathsStore.nxtool_root / name
+        if (dest / ".git").exists():
+            action: str = "fetch"
+            ret = git.fetch(dest, depth, filter)
+        else:
+            action = "clone"
+            ret = git.clone(f"{dest}", depth, filter, reference)
+        return (name, action, ret == 0, time.monotonic() - start)
+
+    def update(
+        self,
+        jobs: int | None = None,
+        depth: int | None = None,
+        filter: str | None = None,
+        mirror: bool | None = None,
+        runner: ProcessRunner | None = None
+    ) -> bool:
+        """
+        Clone missing remotes and fetch existing ones, all at the same time.
+
+        Options left to `None` fall back to the `[update]` section of the
+        workspace config.
+
+        :param jobs: Maximum number of remotes updated at once.
+        :type jobs: int | None
+        :param depth: Shallow clone / fetch depth.
+        :type depth: int | None
+        :param filter: Partial clone filter, e.g. "blob:none".
+        :type filter: str | None
+        :param mirror: Keep bare mirrors under .nxtool/git and clone with
+            `--reference` to them.
+        :type mirror: bool | None
+        :param runner: Process runner template.
+        :type runner: ProcessRunner | None
+        :return: `True` if every remote was updated.
+        :rtype: bool
+        """
         cfg: ConfigStore = ConfigStore()
+        if len(cfg.remotes) == 0:
+            return True
+
+        jobs = jobs or cfg.update.get("jobs", 4)
+        depth = depth or cfg.update.get("depth")
+        filter = filter or cfg.update.get("filter")
+        mirror = mirror if mirror is not None else cfg.update.get("mirror", False)
+        runner = runner or ProcessRunner()
+
+        with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+            results = list(pool.map(
+                lambda r: self._update_remote(r[0], r[1], runner, depth, filter, mirror),
+                cfg.remotes
+            ))
+
+        width: int = max(len("remote"), *(len(r[0]) for r in results))
+        print(f"\n{'remote':<{width}}  action  status  time")
+        for name, action, success, duration in results:
+            status: str = "ok" if success is True else "FAIL"
+            print(f"{name:<{width}}  {action:<6}  {status:<6}  {duration:.1f}s")
 
-        for remote in cfg.remotes:
-            repo:GitWrapper = GitWrapper(remote[1])
-            repo.clone(remote[0])
+        return all(r[2] for r in results)
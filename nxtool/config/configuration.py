@@ -1,43 +1,54 @@
+from contextlib import contextmanager
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Any, ClassVar, TypedDict
+from typing import Any, ClassVar, Iterator, TypedDict
 import glob
+import hashlib
+import json
+import os
 import re
 import toml
 
-@dataclass()
-class PathsStore():
-    """
-    A class to store and manage various paths used throughout the project.
-
-    :ivar nxtool_dir_name: The directory name for nxtool (default: ".nxtool").
-    :vartype nxtool_dir_name: Path
-    :ivar nxtool_root: The root directory for nxtool,
-        determined by the `topdir` function.
-    :vartype nxtool_root: Path
-    :ivar nxtool_config: The path to the nxtool configuration file (`config.toml`).
-    :vartype nxtool_config: Path
-    :ivar nxtool_projects: The path to the nxtool projects file (`projects.toml`).
-    :vartype nxtool_projects: Path
-
-    This class organisez/manages the paths throughout the project.
-    - It holds only class attributes so there's no need for dependency injection pattern
-    - It is initialized in main.py
-    """
-    nxtool_dir_name: ClassVar[Path] = Path()
-    nxtool_root: ClassVar[Path] = Path()
-    nxtool_config: ClassVar[Path] = Path()
-    nxtool_projects: ClassVar[Path] = Path()
-    nxtool_build_dir: ClassVar[Path] = Path()
-    nxtool_bin_dir: ClassVar[Path] = Path()
+from nxtool.config.paths import PathsStore
+from nxtool.utils.fs import atomic_write, file_lock
+
+class CacheOpts(TypedDict, total=False):
+    launcher: str
+    max_size: str
+
+class UpdateOpts(TypedDict, total=False):
+    jobs: int
+    depth: int
+    filter: str
+    mirror: bool
+
+class BuildDirOpts(TypedDict, total=False):
+    quota: str
+
+class ArtifactOpts(TypedDict, total=False):
+    enabled: bool
+    quota: str
+
+class LogOpts(TypedDict, total=False):
+    keep: int
+    quota: str
 
 @dataclass
 class ConfigStore():
     """
     Config class that stores data from .nxtool/config.
+
+    Reads need no lock, the file is always replaced atomically. Modifications
+    go through `transaction`, see `ProjectStore`.
     """
 
     remotes: list[tuple[str, str]] = field(init=False)
+    cache: CacheOpts = field(init=False)
+    update: UpdateOpts = field(init=False)
+    builddirs: BuildDirOpts = field(init=False)
+    artifacts: ArtifactOpts = field(init=False)
+    logs: LogOpts = field(init=False)
+    _loaded: dict[str, Any] = field(default_factory=dict, init=False, repr=False)
 
     def __post_init__(self):
         self.load()
@@ -49,12 +60,40 @@ class ConfigStore():
             {"name": r[0], "repo": r[1]}
             for r in self.remotes
         ]
+        if self.cache:
+            pack["cache"] = dict(self.cache)
+        if self.update:
+            pack["update"] = dict(self.update)
+        if self.builddirs:
+            pack["builddirs"] = dict(self.builddirs)
+        if self.artifacts:
+            pack["artifacts"] = dict(self.artifacts)
+        if self.logs:
+            pack["logs"] = dict(self.logs)
         return pack
 
+    @property
+    def dirty(self) -> bool:
+        """
+        Whether the store was modified since it was loaded or written.
+        """
+        return self._pack_data() != self._loaded
+
     def load(self) -> None:
+        self.remotes = list()
+        self.cache = {}
+        self.update = {}
+        self.builddirs = {}
+        self.artifacts = {}
+        self.logs = {}
         try:
             with open(PathsStore.nxtool_config, 'r', encoding='utf-8') as file:
                 data: dict = toml.load(file)
+                self.cache = data.get("cache", {})
+                self.update = data.get("update", {})
+                self.builddirs = data.get("builddirs", {})
+                self.artifacts = data.get("artifacts", {})
+                self.logs = data.get("logs", {})
                 if "remotes" in data:
                     self.remotes = [
                         (r["name"], r["repo"])
@@ -64,26 +103,45 @@ class ConfigStore():
                     self.remotes = list()
         except FileNotFoundError:
             print(f"Error: File '{PathsStore.nxtool_config}' not found.")
-            return
         except toml.TomlDecodeError:
             print(f"Error: File '{PathsStore.nxtool_config}' contains invalid TOML.")
-            return
+        self._loaded = self._pack_data()
 
     def dump(self) -> None:
+        """
+        Write the store back if it changed, atomically.
+        """
+        if self.dirty is False:
+            return
         try:
-            with open(PathsStore.nxtool_config, 'w', encoding='utf-8') as file:
-                data = self._pack_data()
-                toml.dump(data, file)
+            atomic_write(PathsStore.nxtool_config, toml.dumps(self._pack_data()))
         except FileNotFoundError:
             print(f"Error: File '{PathsStore.nxtool_config}' not found.")
             return
-        except toml.TomlDecodeError:
-            print(f"Error: File '{PathsStore.nxtool_config}' contains invalid TOML.")
-            return
+        self._loaded = self._pack_data()
+
+    @contextmanager
+    def transaction(self) -> Iterator["ConfigStore"]:
+        """
+        Reload the store under an exclusive lock and write it back on exit,
+        only if it was modified. Nothing is written if the body raises.
+        """
+        with file_lock(PathsStore.nxtool_config):
+            self.load()
+            yield self
+            self.dump()
 
 class ProjectOpts(TypedDict, total=False):
+    # build backend, "cmake" (default) or "make"
     generator: str
     compiler: str
+    # source snapshot of make projects, "none" (default), "hardlink" or "worktree"
+    snapshot: str
+    # pinned revisions, built from git worktrees, see `nxtool.utils.worktrees`
+    nuttx_rev: str
+    apps_rev: str
+    # per compile timing log of make projects for `build report`, "off" (default) or "on"
+    timing: str
 
 @dataclass
 class ProjectInstance():
@@ -103,12 +161,44 @@ class ProjectInstance():
     def __hash__(self):
         return hash(self.name)
 
+    @property
+    def build_key(self) -> str:
+        """
+        Build directory of the project relative to the pool, one per
+        configuration, compiler and pinned revisions so switching between them
+        stays incremental
+        """
+        key: str = self.config.replace(":", "_").replace("/", "_")
+        compiler: str = self.opts.get("compiler", "")
+        if compiler:
+            key += f"-{hashlib.sha1(compiler.encode()).hexdigest()[:8]}"
+        revisions: str = ":".join(self.opts.get(o, "") for o in ("nuttx_rev", "apps_rev"))
+        if revisions != ":":
+            key += f"-{hashlib.sha1(revisions.encode()).hexdigest()[:8]}"
+        return f"{self.name}/{key}"
+
+    @property
+    def build_dir(self) -> Path:
+        """
+        Build output directory of the project, see `nxtool.utils.builddirs`
+        """
+        return PathsStore.nxtool_pool_dir / self.build_key
+
 @dataclass
 class ProjectStore():
+    """
+    Workspace projects stored in .nxtool/projects.toml, keyed by name.
+
+    Reads need no lock, the file is always replaced atomically. Modifications
+    go through `transaction`, which serializes writers across processes with
+    a file lock and only rewrites the file when something changed, so
+    concurrent nxtool runs in the same workspace never lose updates.
+    """
 
     # This should be instance attributes
     current: ProjectInstance | None = field(init=False)
-    projects: set[ProjectInstance] = field(init=False)
+    projects: dict[str, ProjectInstance] = field(init=False)
+    _loaded: dict[str, Any] = field(default_factory=dict, init=False, repr=False)
 
     def __post_init__(self):
         self.load()
@@ -119,67 +209,236 @@ class ProjectStore():
         pack["current"]["name"] = self.current.name if self.current is not None else ""
 
         pack["projects"] = [
-            {"name": p.name, "config": p.config}
-            for p in self.projects
+            {"name": p.name, "config": p.config} | ({"opts": dict(p.opts)} if p.opts else {})
+            for p in self.projects.values()
         ]
         return pack
 
+    @property
+    def dirty(self) -> bool:
+        """
+        Whether the store was modified since it was loaded or written.
+        """
+        return self._pack_data() != self._loaded
+
     def search(self, name: str) -> ProjectInstance | None:
-        return next(
-            (x for x in self.projects if x.name == name),
-            None
-        )
+        return self.projects.get(name)
+
+    def add(self, inst: ProjectInstance) -> bool:
+        """
+        Add a project, the first one becomes the current project.
+
+        :return: `False` if a project with the same name exists.
+        :rtype: bool
+        """
+        if inst.name in self.projects:
+            return False
+        self.projects[inst.name] = inst
+        if self.current is None:
+            self.current = inst
+        return True
+
+    def remove(self, name: str) -> bool:
+        """
+        Remove a project, the current project cannot be removed.
+
+        :return: `True` if the project was removed.
+        :rtype: bool
+        """
+        if name not in self.projects or self.current is self.projects[name]:
+            return False
+        del self.projects[name]
+        return True
 
     def load(self) -> None:
+        self.projects = {}
+        self.current = None
         try:
             with open(PathsStore.nxtool_projects, 'r', encoding='utf-8') as file:
                 data: dict = toml.load(file)
-                self.projects = set()
-                self.current = None
 
                 if "projects" in data:
                     self.projects = {
-                        ProjectInstance(p["name"], p["config"])
+                        p["name"]: ProjectInstance(p["name"], p["config"], p.get("opts", {}))
                         for p in data["projects"]
                     }
                     self.current = self.search(data["current"]["name"])
 
         except FileNotFoundError:
             print(f"Error: File '{PathsStore.nxtool_projects}' not found.")
-            return
         except toml.TomlDecodeError:
             print(f"Error: File '{PathsStore.nxtool_projects}' contains invalid TOML.")
-            return
+        self._loaded = self._pack_data()
 
     def dump(self) -> None:
+        """
+        Write the store back if it changed, atomically.
+        """
+        if self.dirty is False:
+            return
         try:
-            with open(PathsStore.nxtool_projects, 'w', encoding='utf-8') as file:
-                data = self._pack_data()
-                toml.dump(data, file)
+            atomic_write(PathsStore.nxtool_projects, toml.dumps(self._pack_data()))
         except FileNotFoundError:
             print(f"Error: File '{PathsStore.nxtool_projects}' not found.")
             return
-        except toml.TomlDecodeError:
-            print(f"Error: File '{PathsStore.nxtool_projects}' contains invalid TOML.")
-            return
+        self._loaded = self._pack_data()
+
+    @contextmanager
+    def transaction(self) -> Iterator["ProjectStore"]:
+        """
+        Reload the store under an exclusive lock and write it back on exit,
+        only if it was modified. Nothing is written if the body raises.
+
+        Projects obtained before the transaction are stale inside of it,
+        look them up again.
+        """
+        with file_lock(PathsStore.nxtool_projects):
+            self.load()
+            yield self
+            self.dump()
 
 @dataclass
 class BoardsStore():
-    boards_list: list[str] = field(init=False)
-    boards_dict: dict[str, list[str]] = field(default_factory=dict, init=False)
+    """
+    Boards and configurations available in the nuttx tree.
+
+    Scanning the whole nuttx tree for defconfig files is slow, so the result is
+    kept in an on-disk index (`PathsStore.nxtool_boards_index`). The index is
+    keyed on the nuttx git HEAD and on the mtimes of every
+    `boards/<arch>/<chip>/<board>/configs` directory and of its configuration
+    directories; only directories whose mtimes changed are rescanned. Trees
+    that are not git checkouts rely on the mtimes alone. The index is loaded
+    on first access.
+    """
+    _INDEX_VERSION: ClassVar[int] = 2
+
+    _dirs: dict[str, dict[str, Any]] | None = field(default=None, init=False, repr=False)
+    _boards: dict[str, list[str]] | None = field(default=None, init=False, repr=False)
+    # TrigramIndex of the names, built by the first `match`
+    _names: Any = field(default=None, init=False, repr=False)
+
+    @property
+    def boards_dict(self) -> dict[str, list[str]]:
+        if self._boards is None:
+            self.load()
+        assert self._boards is not None
+        return self._boards
+
+    @property
+    def boards_list(self) -> list[str]:
+        return [
+            (Path(d) / c / "defconfig").as_posix()
+            for d, entry in self._configs_dirs().items()
+            for c in entry["configs"]
+        ]
 
-    def __post_init__(self):
-        self.boards_list = glob.glob("./nuttx/**/defconfig", recursive=True)
+    def defconfigs(self) -> list[tuple[str, str]]:
+        """
+        All configurations of the tree.
+
+        :return: `board:config` identifiers with the defconfig path relative
+            to the nuttx directory.
+        :rtype: list[tuple[str, str]]
+        """
+        return [
+            (f"{Path(d).parent.name}:{c}", (Path(d) / c / "defconfig").as_posix())
+            for d, entry in self._configs_dirs().items()
+            for c in entry["configs"]
+        ]
+
+    def _configs_dirs(self) -> dict[str, dict[str, Any]]:
+        if self._dirs is None:
+            self.load()
+        assert self._dirs is not None
+        return self._dirs
 
-        for board in self.boards_list:
-            b = Path(board).as_posix()
-            m = re.search(r'/([a-zA-Z0-9_]*)/configs/(.*)/defconfig$', b)
-            if m is not None:
-                key = m.group(1)
-                value = m.group(2)
+    def _read_index(self) -> dict[str, Any]:
+        try:
+            with open(PathsStore.nxtool_boards_index, 'r', encoding='utf-8') as file:
+                data: dict[str, Any] = json.load(file)
+        except (OSError, ValueError):
+            return {}
+        if data.get("version") != self._INDEX_VERSION:
+            return {}
+        return data
+
+    def _write_index(self, rev: str | None) -> None:
+        data = {
+            "version": self._INDEX_VERSION,
+            "head": rev,
+            "dirs": self._dirs,
+        }
+        try:
+            PathsStore.nxtool_boards_index.parent.mkdir(parents=True, exist_ok=True)
+            atomic_write(PathsStore.nxtool_boards_index, json.dumps(data, separators=(",", ":")))
+        except OSError:
+            # Not being able to persist the index only costs a rescan next time
+            pass
+
+    @staticmethod
+    def _stamp(path: Path) -> list[int] | None:
+        """
+        mtimes of a configs directory and of its subdirectories, adding or
+        removing the defconfig of an existing configuration changes the latter.
+        """
+        try:
+            with os.scandir(path) as entries:
+                subdirs: list[os.DirEntry] = sorted(
+                    (e for e in entries if e.is_dir()), key=lambda e: e.name
+                )
+            return [path.stat().st_mtime_ns] + [e.stat().st_mtime_ns for e in subdirs]
+        except OSError:
+            return None
+
+    @staticmethod
+    def _scan_configs_dir(path: Path) -> list[str]:
+        try:
+            return sorted(
+                e.name for e in os.scandir(path)
+                if e.is_dir() and os.path.isfile(os.path.join(e.path, "defconfig"))
+            )
+        except OSError:
+            return []
 
+    def load(self) -> None:
+        """
+        Load the board index, rescanning only what changed since it was written.
+        """
+        # git helpers pull in the process runner, keep them off the startup path
+        from nxtool.utils.git import head
+
+        nuttx: Path = PathsStore.nxtool_root / "nuttx"
+        index: dict[str, Any] = self._read_index()
+        rev: str | None = head(nuttx)
+
+        cached: dict[str, dict[str, Any]] = index.get("dirs", {})
+        # Without a known HEAD on both sides the mtimes decide alone
+        if rev is not None and index.get("head") not in (None, rev):
+            cached = {}
+
+        dirty: bool = index.get("head") != rev
+        self._dirs = {}
+        for cfgdir in sorted(glob.glob("boards/*/*/*/configs", root_dir=nuttx)):
+            path: Path = nuttx / cfgdir
+            stamp: list[int] | None = self._stamp(path)
+            if stamp is None:
+                continue
+
+            entry = cached.get(cfgdir)
+            if entry is None or entry["mtime"] != stamp:
+                entry = {"mtime": stamp, "configs": self._scan_configs_dir(path)}
+                dirty = True
+            self._dirs[cfgdir] = entry
+
+        if dirty or self._dirs.keys() != cached.keys():
+            self._write_index(rev)
+
+        self._names = None
+        self._boards = {}
+        for cfgdir, entry in self._dirs.items():
+            if entry["configs"]:
                 # Use setdefault to initialize the list if the key doesn't exist
-                self.boards_dict.setdefault(key, []).append(value)
+                self._boards.setdefault(Path(cfgdir).parent.name, []).extend(entry["configs"])
 
     def _split_config_str(self, config: str) -> tuple[str, str] | None:
         if ":" in config or "/" in config:
@@ -192,18 +451,259 @@ class BoardsStore():
                 print("config value not formated correctly")
         return None
 
+    def match(self, query: str, limit: int | None = None) -> list[tuple[str, float]]:
+        """
+        Fuzzy search of the `board:config` names, see `nxtool.utils.search`.
+
+        :param query: Part of a board or configuration name, typos are tolerated.
+        :type query: str
+        :param limit: Maximum number of results, `None` for all of them.
+        :type limit: int | None
+        :return: `board:config` names with their score, best first.
+        :rtype: list[tuple[str, float]]
+        """
+        from nxtool.utils.search import TrigramIndex
+
+        if self._names is None:
+            self._names = TrigramIndex(label for label, _ in self.defconfigs())
+        return self._names.search(query, limit)
+
     def search(self, config: str) -> tuple[str, str] | None:
         cfg = self._split_config_str(config)
         if cfg is not None:
-            return cfg if cfg[1] in self.boards_dict[cfg[0]] else None
+            return cfg if cfg[1] in self.boards_dict.get(cfg[0], []) else None
         return None
 
+    def defconfig(self, config: str) -> Path | None:
+        """
+        Path of the defconfig file behind a `board:config` string.
+
+        :param config: The `board:config` (or `board/config`) identifier.
+        :type config: str
+        :return: Path to the defconfig, `None` if the configuration is unknown.
+        :rtype: Path | None
+        """
+        cfg = self.search(config)
+        if cfg is None:
+            return None
+
+        for cfgdir, entry in self._configs_dirs().items():
+            if Path(cfgdir).parent.name == cfg[0] and cfg[1] in entry["configs"]:
+                return PathsStore.nxtool_root / "nuttx" / cfgdir / cfg[1] / "defconfig"
+        return None
+
+def _resolve_worker(path: str) -> tuple[str, set[str] | None]:
+    from nxtool.utils import kconfig
+    try:
+        return (path, kconfig.resolved(kconfig.current(), PathsStore.nxtool_root / "nuttx" / path))
+    except Exception:  # pylint: disable=broad-exception-caught
+        return (path, None)
+
+@dataclass
+class SymbolsStore():
+    """
+    Inverted index from Kconfig symbol to the configurations enabling it.
+
+    Built from the literal defconfig lines, or with `resolved` from the full
+    configuration kconfiglib computes for every defconfig. The index is kept in
+    `PathsStore.nxtool_index_dir` and invalidated like the boards index: a new
+    nuttx HEAD rebuilds it, otherwise only defconfigs whose mtime changed are
+    read again. Sets of configurations are stored as integer bitmaps, one bit
+    per configuration, so queries are a handful of bitwise operations.
+
+    Removed or changed defconfigs leave unused bits behind, the bits are
+    renumbered once they make up more than `_MAX_HOLES` of the bitmaps.
+    """
+    _INDEX_VERSION: ClassVar[int] = 1
+    _MAX_HOLES: ClassVar[float] = 0.25
+
+    resolved: bool = False
+    jobs: int | None = None
+
+    _configs: list[str | None] = field(default_factory=list, init=False, repr=False)
+    _files: dict[str, list[int]] = field(default_factory=dict, init=False, repr=False)
+    _symbols: dict[str, int] = field(default_factory=dict, init=False, repr=False)
+    _loaded: bool = field(default=False, init=False, repr=False)
+
+    @property
+    def index_file(self) -> Path:
+        name: str = "symbols-resolved.json" if self.resolved is True else "symbols.json"
+        return PathsStore.nxtool_index_dir / name
+
+    def _read_index(self, rev: str | None) -> None:
+        self._configs, self._files, self._symbols = [], {}, {}
+        try:
+            with open(self.index_file, 'r', encoding='utf-8') as file:
+                data: dict[str, Any] = json.load(file)
+        except (OSError, ValueError):
+            return
+        if data.get("version") != self._INDEX_VERSION or rev is None or data.get("head") != rev:
+            return
+
+        self._configs = data["configs"]
+        self._files = data["files"]
+        self._symbols = {k: int(v, 16) for k, v in data["symbols"].items()}
+
+    def _write_index(self, rev: str | None) -> None:
+        data = {
+            "version": self._INDEX_VERSION,
+            "head": rev,
+            "configs": self._configs,
+            "files": self._files,
+            "symbols": {k: f"{v:x}" for k, v in self._symbols.items() if v != 0},
+        }
+        try:
+            self.index_file.parent.mkdir(parents=True, exist_ok=True)
+            atomic_write(self.index_file, json.dumps(data, separators=(",", ":")))
+        except OSError:
+            pass
+
+    def _drop(self, cid: int) -> None:
+        mask: int = ~(1 << cid)
+        for name in self._symbols:
+            self._symbols[name] &= mask
+        self._configs[cid] = None
+
+    def _compact(self) -> bool:
+        """
+        Renumber the configurations without holes if there are too many.
+
+        :return: `True` if the index was renumbered.
+        :rtype: bool
+        """
+        holes: int = self._configs.count(None)
+        if holes == 0 or holes <= len(self._configs) * self._MAX_HOLES:
+            return False
+
+        remap: dict[int, int] = {}
+        configs: list[str | None] = []
+        for cid, label in enumerate(self._configs):
+            if label is not None:
+                remap[cid] = len(configs)
+                configs.append(label)
+        self._configs = configs
+        for entry in self._files.values():
+            entry[1] = remap[entry[1]]
+        for name, bits in self._symbols.items():
+            compacted: int = 0
+            while bits != 0:
+                low: int = bits & -bits
+                compacted |= 1 << remap[low.bit_length() - 1]
+                bits ^= low
+            self._symbols[name] = compacted
+        return True
+
+    def _symbols_of(self, paths: list[str]) -> Iterator[tuple[str, set[str] | None]]:
+        from nxtool.utils import kconfig
+
+        nuttx: Path = PathsStore.nxtool_root / "nuttx"
+        if self.resolved is False:
+            for path in paths:
+                try:
+                    yield (path, kconfig.enabled(kconfig.parse_defconfig(nuttx / path)))
+                except OSError:
+                    yield (path, None)
+            return
+
+        kconf = kconfig.load_kconfig(
+            nuttx, PathsStore.nxtool_root / "apps", PathsStore.nxtool_index_dir / "kconfig"
+        )
+        yield from kconfig.fork_map(kconf, _resolve_worker, paths, self.jobs)
+
+    def load(self, rebuild: bool = False) -> None:
+        """
+        Load the index, updating the entries of changed defconfigs.
+
+        :param rebuild: Ignore the stored index and build it from scratch.
+        :type rebuild: bool
+        """
+        from nxtool.utils.git import head
+
+        rev: str | None = head(PathsStore.nxtool_root / "nuttx")
+        if rebuild is True:
+            self._configs, self._files, self._symbols = [], {}, {}
+        else:
+            self._read_index(rev)
+
+        nuttx: Path = PathsStore.nxtool_root / "nuttx"
+        current: dict[str, tuple[str, int]] = {}
+        for label, path in BoardsStore().defconfigs():
+            try:
+                current[path] = (label, (nuttx / path).stat().st_mtime_ns)
+            except OSError:
+                continue
+
+        dirty: bool = False
+        for path in [p for p in self._files if p not in current]:
+            self._drop(self._files.pop(path)[1])
+            dirty = True
+
+        stale: list[str] = []
+        for path, (label, mtime) in current.items():
+            entry: list[int] | None = self._files.get(path)
+            if entry is not None and entry[0] == mtime:
+                continue
+            if entry is not None:
+                self._drop(self._files.pop(path)[1])
+            stale.append(path)
+
+        for path, symbols in self._symbols_of(stale):
+            dirty = True
+            if symbols is None:
+                print(f"Error: could not read configuration '{path}'")
+                continue
+            cid: int = len(self._configs)
+            self._configs.append(current[path][0])
+            self._files[path] = [current[path][1], cid]
+            for name in symbols:
+                self._symbols[name] = self._symbols.get(name, 0) | (1 << cid)
+
+        if dirty is True:
+            self._compact()
+            self._write_index(rev)
+        self._loaded = True
+
+    def query(self, with_syms: list[str], without_syms: list[str]) -> list[str]:
+        """
+        Configurations that enable all of `with_syms` and none of `without_syms`.
+
+        :param with_syms: Symbols that must be enabled, CONFIG_ prefix optional.
+        :type with_syms: list[str]
+        :param without_syms: Symbols that must not be enabled.
+        :type without_syms: list[str]
+        :return: Sorted `board:config` identifiers.
+        :rtype: list[str]
+        """
+        from nxtool.utils.kconfig import symbol_name
+
+        if self._loaded is False:
+            self.load()
+
+        mask: int = 0
+        for cid, label in enumerate(self._configs):
+            if label is not None:
+                mask |= 1 << cid
+        for name in with_syms:
+            mask &= self._symbols.get(symbol_name(name), 0)
+        for name in without_syms:
+            mask &= ~self._symbols.get(symbol_name(name), 0)
+
+        return sorted(
+            label for cid, label in enumerate(self._configs)
+            if label is not None and mask >> cid & 1
+        )
+
 @dataclass
 class ToolsStore():
     tools_list: list[str] = field(init=False)
 
     def __post_init__(self):
-        cmakelists = open('./nuttx/tools/CMakeLists.txt', 'r', encoding='utf-8').read()
+        path: Path = PathsStore.nxtool_root / "nuttx" / "tools" / "CMakeLists.txt"
+        try:
+            cmakelists = path.read_text(encoding='utf-8')
+        except FileNotFoundError:
+            print(f"Error: File '{path}' not found.")
+            cmakelists = ""
         self.tools_list = re.findall(r'add_executable\((.*?)\s.*\)', cmakelists)
 
     def search(self, config: str) -> bool:
@@ -0,0 +1,106 @@
+"""
+Workspace paths.
+
+Kept apart from the stores so resolving the workspace only costs a few path
+operations, without importing toml or scanning the nuttx tree.
+"""
+from pathlib import Path
+from typing import ClassVar
+
+from nxtool.utils.topdir import topdir
+
+class PathsStore():
+    """
+    A class to store and manage various paths used throughout the project.
+
+    :ivar nxtool_dir_name: The directory name for nxtool (default: ".nxtool").
+    :vartype nxtool_dir_name: Path
+    :ivar nxtool_root: The root directory for nxtool,
+        determined by the `topdir` function.
+    :vartype nxtool_root: Path
+    :ivar nxtool_config: The path to the nxtool configuration file (`config.toml`).
+    :vartype nxtool_config: Path
+    :ivar nxtool_projects: The path to the nxtool projects file (`projects.toml`).
+    :vartype nxtool_projects: Path
+    :ivar nxtool_build_dir: The directory holding build directories managed by nxtool.
+    :vartype nxtool_build_dir: Path
+    :ivar nxtool_pool_dir: The directory holding the warm build directories of projects.
+    :vartype nxtool_pool_dir: Path
+    :ivar nxtool_bin_dir: The directory holding host tools built per nuttx revision.
+    :vartype nxtool_bin_dir: Path
+    :ivar nxtool_index_dir: The directory holding cached indexes of the nuttx tree.
+    :vartype nxtool_index_dir: Path
+    :ivar nxtool_boards_index: The path to the cached boards index (`boards.json`).
+    :vartype nxtool_boards_index: Path
+    :ivar nxtool_ccache_dir: The compiler cache directory shared by all projects.
+    :vartype nxtool_ccache_dir: Path
+    :ivar nxtool_logs_dir: The directory holding build and git logs.
+    :vartype nxtool_logs_dir: Path
+    :ivar nxtool_git_dir: The directory holding local mirrors of the remotes.
+    :vartype nxtool_git_dir: Path
+    :ivar nxtool_reports_dir: The directory holding per project build time history.
+    :vartype nxtool_reports_dir: Path
+    :ivar nxtool_sizes_dir: The directory holding per project firmware size history.
+    :vartype nxtool_sizes_dir: Path
+    :ivar nxtool_artifacts_dir: The content addressed cache of build outputs.
+    :vartype nxtool_artifacts_dir: Path
+    :ivar nxtool_worktrees_dir: The directory holding git worktrees of pinned revisions.
+    :vartype nxtool_worktrees_dir: Path
+    :ivar nxtool_socket: The Unix socket the workspace daemon listens on.
+    :vartype nxtool_socket: Path
+
+    This class organisez/manages the paths throughout the project.
+    - It holds only class attributes so there's no need for dependency injection pattern
+    - It is initialized by `setup`, before any command runs
+    """
+    nxtool_dir_name: ClassVar[Path] = Path()
+    nxtool_root: ClassVar[Path] = Path()
+    nxtool_config: ClassVar[Path] = Path()
+    nxtool_projects: ClassVar[Path] = Path()
+    nxtool_build_dir: ClassVar[Path] = Path()
+    nxtool_pool_dir: ClassVar[Path] = Path()
+    nxtool_bin_dir: ClassVar[Path] = Path()
+    nxtool_index_dir: ClassVar[Path] = Path()
+    nxtool_boards_index: ClassVar[Path] = Path()
+    nxtool_ccache_dir: ClassVar[Path] = Path()
+    nxtool_logs_dir: ClassVar[Path] = Path()
+    nxtool_git_dir: ClassVar[Path] = Path()
+    nxtool_reports_dir: ClassVar[Path] = Path()
+    nxtool_sizes_dir: ClassVar[Path] = Path()
+    nxtool_artifacts_dir: ClassVar[Path] = Path()
+    nxtool_worktrees_dir: ClassVar[Path] = Path()
+    nxtool_socket: ClassVar[Path] = Path()
+
+    @classmethod
+    def setup(cls, dir_name: Path = Path(".nxtool"), root: Path | None = None) -> None:
+        """
+        Resolve the workspace root and derive every other path from it.
+
+        :param dir_name: Name of the directory that marks the workspace root.
+        :type dir_name: Path
+        :param root: Workspace root already resolved by the caller.
+        :type root: Path | None
+        """
+        cls.nxtool_dir_name = dir_name
+        try:
+            cls.nxtool_root = root or topdir(dir_name)
+        except FileNotFoundError:
+            print("Workspace root not found")
+            cls.nxtool_root = Path(".")
+
+        nxdir: Path = cls.nxtool_root / cls.nxtool_dir_name
+        cls.nxtool_config = nxdir / "config.toml"
+        cls.nxtool_projects = nxdir / "projects.toml"
+        cls.nxtool_build_dir = nxdir / "build"
+        cls.nxtool_pool_dir = cls.nxtool_build_dir / "pool"
+        cls.nxtool_bin_dir = nxdir / "bin"
+        cls.nxtool_index_dir = nxdir / "index"
+        cls.nxtool_boards_index = cls.nxtool_index_dir / "boards.json"
+        cls.nxtool_ccache_dir = nxdir / "ccache"
+        cls.nxtool_logs_dir = nxdir / "logs"
+        cls.nxtool_git_dir = nxdir / "git"
+        cls.nxtool_reports_dir = nxdir / "reports"
+        cls.nxtool_sizes_dir = nxdir / "sizes"
+        cls.nxtool_artifacts_dir = nxdir / "artifacts"
+        cls.nxtool_worktrees_dir = nxdir / "worktrees"
+        cls.nxtool_socket = nxdir / "daemon.sock"
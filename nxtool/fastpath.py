@@ -0,0 +1,129 @@
+"""
+Fast path for the most frequently called commands.
+
+Shell prompts, completion helpers and scripts call a handful of argument-less
+commands over and over. Those are dispatched here without importing typer or
+any command module they do not need; everything else goes through `NxApp`.
+Project queries read projects.toml with `tomllib` and print what `InfoCmd`
+would, without loading the stores (toml, dataclasses).
+
+`info` queries are first sent to the workspace daemon when one is running
+(see `nxtool.cmd.daemon`), which answers them from already loaded stores.
+"""
+import os
+import sys
+
+from collections.abc import Callable
+from pathlib import Path
+
+from nxtool.config.paths import PathsStore
+from nxtool.utils.topdir import topdir
+
+def show_topdir() -> None:
+    """
+    show workspace topdir
+    """
+    print(f"workspace topdir: {PathsStore.nxtool_root}")
+
+def _projects() -> tuple[dict[str, dict], str | None] | None:
+    """
+    Projects by name and current project name, like `ProjectStore` loads
+    them. `None` if projects.toml is missing or invalid, the store reports it.
+    """
+    import tomllib
+
+    try:
+        with open(PathsStore.nxtool_projects, 'rb') as file:
+            data: dict = tomllib.load(file)
+        projects: dict[str, dict] = {p["name"]: p for p in data.get("projects", [])}
+        return projects, data["current"]["name"] if projects else None
+    except (OSError, tomllib.TOMLDecodeError, KeyError, TypeError):
+        return None
+
+def _repr(project: dict | None) -> str:
+    # Same text as the `ProjectInstance` dataclass repr
+    if project is None:
+        return "None"
+    return (
+        f"ProjectInstance(name={project['name']!r}, config={project['config']!r}, "
+        f"opts={project.get('opts', {})!r})"
+    )
+
+def _info_project() -> None:
+    loaded = _projects()
+    if loaded is None:
+        from nxtool.cmd.info import InfoCmd
+        InfoCmd().project()
+        return
+    projects, current = loaded
+    print(_repr(projects.get(current or "")))
+
+def _info_projects() -> None:
+    loaded = _projects()
+    if loaded is None:
+        from nxtool.cmd.info import InfoCmd
+        InfoCmd().projects()
+        return
+    print(f"[{', '.join(_repr(p) for p in loaded[0].values())}]")
+
+FAST_COMMANDS: dict[tuple[str, ...], Callable[[], None]] = {
+    ("topdir",): show_topdir,
+    ("info", "project"): _info_project,
+    ("info", "projects"): _info_projects,
+}
+
+def _daemon(argv: list[str]) -> bool:
+    """
+    Have the workspace daemon answer `argv`.
+
+    :return: `True` if the daemon answered, its output is printed.
+    :rtype: bool
+    """
+    if not PathsStore.nxtool_socket.exists():
+        return False
+
+    from nxtool.utils.daemon import request
+    reply = request(PathsStore.nxtool_socket, {"op": "run", "argv": argv})
+    if reply is None or reply.get("handled") is not True:
+        return False
+    sys.stdout.write(reply["out"])
+    sys.stdout.flush()
+    if reply["code"] != 0:
+        raise SystemExit(reply["code"])
+    return True
+
+def run(argv: list[str]) -> bool:
+    """
+    Run `argv` through the fast path if it is one of `FAST_COMMANDS` or an
+    `info` query the workspace daemon answers.
+
+    :param argv: Command line arguments, without the program name.
+    :type argv: list[str]
+    :return: `True` if the command was handled, `False` if the full cli is needed.
+    :rtype: bool
+    """
+    # Completion requests must reach click
+    if "_NXTOOL_COMPLETE" in os.environ:
+        return False
+
+    cmd: Callable[[], None] | None = FAST_COMMANDS.get(tuple(argv))
+    query: bool = argv[:1] == ["info"]
+    if cmd is None and query is False:
+        return False
+
+    root: Path | None
+    try:
+        root = topdir(Path(".nxtool"))
+    except FileNotFoundError:
+        root = None
+    # Only a daemon can answer other queries, outside a workspace there is none
+    if cmd is None and root is None:
+        return False
+
+    PathsStore.setup(root=root)
+    if query is True and _daemon(argv) is True:
+        return True
+    if cmd is None:
+        return False
+    cmd()
+    return True
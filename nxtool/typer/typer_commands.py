@@ -1,12 +1,73 @@
+from pathlib import Path
 from typing_extensions import Annotated
 
 import typer
 
-from nxtool.config.configuration import *
-from nxtool.cmd.info import InfoCmd
-from nxtool.cmd.project import ProjectCmd
-from nxtool.cmd.workspace import WorkspaceCmd
-from nxtool.cmd.build import BuildCmd
+from nxtool.fastpath import show_topdir
+
+# Command modules are imported inside the commands that use them, so only the
+# invoked command pays for its imports and for loading its stores
+
+def _runner(output: str, log: bool):
+    """
+    Process runner for the --output / --log options.
+    """
+    from nxtool.config.configuration import ConfigStore
+    from nxtool.config.paths import PathsStore
+    from nxtool.utils.fs import parse_size
+    from nxtool.utils.process import ProcessRunner
+
+    if output not in ("stream", "quiet", "summary"):
+        raise typer.BadParameter("expected one of stream, quiet, summary", param_hint="--output")
+    if log is False:
+        return ProcessRunner(mode=output)  # type: ignore[arg-type]
+    opts = ConfigStore().logs
+    try:
+        quota: int | None = parse_size(opts["quota"]) if opts.get("quota") else None
+    except ValueError as e:
+        raise typer.BadParameter(f"logs quota in config.toml: {e}", param_hint="--log")
+    return ProcessRunner(
+        mode=output,  # type: ignore[arg-type]
+        log_dir=PathsStore.nxtool_logs_dir,
+        log_keep=opts.get("keep"),
+        log_quota=quota
+    )
+
+OutputOpt = Annotated[
+    str,
+    typer.Option(
+        "--output",
+        "-o",
+        help="tool output: stream, quiet or summary"
+    )
+]
+
+LogOpt = Annotated[
+    bool,
+    typer.Option(
+        "--log",
+        help="also write timestamped tool output to .nxtool/logs"
+    )
+]
+
+FormatOpt = Annotated[
+    str,
+    typer.Option(
+        "--format",
+        "-f",
+        help="output format: text, json, jsonl or tsv"
+    )
+]
+
+def _format(fmt: str):
+    """
+    Validated --format option.
+    """
+    from nxtool.utils.output import FORMATS
+
+    if fmt not in FORMATS:
+        raise typer.BadParameter(f"expected one of {', '.join(FORMATS)}", param_hint="--format")
+    return fmt
 
 build = typer.Typer()
 
@@ -20,20 +81,77 @@ def build_cb(
             "-r",
             help="rerun configuration"
         )
-    ] = False
+    ] = False,
+    force: Annotated[
+        bool,
+        typer.Option(
+            "--force",
+            "-f",
+            help="run configuration even if nothing changed"
+        )
+    ] = False,
+    build_all: Annotated[
+        bool,
+        typer.Option(
+            "--all",
+            "-a",
+            help="build all workspace projects concurrently"
+        )
+    ] = False,
+    projects: Annotated[
+        str | None,
+        typer.Option(
+            "--projects",
+            "-p",
+            help="comma separated list of projects to build concurrently"
+        )
+    ] = None,
+    jobs: Annotated[
+        int | None,
+        typer.Option(
+            "--jobs",
+            "-j",
+            help="global job budget shared by all builds, defaults to cpu count"
+        )
+    ] = None,
+    parallel: Annotated[
+        int | None,
+        typer.Option(
+            "--parallel",
+            help="number of projects built at the same time"
+        )
+    ] = None,
+    output: OutputOpt = "stream",
+    log: LogOpt = False,
 ):
     """
     sub-command to interact with nuttx build systems
     """
     if ctx.invoked_subcommand is None:
+        if build_all is True or projects is not None:
+            from nxtool.cmd.build import BuildAllCmd
+            try:
+                names: list[str] | None = (
+                    None if build_all is True
+                    else [p.strip() for p in projects.split(",") if p.strip()]
+                )
+                success: bool = BuildAllCmd(names, _runner(output, log)).build(jobs, parallel)
+            except RuntimeError as e:
+                print(e)
+                success = False
+            if success is False:
+                raise typer.Exit(1)
+            return
+
         try:
-            build: BuildCmd = BuildCmd()
-            if reconfig is True:
-                build.config()
-                return
-            build.build()
+            from nxtool.cmd.build import BuildCmd
+            build: BuildCmd = BuildCmd(_runner(output, log))
+            ret: int = build.config(force=force) if reconfig is True else build.build()
         except RuntimeError as e:
             print(e)
+            raise typer.Exit(1)
+        if ret != 0:
+            raise typer.Exit(ret)
 
 @build.command(name="change")
 def change(
@@ -41,9 +159,310 @@ def change(
         str,
         typer.Argument()
     ],
+    force: Annotated[
+        bool,
+        typer.Option(
+            "--force",
+            "-f",
+            help="run configuration even if nothing changed"
+        )
+    ] = False,
+    output: OutputOpt = "stream",
+    log: LogOpt = False,
+) -> None:
+    from nxtool.cmd.build import BuildCmd
+    try:
+        build: BuildCmd = BuildCmd(_runner(output, log))
+        ret: int = build.config(config, force)
+    except RuntimeError as e:
+        print(e)
+        raise typer.Exit(1)
+    if ret != 0:
+        raise typer.Exit(ret)
+
+@build.command(name="report")
+def report(
+    project: Annotated[
+        str | None,
+        typer.Option(
+            "--project",
+            "-p",
+            help="project to report on, defaults to the current one"
+        )
+    ] = None,
+    top: Annotated[
+        int,
+        typer.Option(
+            "--top",
+            "-n",
+            help="number of slowest steps shown"
+        )
+    ] = 10,
+) -> None:
+    """
+    show where the last build spent its time
+    """
+    from nxtool.cmd.report import ReportCmd
+    try:
+        cmd: ReportCmd = ReportCmd(project)
+        cmd.report(top)
+    except RuntimeError as e:
+        print(e)
+        raise typer.Exit(1)
+
+@build.command(name="size")
+def size(
+    project: Annotated[
+        str | None,
+        typer.Option(
+            "--project",
+            "-p",
+            help="project to measure, defaults to the current one"
+        )
+    ] = None,
+    diff: Annotated[
+        str | None,
+        typer.Option(
+            "--diff",
+            "-d",
+            help="compare with another project, or with the Nth previous build as @N"
+        )
+    ] = None,
+    top: Annotated[
+        int,
+        typer.Option(
+            "--top",
+            "-n",
+            help="number of objects, libraries or symbols shown"
+        )
+    ] = 10,
 ) -> None:
-    build: BuildCmd = BuildCmd()
-    build.config(config)
+    """
+    show the firmware footprint of the last build
+    """
+    from nxtool.cmd.size import SizeCmd
+    try:
+        cmd: SizeCmd = SizeCmd(project)
+        cmd.size(diff, top)
+    except RuntimeError as e:
+        print(e)
+        raise typer.Exit(1)
+
+@build.command(name="tools")
+def build_tools(
+    force: Annotated[
+        bool,
+        typer.Option(
+            "--force",
+            "-f",
+            help="rebuild even if this nuttx revision was already built"
+        )
+    ] = False,
+    jobs: Annotated[
+        int | None,
+        typer.Option(
+            "--jobs",
+            "-j",
+            help="parallel jobs"
+        )
+    ] = None,
+    output: OutputOpt = "stream",
+    log: LogOpt = False,
+) -> None:
+    """
+    build the nuttx host tools shared by all make builds into .nxtool/bin, cmake builds build their own
+    """
+    from nxtool.utils.hosttools import HostTools
+    tools: HostTools = HostTools(runner=_runner(output, log))
+    if tools.ensure(force, jobs) is False:
+        raise typer.Exit(1)
+
+@build.command(name="affected")
+def affected(
+    since: Annotated[
+        str,
+        typer.Option(
+            "--since",
+            "-s",
+            help="revision the change is compared with, e.g. origin/master"
+        )
+    ],
+    apps_since: Annotated[
+        str | None,
+        typer.Option(
+            "--apps-since",
+            help="revision apps is compared with, defaults to --since"
+        )
+    ] = None,
+    jobs: Annotated[
+        int | None,
+        typer.Option(
+            "--jobs",
+            "-j",
+            help="parallel jobs resolving configurations, defaults to cpu count"
+        )
+    ] = None,
+    fmt: FormatOpt = "text",
+) -> None:
+    """
+    list the board configurations a change can affect, a list file for build matrix
+    """
+    from nxtool.cmd.affected import AffectedCmd
+    try:
+        cmd: AffectedCmd = AffectedCmd(jobs)
+        cmd.affected(since, apps_since, _format(fmt))
+    except RuntimeError as e:
+        print(e)
+        raise typer.Exit(1)
+
+@build.command(name="compdb")
+def compdb() -> None:
+    """
+    refresh the workspace compile_commands.json and include graphs from all projects
+    """
+    from nxtool.utils.compdb import WorkspaceIndex
+    index: WorkspaceIndex = WorkspaceIndex()
+    if index.update() is True:
+        print(f"{index.merged} updated")
+
+@build.command(name="diagnostics")
+def diagnostics(
+    pattern: Annotated[
+        str | None,
+        typer.Argument(
+            help="board:config glob, e.g. 'sim:*', defaults to all built configurations"
+        )
+    ] = None,
+    top: Annotated[
+        int,
+        typer.Option(
+            "--top",
+            "-n",
+            help="number of distinct diagnostics shown"
+        )
+    ] = 10,
+    fmt: FormatOpt = "text",
+) -> None:
+    """
+    show compiler warnings and errors of the last build of every configuration
+    """
+    from nxtool.cmd.diagnostics import DiagnosticsCmd
+    try:
+        cmd: DiagnosticsCmd = DiagnosticsCmd()
+        cmd.show(pattern, top, _format(fmt))
+    except RuntimeError as e:
+        print(e)
+        raise typer.Exit(1)
+
+@build.command(name="matrix")
+def matrix(
+    targets: Annotated[
+        str,
+        typer.Argument(
+            help="list file or pattern of board:config targets, e.g. 'sim:*' or '/arm/stm32/*'"
+        )
+    ],
+    jobs: Annotated[
+        int | None,
+        typer.Option(
+            "--jobs",
+            "-j",
+            help="global job budget shared by all builds, defaults to cpu count"
+        )
+    ] = None,
+    parallel: Annotated[
+        int | None,
+        typer.Option(
+            "--parallel",
+            help="number of targets built at the same time"
+        )
+    ] = None,
+    timeout: Annotated[
+        float | None,
+        typer.Option(
+            "--timeout",
+            "-t",
+            help="seconds a single target may take to configure and build"
+        )
+    ] = None,
+    resume: Annotated[
+        bool,
+        typer.Option(
+            "--resume",
+            help="skip targets that passed at the same nuttx and apps revisions"
+        )
+    ] = False,
+    shard: Annotated[
+        str | None,
+        typer.Option(
+            "--shard",
+            help="build only shard i of n (e.g. 2/4), balanced by recorded build durations"
+        )
+    ] = None,
+    history: Annotated[
+        Path | None,
+        typer.Option(
+            "--history",
+            help="results file balancing the shards, must be the same for all of them"
+        )
+    ] = None,
+    output: OutputOpt = "quiet",
+    log: LogOpt = False,
+) -> None:
+    """
+    build many board configurations, printing a JSON line per finished target
+    """
+    from nxtool.cmd.matrix import MatrixCmd, parse_shard
+    try:
+        selected: tuple[int, int] | None = None if shard is None else parse_shard(shard)
+    except ValueError as e:
+        raise typer.BadParameter(f"{e}", param_hint="--shard")
+    try:
+        cmd: MatrixCmd = MatrixCmd(
+            targets, _runner(output, log), shard=selected, history=history
+        )
+        success: bool = cmd.build(jobs, parallel, timeout, resume)
+    except RuntimeError as e:
+        print(e)
+        success = False
+    if success is False:
+        raise typer.Exit(1)
+
+@build.command(name="merge")
+def merge(
+    results: Annotated[
+        list[Path],
+        typer.Argument(
+            help="results files of the shards of a matrix build"
+        )
+    ],
+    into: Annotated[
+        Path | None,
+        typer.Option(
+            "--into",
+            help="merged results file, defaults to .nxtool/build/matrix/results.jsonl"
+        )
+    ] = None,
+) -> None:
+    """
+    merge the results of matrix build shards, the history of the next sharded run
+    """
+    from nxtool.cmd.matrix import merge_results
+    from nxtool.config.paths import PathsStore
+    try:
+        summary = merge_results(
+            results, into or PathsStore.nxtool_build_dir / "matrix" / "results.jsonl"
+        )
+    except RuntimeError as e:
+        print(e)
+        raise typer.Exit(1)
+
+    counts: str = ", ".join(f"{k} {v}" for k, v in sorted(summary["status"].items()))
+    print(f"merged {summary['targets']} targets: {counts or 'none'}")
+    if summary["missing_shards"]:
+        print(f"missing shards: {', '.join(str(i) for i in summary['missing_shards'])}")
+    if summary["missing_shards"] or set(summary["status"]) - {"pass"}:
+        raise typer.Exit(1)
 
 workspace = typer.Typer()
 
@@ -60,13 +479,51 @@ def workspace_cb(
 
 @workspace.command(name="init")
 def init() -> None:
+    from nxtool.cmd.workspace import WorkspaceCmd
     cmd: WorkspaceCmd = WorkspaceCmd()
     cmd.init()
 
 @workspace.command(name="update")
-def update() -> None:
+def update(
+    jobs: Annotated[
+        int | None,
+        typer.Option(
+            "--jobs",
+            "-j",
+            help="remotes updated at the same time"
+        )
+    ] = None,
+    depth: Annotated[
+        int | None,
+        typer.Option(
+            "--depth",
+            help="shallow clone/fetch with this many commits"
+        )
+    ] = None,
+    filter: Annotated[
+        str | None,
+        typer.Option(
+            "--filter",
+            help="partial clone filter, e.g. blob:none"
+        )
+    ] = None,
+    mirror: Annotated[
+        bool | None,
+        typer.Option(
+            "--mirror/--no-mirror",
+            help="clone with --reference to bare mirrors kept in .nxtool/git"
+        )
+    ] = None,
+    output: OutputOpt = "stream",
+    log: LogOpt = False,
+) -> None:
+    """
+    clone missing remotes and fetch existing ones
+    """
+    from nxtool.cmd.workspace import WorkspaceCmd
     cmd: WorkspaceCmd = WorkspaceCmd()
-    cmd.update()
+    if cmd.update(jobs, depth, filter, mirror, _runner(output, log)) is False:
+        raise typer.Exit(1)
 
 info = typer.Typer()
 
@@ -77,36 +534,188 @@ def info_cb():
     """
 
 @info.command(name="boards")
-def list_boards():
+def list_boards(
+    match: Annotated[
+        str | None,
+        typer.Option(
+            "--match",
+            "-m",
+            help="fuzzy search of board and configuration names, best matches first"
+        )
+    ] = None,
+    limit: Annotated[
+        int | None,
+        typer.Option(
+            "--limit",
+            "-n",
+            help="maximum number of matches shown"
+        )
+    ] = None,
+    fmt: FormatOpt = "text",
+):
     """
     list all boards and configurations
     """
+    from nxtool.cmd.info import InfoCmd
     prj: InfoCmd = InfoCmd()
-    prj.boards()
+    prj.boards(_format(fmt), match, limit)
 
 @info.command(name="projects")
-def list_projectst():
+def list_projectst(
+    fmt: FormatOpt = "text",
+):
     """
     list all workspace projects
     """
+    from nxtool.cmd.info import InfoCmd
     prj: InfoCmd = InfoCmd()
-    prj.projects()
+    prj.projects(_format(fmt))
 
 @info.command(name="project")
-def list_current_project():
+def list_current_project(
+    fmt: FormatOpt = "text",
+):
     """
     list current project
     """
+    from nxtool.cmd.info import InfoCmd
     prj: InfoCmd = InfoCmd()
-    prj.project()
+    prj.project(_format(fmt))
 
 @info.command(name="tools")
-def list_tools():
+def list_tools(
+    fmt: FormatOpt = "text",
+):
     """
-    list nuttx tools
+    list nuttx host tools shared by make builds and their build state
     """
+    from nxtool.cmd.info import InfoCmd
     prj: InfoCmd = InfoCmd()
-    prj.tools()
+    prj.tools(_format(fmt))
+
+@info.command(name="configs")
+def list_configs(
+    with_syms: Annotated[
+        list[str] | None,
+        typer.Option(
+            "--with",
+            "-w",
+            help="symbol the configuration must enable, repeatable"
+        )
+    ] = None,
+    without_syms: Annotated[
+        list[str] | None,
+        typer.Option(
+            "--without",
+            "-W",
+            help="symbol the configuration must not enable, repeatable"
+        )
+    ] = None,
+    resolved: Annotated[
+        bool,
+        typer.Option(
+            "--resolved",
+            help="match fully resolved configurations instead of defconfig lines"
+        )
+    ] = False,
+    rebuild: Annotated[
+        bool,
+        typer.Option(
+            "--rebuild",
+            help="rebuild the symbol index from scratch"
+        )
+    ] = False,
+    jobs: Annotated[
+        int | None,
+        typer.Option(
+            "--jobs",
+            "-j",
+            help="workers resolving configurations"
+        )
+    ] = None,
+    fmt: FormatOpt = "text",
+):
+    """
+    list board configurations by enabled Kconfig symbols
+    """
+    from nxtool.cmd.info import InfoCmd
+    try:
+        prj: InfoCmd = InfoCmd()
+        prj.configs(with_syms, without_syms, resolved, rebuild, jobs, _format(fmt))
+    except RuntimeError as e:
+        print(e)
+        raise typer.Exit(1)
+
+@info.command(name="builddirs")
+def list_builddirs(
+    fmt: FormatOpt = "text",
+):
+    """
+    list warm build directories with their size and last use
+    """
+    from nxtool.cmd.info import InfoCmd
+    prj: InfoCmd = InfoCmd()
+    prj.builddirs(_format(fmt))
+
+@info.command(name="artifacts")
+def show_artifacts(
+    fmt: FormatOpt = "text",
+):
+    """
+    show the size of the build artifact cache
+    """
+    from nxtool.cmd.info import InfoCmd
+    prj: InfoCmd = InfoCmd()
+    prj.artifacts(_format(fmt))
+
+@info.command(name="worktrees")
+def list_worktrees(
+    fmt: FormatOpt = "text",
+):
+    """
+    list the git worktrees of revisions pinned by projects
+    """
+    from nxtool.cmd.info import InfoCmd
+    prj: InfoCmd = InfoCmd()
+    prj.worktrees(_format(fmt))
+
+@info.command(name="includes")
+def list_includes(
+    header: Annotated[
+        str,
+        typer.Argument(help="header path, or its trailing part such as nuttx/sched.h")
+    ],
+    fmt: FormatOpt = "text",
+):
+    """
+    list the projects and translation units including a header
+    """
+    from nxtool.cmd.info import InfoCmd
+    try:
+        prj: InfoCmd = InfoCmd()
+        prj.includes(header, _format(fmt))
+    except RuntimeError as e:
+        print(e)
+        raise typer.Exit(1)
+
+@info.command(name="cache")
+def show_cache(
+    zero: Annotated[
+        bool,
+        typer.Option(
+            "--zero",
+            "-z",
+            help="reset statistics after showing them"
+        )
+    ] = False,
+    fmt: FormatOpt = "text",
+):
+    """
+    show compiler cache statistics
+    """
+    from nxtool.cmd.info import InfoCmd
+    prj: InfoCmd = InfoCmd()
+    prj.cache(zero, _format(fmt))
 
 project = typer.Typer()
 
@@ -118,6 +727,7 @@ def cb(
     sub-command to manage projects
     """
     if ctx.invoked_subcommand is None:
+        from nxtool.cmd.project import ProjectCmd
         cmd: ProjectCmd = ProjectCmd()
         print(cmd.prj.current)
 
@@ -128,6 +738,7 @@ def switch(
         typer.Argument()
     ],
 ):
+    from nxtool.cmd.project import ProjectCmd
     cmd: ProjectCmd = ProjectCmd()
     cmd.set_project(project)
 
@@ -153,6 +764,7 @@ def add(
     """
     Add a new project with a specified configuration.
     """
+    from nxtool.cmd.project import ProjectCmd
     cmd: ProjectCmd = ProjectCmd()
     cmd.add(project, config)
 
@@ -169,6 +781,7 @@ def remove(
     """
     Remove an existing project by name.
     """
+    from nxtool.cmd.project import ProjectCmd
     project: ProjectCmd = ProjectCmd()
     project.remove(name)
 
@@ -182,16 +795,144 @@ def setopt(
     """
     Set optional project configuration parameters
     """
+    from nxtool.cmd.project import ProjectCmd
+    cmd: ProjectCmd = ProjectCmd()
+    if cmd.setopts(opt) is False:
+        raise typer.Exit(1)
+
+@project.command(name="unset")
+def unsetopt(
+    key: Annotated[
+        str,
+        typer.Argument()
+    ],
+):
+    """
+    Unset an optional project configuration parameter
+    """
+    from nxtool.cmd.project import ProjectCmd
     cmd: ProjectCmd = ProjectCmd()
-    cmd.setopts(opt)
+    cmd.unsetopts(key)
+
+configs = typer.Typer()
+
+@configs.callback()
+def configs_cb():
+    """
+    sub-command to check and refresh board defconfigs with kconfiglib
+    """
+
+PatternArg = Annotated[
+    str | None,
+    typer.Argument(help="glob over board:config names, e.g. 'stm32*:nsh', all by default")
+]
+
+ConfigJobsOpt = Annotated[
+    int | None,
+    typer.Option(
+        "--jobs",
+        "-j",
+        help="worker processes, defaults to the number of cpus"
+    )
+]
+
+@configs.command(name="check")
+def configs_check(
+    pattern: PatternArg = None,
+    jobs: ConfigJobsOpt = None,
+    fmt: FormatOpt = "text",
+):
+    """
+    report unknown symbols, unmet dependencies and stale defconfigs
+    """
+    from nxtool.cmd.configs import ConfigsCmd
+    try:
+        cmd: ConfigsCmd = ConfigsCmd()
+        ok: bool = cmd.check(pattern, jobs, _format(fmt))
+    except RuntimeError as e:
+        print(e)
+        raise typer.Exit(1)
+    if ok is False:
+        raise typer.Exit(1)
+
+@configs.command(name="refresh")
+def configs_refresh(
+    pattern: PatternArg = None,
+    jobs: ConfigJobsOpt = None,
+    dry_run: Annotated[
+        bool,
+        typer.Option(
+            "--dry-run",
+            "-n",
+            help="only list the defconfigs that would be written"
+        )
+    ] = False,
+    fmt: FormatOpt = "text",
+):
+    """
+    rewrite defconfigs the way make savedefconfig does, without configuring
+    """
+    from nxtool.cmd.configs import ConfigsCmd
+    try:
+        cmd: ConfigsCmd = ConfigsCmd()
+        ok: bool = cmd.refresh(pattern, jobs, dry_run, _format(fmt))
+    except RuntimeError as e:
+        print(e)
+        raise typer.Exit(1)
+    if ok is False:
+        raise typer.Exit(1)
+
+daemon = typer.Typer()
+
+@daemon.callback()
+def daemon_cb():
+    """
+    sub-command to manage the workspace daemon answering info queries
+    """
+
+def _daemon_cmd(action: str) -> None:
+    from nxtool.cmd.daemon import DaemonCmd
+    try:
+        getattr(DaemonCmd(), action)()
+    except RuntimeError as e:
+        print(e)
+        raise typer.Exit(1)
+
+@daemon.command(name="start")
+def daemon_start():
+    """
+    start the daemon in the background
+    """
+    _daemon_cmd("start")
+
+@daemon.command(name="stop")
+def daemon_stop():
+    """
+    stop the running daemon
+    """
+    _daemon_cmd("stop")
+
+@daemon.command(name="status")
+def daemon_status():
+    """
+    show whether the daemon runs and how much it served
+    """
+    _daemon_cmd("status")
+
+@daemon.command(name="run")
+def daemon_run():
+    """
+    run the daemon in the foreground
+    """
+    _daemon_cmd("run")
 
 def configure_typer(cli: typer.Typer) -> None:
     cli.add_typer(workspace, name="workspace")
     cli.add_typer(info, name="info")
     cli.add_typer(project, name="project")
     cli.add_typer(build, name="build")
+    cli.add_typer(configs, name="configs")
+    cli.add_typer(daemon, name="daemon")
 
-    @cli.command(name="topdir")
-    def show_topdir() -> None:
-        print(f"workspace topdir: {PathsStore.nxtool_root}")
+    cli.command(name="topdir")(show_topdir)
     
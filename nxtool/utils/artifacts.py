@@ -0,0 +1,297 @@
+"""
+Content addressed cache of firmware build outputs.
+
+A successful build stores its outputs (nuttx, nuttx.bin, nuttx.hex, maps)
+under .nxtool/artifacts, keyed by everything that decides them:
+
+- the resolved .config of the build
+- the toolchain identity, see `Builder.toolchain`
+- the git tree hashes of the nuttx and apps checkouts
+
+A later build with the same key, after a fullclean, in another build
+directory or on another branch with the same sources, copies the outputs
+back instead of compiling. Checkouts with uncommitted changes have no tree
+hash describing them, their builds bypass the cache.
+
+Files are stored once by content in objects/, every key has a small manifest
+in entries/ whose mtime is its last use. The cache is bounded by the
+`[artifacts] quota` of the workspace config, least recently used entries are
+evicted first.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+
+from pathlib import Path
+from typing import Any
+
+from nxtool.config.configuration import ConfigStore, PathsStore
+from nxtool.utils.builders import Builder
+from nxtool.utils.fs import atomic_write, file_lock, parse_size
+
+# Outputs stored when present, "nuttx" is required
+ARTIFACTS: tuple[str, ...] = (
+    "nuttx", "nuttx.bin", "nuttx.hex", "nuttx.srec", "nuttx.map", "System.map",
+)
+
+DEFAULT_QUOTA: str = "5G"
+
+def tree_hash(repo: Path) -> str | None:
+    """
+    Git tree hash of the HEAD of `repo`.
+
+    :return: The hash, `None` if `repo` is not a git checkout or has
+        uncommitted changes (untracked files included).
+    :rtype: str | None
+    """
+    try:
+        status: subprocess.CompletedProcess = subprocess.run(
+            ["git", "-C", f"{repo}", "status", "--porcelain", "--untracked-files=normal"],
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, check=True
+        )
+        if status.stdout.strip():
+            return None
+        return subprocess.run(
+            ["git", "-C", f"{repo}", "rev-parse", "HEAD^{tree}"],
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, check=True, text=True
+        ).stdout.strip() or None
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+class ArtifactCache():
+    """
+    Cache of build outputs shared by every build of the workspace.
+
+    Attributes:
+        enabled (bool): Whether builds go through the cache.
+        quota (int | None): Size allowed for the cache in bytes, `None` for no limit.
+    """
+    def __init__(self, quota: int | None = None):
+        """
+        :param quota: Size allowed for the cache in bytes, defaults to the
+            workspace config.
+        :type quota: int | None
+        """
+        opts = ConfigStore().artifacts
+        self.enabled: bool = opts.get("enabled", True) is True
+        if quota is None:
+            size: str = opts.get("quota", DEFAULT_QUOTA)
+            try:
+                quota = parse_size(size) if size else None
+            except ValueError:
+                print(f"Invalid artifacts quota '{size}', eviction disabled")
+        self.quota: int | None = quota or None
+        self.root: Path = PathsStore.nxtool_artifacts_dir
+        self.objects: Path = self.root / "objects"
+        self.entries: Path = self.root / "entries"
+
+    @staticmethod
+    def sources(builder: Builder) -> dict[str, str] | None:
+        """
+        Source identity of a build, `None` if a checkout has uncommitted changes.
+        """
+        nuttx: str | None = tree_hash(builder.source)
+        apps: str | None = tree_hash(builder.source.parent / "apps")
+        if nuttx is None or apps is None:
+            return None
+        return {"nuttx": nuttx, "apps": apps}
+
+    @staticmethod
+    def key(builder: Builder, sources: dict[str, str]) -> str | None:
+        """
+        Cache key of the outputs of a configured build.
+
+        :param builder: The build, its .config is read from the output directory.
+        :type builder: Builder
+        :param sources: Source identity, see `sources`.
+        :type sources: dict[str, str]
+        :return: The key, `None` if the build is not configured.
+        :rtype: str | None
+        """
+        try:
+            config: bytes = (builder.output_dir / ".config").read_bytes()
+        except OSError:
+            return None
+        return hashlib.sha256(json.dumps({
+            "config": hashlib.sha256(config).hexdigest(),
+            "toolchain": builder.toolchain(),
+            "builder": type(builder).__name__,
+            "sources": sources,
+        }, sort_keys=True).encode('utf-8')).hexdigest()
+
+    def _object(self, digest: str) -> Path:
+        return self.objects / digest[:2] / digest
+
+    def restore(self, key: str, dest: Path) -> bool:
+        """
+        Copy the outputs stored under `key` to `dest`.
+
+        Restores share the cache lock, so no eviction removes the files being
+        copied.
+
+        :return: `True` on a hit.
+        :rtype: bool
+        """
+        entry: Path = self.entries / f"{key}.json"
+        try:
+            with file_lock(self.root / "cache", shared=True):
+                files: dict[str, list[Any]] = json.loads(
+                    entry.read_text(encoding='utf-8')
+                )["files"]
+                for name in ARTIFACTS:
+                    # Left over from another configuration
+                    if name not in files:
+                        (dest / name).unlink(missing_ok=True)
+                for name, (digest, mode) in files.items():
+                    fd, tmp = tempfile.mkstemp(dir=dest, prefix=f".{name}.", suffix=".tmp")
+                    os.close(fd)
+                    try:
+                        shutil.copyfile(self._object(digest), tmp)
+                        os.chmod(tmp, mode)
+                        os.replace(tmp, dest / name)
+                    except BaseException:
+                        Path(tmp).unlink(missing_ok=True)
+                        raise
+                # Most recently used now, before any eviction can see it
+                os.utime(entry)
+        except (OSError, ValueError, KeyError):
+            # Missing or damaged, build instead
+            return False
+        return True
+
+    def store(self, key: str, src: Path) -> bool:
+        """
+        Store the outputs found in `src` under `key`, then evict above the quota.
+
+        :return: `True` if the outputs were stored.
+        :rtype: bool
+        """
+        if not (src / "nuttx").is_file():
+            return False
+
+        self.root.mkdir(parents=True, exist_ok=True)
+        with file_lock(self.root / "cache"):
+            files: dict[str, list[Any]] = {}
+            try:
+                for name in ARTIFACTS:
+                    path: Path = src / name
+                    if not path.is_file():
+                        continue
+                    digest: str = hashlib.sha256(path.read_bytes()).hexdigest()
+                    obj: Path = self._object(digest)
+                    if not obj.exists():
+                        obj.parent.mkdir(parents=True, exist_ok=True)
+                        fd, tmp = tempfile.mkstemp(dir=obj.parent, prefix=".", suffix=".tmp")
+                        os.close(fd)
+                        shutil.copyfile(path, tmp)
+                        os.replace(tmp, obj)
+                    files[name] = [digest, path.stat().st_mode & 0o777]
+
+                self.entries.mkdir(parents=True, exist_ok=True)
+                atomic_write(self.entries / f"{key}.json", json.dumps({
+                    "time": int(time.time()), "files": files,
+                }))
+            except OSError as e:
+                print(f"Cannot store build outputs in the artifact cache: {e}")
+                return False
+            self._evict(keep=key)
+        return True
+
+    def evict(self) -> None:
+        """
+        Remove the least recently used entries while the cache exceeds its
+        quota, then the files no entry refers to anymore.
+        """
+        self.root.mkdir(parents=True, exist_ok=True)
+        with file_lock(self.root / "cache"):
+            self._evict()
+
+    def _evict(self, keep: str | None = None) -> None:
+        entries: list[tuple[float, Path, set[str]]] = []
+        kept: list[set[str]] = []
+        for path in self.entries.glob("*.json"):
+            try:
+                data: dict[str, Any] = json.loads(path.read_text(encoding='utf-8'))
+                digests: set[str] = {f[0] for f in data["files"].values()}
+                if path.stem == keep:
+                    kept.append(digests)
+                else:
+                    entries.append((path.stat().st_mtime, path, digests))
+            except (OSError, ValueError, KeyError):
+                path.unlink(missing_ok=True)
+
+        sizes: dict[str, int] = {
+            obj.name: obj.stat().st_size
+            for obj in self.objects.glob("*/*") if not obj.name.startswith(".")
+        }
+
+        # Number of entries referring to every object
+        refs: dict[str, int] = {}
+        for digests in kept + [e[2] for e in entries]:
+            for digest in digests:
+                refs[digest] = refs.get(digest, 0) + 1
+
+        total: int = sum(sizes.get(digest, 0) for digest in refs)
+        entries.sort(key=lambda e: e[0])
+        evicted: int = 0
+        while self.quota is not None and total > self.quota and evicted < len(entries):
+            _, path, digests = entries[evicted]
+            evicted += 1
+            path.unlink(missing_ok=True)
+            for digest in digests:
+                refs[digest] -= 1
+                if refs[digest] == 0:
+                    del refs[digest]
+                    total -= sizes.get(digest, 0)
+            print(f"removing least recently used build outputs {path.stem[:12]}")
+
+        for digest in sizes.keys() - refs.keys():
+            self._object(digest).unlink(missing_ok=True)
+
+    def usage(self) -> tuple[int, int]:
+        """
+        Number of entries and size of the stored files in bytes.
+        """
+        entries: int = len(list(self.entries.glob("*.json")))
+        size: int = sum(
+            p.stat().st_size for p in self.objects.glob("*/*") if not p.name.startswith(".")
+        )
+        return entries, size
+
+    def build(self, builder: Builder, jobs: int | None = None) -> int:
+        """
+        Restore the outputs of a configured build from the cache, or build
+        them and store them.
+
+        :param builder: The build.
+        :type builder: Builder
+        :param jobs: Parallel jobs of the build.
+        :type jobs: int | None
+        :return: The build tool return code, 0 on a hit.
+        :rtype: int
+        """
+        if self.enabled is False:
+            return builder.build(jobs=jobs)
+
+        sources: dict[str, str] | None = self.sources(builder)
+        if sources is None:
+            return builder.build(jobs=jobs)
+
+        key: str | None = self.key(builder, sources)
+        if key is not None and self.restore(key, builder.output_dir):
+            if builder.runner.mode == "stream":
+                print(f"{builder.runner.prefix}build outputs restored from the artifact cache")
+            return 0
+
+        ret: int = builder.build(jobs=jobs)
+        if ret == 0:
+            # The build may have updated .config
+            key = self.key(builder, sources)
+            if key is not None:
+                self.store(key, builder.output_dir)
+        return ret
@@ -0,0 +1,167 @@
+"""
+Warm build directories.
+
+Every project keeps one build directory per configuration and compiler under
+.nxtool/build/pool (see `ProjectInstance.build_key`), so switching a project
+back to an earlier configuration continues incrementally instead of starting
+over. The pool is bounded by the `[builddirs] quota` of the workspace config,
+the least recently used directories are removed first. Directories a build is
+using, in any process, are never removed.
+"""
+
+import json
+import shutil
+import time
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from nxtool.config.configuration import ConfigStore, PathsStore, ProjectInstance
+from nxtool.utils.fs import (
+    atomic_write, disk_usage, file_lock, format_size, parse_size, try_lock, unlock
+)
+
+@dataclass
+class BuildDir():
+    """
+    A warm build directory of the pool.
+    """
+    key: str
+    last_used: float
+    size: int | None = None
+
+    @property
+    def path(self) -> Path:
+        return PathsStore.nxtool_pool_dir / self.key
+
+    @property
+    def project(self) -> str:
+        return self.key.partition("/")[0]
+
+class BuildDirPool():
+    """
+    Bookkeeping of the warm build directories.
+
+    Last use times and sizes are kept in .nxtool/build/pool.json. Directories
+    found in the pool but missing from it are adopted, entries whose directory
+    was removed are dropped.
+
+    `use` takes a shared lock on the directory, `<key>.lock` in the pool,
+    which is released by `update`. Eviction skips the directories it cannot
+    lock exclusively.
+    """
+    def __init__(self, quota: int | None = None):
+        """
+        :param quota: Disk space allowed for the pool in bytes, defaults to the
+            workspace config. `None` or 0 disables eviction.
+        :type quota: int | None
+        """
+        if quota is None:
+            size: str | None = ConfigStore().builddirs.get("quota")
+            try:
+                quota = parse_size(size) if size else None
+            except ValueError:
+                print(f"Invalid builddirs quota '{size}', eviction disabled")
+        self.quota: int | None = quota or None
+        self.index: Path = PathsStore.nxtool_build_dir / "pool.json"
+        # Locks of the directories in use by this process, by build key
+        self._held: dict[str, int] = {}
+
+    def _read(self) -> dict[str, BuildDir]:
+        data: dict[str, Any] = {}
+        try:
+            data = json.loads(self.index.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            pass
+
+        dirs: dict[str, BuildDir] = {}
+        for path in PathsStore.nxtool_pool_dir.glob("*/*"):
+            if not path.is_dir():
+                continue
+            key: str = path.relative_to(PathsStore.nxtool_pool_dir).as_posix()
+            entry: dict[str, Any] = data.get(key, {})
+            dirs[key] = BuildDir(
+                key, entry.get("last_used", path.stat().st_mtime), entry.get("size")
+            )
+        return dirs
+
+    def _write(self, dirs: dict[str, BuildDir]) -> None:
+        self.index.parent.mkdir(parents=True, exist_ok=True)
+        atomic_write(self.index, json.dumps({
+            d.key: {"last_used": d.last_used, "size": d.size} for d in dirs.values()
+        }))
+
+    def entries(self) -> list[BuildDir]:
+        """
+        All warm build directories, most recently used first.
+        """
+        return sorted(self._read().values(), key=lambda d: d.last_used, reverse=True)
+
+    def use(self, inst: ProjectInstance) -> Path:
+        """
+        Mark the build directory of a project as used now, and in use until
+        `update` is called with its build key.
+
+        :param inst: The project, its current configuration selects the directory.
+        :type inst: ProjectInstance
+        :return: The build directory, created if needed.
+        :rtype: Path
+        """
+        inst.build_dir.mkdir(parents=True, exist_ok=True)
+        with file_lock(self.index):
+            dirs: dict[str, BuildDir] = self._read()
+            entry: BuildDir = dirs.setdefault(inst.build_key, BuildDir(inst.build_key, 0.0))
+            entry.last_used = time.time()
+            self._write(dirs)
+            # Taken with the index locked, eviction holds it too
+            if inst.build_key not in self._held:
+                fd: int | None = try_lock(inst.build_dir, shared=True)
+                if fd is not None:
+                    self._held[inst.build_key] = fd
+        return inst.build_dir
+
+    def update(self, keys: list[str]) -> None:
+        """
+        Measure the directories that were just built in and evict the least
+        recently used other ones while the pool exceeds its quota. The
+        directories are no longer in use afterwards.
+
+        :param keys: Build keys of the directories just built in, never evicted.
+        :type keys: list[str]
+        """
+        with file_lock(self.index):
+            dirs: dict[str, BuildDir] = self._read()
+            for key in keys:
+                if key in dirs:
+                    dirs[key].size = disk_usage(dirs[key].path)
+
+            if self.quota is not None:
+                for d in dirs.values():
+                    if d.size is None:
+                        d.size = disk_usage(d.path)
+                total: int = sum(d.size or 0 for d in dirs.values())
+
+                for d in sorted(dirs.values(), key=lambda d: d.last_used):
+                    if total <= self.quota:
+                        break
+                    if d.key in keys:
+                        continue
+                    fd: int | None = try_lock(d.path)
+                    if fd is None:
+                        # In use by another build
+                        continue
+                    print(f"removing least recently used build directory {d.key} "
+                          f"({format_size(d.size or 0)})")
+                    try:
+                        shutil.rmtree(d.path, ignore_errors=True)
+                        d.path.with_name(f"{d.path.name}.lock").unlink(missing_ok=True)
+                    finally:
+                        unlock(fd)
+                    total -= d.size or 0
+                    del dirs[d.key]
+
+            self._write(dirs)
+            for key in keys:
+                if key in self._held:
+                    unlock(self._held.pop(key))
@@ -2,14 +2,27 @@
 Wrappers over build tools. For the moment only cmake and make are supported
 """
 
-import sys
+import hashlib
+import json
+import os
+import shlex
+import shutil
 import subprocess
+import sys
 
 from abc import ABC, abstractmethod
+from functools import lru_cache
 from pathlib import Path
 from shutil import rmtree
 
-from nxtool.config.configuration import PathsStore
+from nxtool.config.configuration import PathsStore, ProjectInstance
+from nxtool.utils.ccache import CompilerCache
+from nxtool.utils.diagnostics import Collector
+from nxtool.utils.hosttools import workspace_tools
+from nxtool.utils.ninjalog import TIMING_LOG
+from nxtool.utils.process import ProcessResult, ProcessRunner
+from nxtool.utils.snapshot import SnapshotMode, sync
+from nxtool.utils.worktrees import Worktree
 
 class Builder(ABC):
     """
@@ -20,9 +33,24 @@ class Builder(ABC):
     Attributes:
         source (Path): Path to the source directory for the build.
         destination (Path): Path to the destination directory for build outputs.
+        cache (CompilerCache | None): Compiler launcher cache used for the build.
+        runner (ProcessRunner): Runs the build tools and handles their output.
+        host_tools (Path | None): Directory of prebuilt nuttx host tools, see
+            `nxtool.utils.hosttools`.
+        result (ProcessResult | None): Result of the last build tool run.
+        diagnostics (Collector): Compiler diagnostics of all build tool runs.
+        worktree (Worktree | None): Worktrees of pinned revisions `source`
+            belongs to, brought up to date before configuring and building.
     """
 
-    def __init__(self, source: Path, destination: Path) -> None:
+    def __init__(
+        self,
+        source: Path,
+        destination: Path,
+        cache: CompilerCache | None = None,
+        runner: ProcessRunner | None = None,
+        host_tools: Path | None = None
+    ) -> None:
         """
         Initialize the Builder with a source and destination path.
 
@@ -30,9 +58,67 @@ class Builder(ABC):
         :type source: Path
         :param destination: Path to the destination directory for build outputs.
         :type destination: Path
+        :param cache: Compiler launcher cache, `None` disables caching.
+        :type cache: CompilerCache | None
+        :param runner: Process runner, defaults to streaming output to the terminal.
+        :type runner: ProcessRunner | None
+        :param host_tools: Directory of prebuilt host tools, put first in PATH.
+        :type host_tools: Path | None
         """
         self.source = source
         self.destination = destination
+        self.cache = cache
+        self.runner: ProcessRunner = runner or ProcessRunner()
+        self.host_tools = host_tools
+        self.result: ProcessResult | None = None
+        self.diagnostics: Collector = Collector()
+        self.worktree: Worktree | None = None
+
+    @property
+    def env(self) -> dict[str, str]:
+        """
+        Environment the build tools are run with.
+        """
+        env: dict[str, str] = os.environ | (self.cache.env() if self.cache is not None else {})
+        if self.host_tools is not None:
+            env["PATH"] = os.pathsep.join([f"{self.host_tools}", env.get("PATH", "")])
+        return env
+
+    @property
+    def output_dir(self) -> Path:
+        """
+        Directory the nuttx binaries (nuttx, nuttx.map, ...) are written to.
+        """
+        return self.destination
+
+    def _checkout(self) -> bool:
+        """
+        Bring the worktrees of pinned revisions up to date, if building from them.
+        """
+        return self.worktree is None or self.worktree.sync(self.runner)
+
+    def _defconfig(self, defconfig: Path | None) -> Path | None:
+        """
+        The same defconfig in the worktree of a pinned nuttx revision, board
+        defconfigs are looked up in the workspace checkout.
+        """
+        if self.worktree is None or defconfig is None:
+            return defconfig
+        try:
+            return self.source / defconfig.relative_to(Worktree.checkout("nuttx"))
+        except ValueError:
+            return defconfig
+
+    def _run(self, args: list[str]) -> int:
+        """
+        Run a build tool, logs are named after the build directory.
+
+        :return: The exit code of the build tool.
+        :rtype: int
+        """
+        self.result = self.runner.run(args, env=self.env, log_name=self.destination.name)
+        self.diagnostics.merge(self.result.diagnostics)
+        return self.result.returncode
 
     @abstractmethod
     def configure(self, config: str):
@@ -44,12 +130,14 @@ class Builder(ABC):
         """
 
     @abstractmethod
-    def build(self, target: str = "all"):
+    def build(self, target: str = "all", jobs: int | None = None):
         """
         Execute the build process for the specified target.
 
         :param target: The build target to compile. Defaults to "all".
         :type target: str
+        :param jobs: Maximum number of parallel jobs, `None` leaves it to the build tool.
+        :type jobs: int | None
         """
 
     @abstractmethod
@@ -71,111 +159,485 @@ class Builder(ABC):
         if self.destination.exists() and self.destination.is_dir():
             rmtree(self.destination)
 
+    # Fingerprint of the last successful configure, kept in the build directory
+    FINGERPRINT: str = ".nxtool_fingerprint.json"
+
+    def _recorded_fingerprint(self) -> dict[str, str] | None:
+        try:
+            return json.loads((self.destination / self.FINGERPRINT).read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return None
+
+    def _record_fingerprint(self, fingerprint: dict[str, str] | None) -> None:
+        """
+        Record the fingerprint of a successful configure, `None` clears it.
+        """
+        stamp: Path = self.destination / self.FINGERPRINT
+        if fingerprint is None:
+            stamp.unlink(missing_ok=True)
+            return
+        stamp.write_text(json.dumps(fingerprint), encoding='utf-8')
+
+    def toolchain(self) -> str:
+        """
+        Identity of the toolchain the build uses, empty if unknown.
+        """
+        return ""
+
+    @staticmethod
+    def _compiler(name: str) -> str:
+        """
+        Identity of a compiler found in PATH: the binary it resolves to, and
+        the version it reports so an in place upgrade changes it.
+        """
+        path: str = shutil.which(name) or name
+        try:
+            real: str = os.path.realpath(path)
+            return f"{real}:{_version(real, os.stat(real).st_mtime_ns)}"
+        except OSError:
+            return path
+
+    @staticmethod
+    def _digest(path: Path | None) -> str:
+        if path is None:
+            return ""
+        try:
+            return hashlib.sha256(path.read_bytes()).hexdigest()
+        except OSError:
+            return ""
+
+@lru_cache(maxsize=None)
+def _version(compiler: str, mtime: int) -> str:  # pylint: disable=unused-argument
+    # Cached per binary and mtime, keys are computed several times per build
+    try:
+        out: str = subprocess.run(
+            [compiler, "--version"], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+            check=False, text=True, errors="replace", timeout=30
+        ).stdout
+    except (OSError, subprocess.SubprocessError):
+        return ""
+    return out.partition("\n")[0].strip()
+
 class MakeBuilder(Builder):
     """
     Wrapper class over make build system.
     Should be assumed that any arguments given here are already checked and valid
+
+    nuttx make builds happen in the source tree. With a `snapshot` mode other
+    than "none", nuttx and apps are built from snapshots kept in the
+    destination directory (see `nxtool.utils.snapshot`), so several make
+    builds can run at the same time.
+
+    With `timing` set, every compile goes through `nxtool.utils.timing`, which
+    records a ninja style log in the destination directory for `build report`.
+
+    Unless `host_tools` is given, the prebuilt host tools of the nuttx
+    revision of `source` are looked up, or built, right before building.
     """
 
     def __init__(
         self,
         source: Path,
-        destination: Path
+        destination: Path,
+        cache: CompilerCache | None = None,
+        runner: ProcessRunner | None = None,
+        host_tools: Path | None = None,
+        timing: bool = False,
+        snapshot: SnapshotMode = "none"
     ) -> None:
         super().__init__(
             source=source,
-            destination=destination
+            destination=destination,
+            cache=cache,
+            runner=runner,
+            host_tools=host_tools
+        )
+        self.timing = timing
+        self.snapshot: SnapshotMode = snapshot
+        apps: Path = source.parent / "apps"
+        if snapshot == "none":
+            self.tree: Path = source
+            self.apps: Path = apps
+        else:
+            self.tree = destination / "nuttx"
+            self.apps = destination / "apps"
+        self._sources: list[tuple[Path, Path]] = [(source, self.tree), (apps, self.apps)]
+
+    @property
+    def output_dir(self) -> Path:
+        return self.tree
+
+    def _make_var(self, name: str) -> str:
+        """
+        Value of a variable as the board Make.defs (and the arch Toolchain.defs
+        it includes) defines it, empty if make cannot tell.
+        """
+        try:
+            return subprocess.run([
+                "make", "-s", "--no-print-directory", "-C", f"{self.tree}", "-f", "Make.defs",
+                f"TOPDIR={self.tree}", f"APPDIR={self.apps}",
+                "--eval", f"__nxtool_print: ; @echo $({name})", "__nxtool_print",
+            ], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, check=False, text=True,
+                errors="replace", timeout=60).stdout.strip()
+        except (OSError, subprocess.SubprocessError):
+            return ""
+
+    def toolchain(self) -> str:
+        # The compiler is only known to make, CC as set by the arch
+        # Toolchain.defs from CROSSDEV, possibly behind a launcher
+        compiler: str = next((
+            word for word in self._make_var("CC").split()
+            if Path(word).name not in ("ccache", "sccache") and "=" not in word
+        ), "")
+        identity: str = self._compiler(compiler) if compiler else ""
+        return f"{identity}:{self._digest(self.tree / 'Make.defs')}"
+
+    def _sync(self) -> bool:
+        """
+        Bring the source snapshots up to date, nothing to do when building in tree.
+        """
+        if self.snapshot == "none":
+            return True
+        return all(
+            sync(src, dest, self.snapshot, self.runner)
+            for src, dest in self._sources
+            if src.is_dir()
         )
 
-    def _run_make_cmd(self, args: list[str]) -> None:
+    @staticmethod
+    def _jobserver(env: dict[str, str]) -> bool:
+        """
+        Whether we run below a make that shares its job slots with us.
+        """
+        flags: str = env.get("MAKEFLAGS", "")
+        return "--jobserver-auth" in flags or "--jobserver-fds" in flags
+
+    def _parallel_args(self, jobs: int | None) -> list[str]:
+        """
+        Job arguments for make. Below a parent make the jobserver already
+        bounds parallelism and `-j` would opt out of it. Otherwise up to `jobs`
+        (default cpu count) jobs run, and no new job is started while the
+        load average is above the cpu count, so concurrent builds back off.
+        """
+        if self._jobserver(self.env) is True:
+            return []
+        cpus: int = os.cpu_count() or 1
+        return [f"-j{jobs or cpus}", f"-l{cpus}"]
+
+    def _run_make_cmd(self, args: list[str]) -> int:
         cmd = [
             "make",
             "-C",
-            f"{PathsStore.nxtool_root}/nuttx"
+            f"{self.tree}"
         ] + args
-        self._run_cmd(cmd)
+        if self.timing is True:
+            # nuttx toolchain definitions prefix the compiler with $(CCACHE)
+            launcher: list[str] = [
+                sys.executable, "-m", "nxtool.utils.timing", f"{self.destination / TIMING_LOG}"
+            ]
+            if self.cache is not None:
+                launcher.append(self.cache.launcher)
+            cmd.append(f"CCACHE={shlex.join(launcher)}")
+        elif self.cache is not None:
+            cmd += self.cache.make_args()
+        return self._run(cmd)
 
-    def _run_cmd(self, args: list[str]) -> None:
-        with subprocess.Popen(
-            args, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, bufsize=1
-        ) as proc:
-            if proc.stdout:
-                for line in iter(proc.stdout.readline, ''):
-                    print(line)
-                proc.communicate()
+    def fingerprint(self, config: str, defconfig: Path | None = None) -> dict[str, str]:
+        """
+        Everything that decides the outcome of a configure step.
+        """
+        return {
+            "config": config,
+            "defconfig": self._digest(defconfig),
+            "snapshot": self.snapshot,
+        }
 
-    def configure(self, config: str):
+    def configure(
+        self,
+        config: str,
+        defconfig: Path | None = None,
+        force: bool = False
+    ):
         """
         equivalent to ./tools/configure.sh
+
+        Skipped when the tree is still configured with the same defconfig and
+        its .config is the one this builder wrote, configure.sh starts over
+        with a distclean.
+
+        :param defconfig: Path to the board defconfig, part of the fingerprint.
+        :type defconfig: Path | None
+        :param force: Always run configure.sh.
+        :type force: bool
         """
-        self._run_cmd([
-            f"{PathsStore.nxtool_root}/nuttx/tools/configure.sh",
+        self.destination.mkdir(parents=True, exist_ok=True)
+        if self._checkout() is False or self._sync() is False:
+            return 1
+        defconfig = self._defconfig(defconfig)
+
+        expected: dict[str, str] = self.fingerprint(config, defconfig)
+        dotconfig: Path = self.tree / ".config"
+        # In tree builds share the nuttx checkout with every other in tree
+        # project, the tree is only still ours if its .config is the one we wrote
+        if (
+            force is False
+            and self._recorded_fingerprint() == {**expected, "dotconfig": self._digest(dotconfig)}
+            and dotconfig.is_file()
+        ):
+            if self.runner.mode != "quiet":
+                print(f"{self.runner.prefix}configuration up to date")
+            return 0
+
+        self._record_fingerprint(None)
+        ret: int = self._run([
+            f"{self.tree}/tools/configure.sh",
+            "-E",
+            "-a", f"{self.apps}",
             f"{config}"
         ])
+        if ret == 0:
+            self._record_fingerprint({**expected, "dotconfig": self._digest(dotconfig)})
+        return ret
+
+    def _seed_host_tools(self) -> None:
+        """
+        Copy the prebuilt host tools into nuttx/tools. make builds in tree and
+        distclean removes them, an existing tool newer than its sources is
+        not rebuilt.
+        """
+        if self.host_tools is None:
+            self.host_tools = workspace_tools(self.source, self.runner)
+        if self.host_tools is None:
+            return
+        try:
+            for tool in self.host_tools.iterdir():
+                dest: Path = self.tree / "tools" / tool.name
+                if tool.is_file() and os.access(tool, os.X_OK) and not dest.exists():
+                    shutil.copy2(tool, dest)
+        except OSError:
+            # Pruned by the tools build of another revision, make builds them
+            pass
 
-    def build(self, target: str = "all"):
+    def build(self, target: str = "all", jobs: int | None = None):
         "run builder"
-        self._run_make_cmd([])
+        self.destination.mkdir(parents=True, exist_ok=True)
+        if self._checkout() is False or self._sync() is False:
+            return 1
+        self._seed_host_tools()
+        if self.timing is True:
+            (self.destination / TIMING_LOG).unlink(missing_ok=True)
+        return self._run_make_cmd(self._parallel_args(jobs) + [target])
 
     def install(self):
         "install target"
 
     def clean(self):
         "clean configuration"
-        self._run_make_cmd(["distclean"])
+        self._record_fingerprint(None)
+        return self._run_make_cmd(["distclean"])
 
 class CMakeBuilder(Builder):
     def __init__(
         self,
         source: Path,
-        destination: Path
+        destination: Path,
+        cache: CompilerCache | None = None,
+        runner: ProcessRunner | None = None,
+        host_tools: Path | None = None,
+        generator: str = "Ninja"
     ) -> None:
         super().__init__(
             source=source,
-            destination=destination
+            destination=destination,
+            cache=cache,
+            runner=runner,
+            host_tools=host_tools
         )
+        self.generator = generator
 
-    def _run_cmake_cmd(self, args: list[str]) -> None:
+    def _run_cmake_cmd(self, args: list[str]) -> int:
         cmd = [
             "cmake",
             ] + args
-        print(cmd)
-        with subprocess.Popen(
-            cmd, stdout=subprocess.PIPE, text=True
-        ) as proc:
-            if proc.stdout:
-                for line in iter(proc.stdout.readline, ''):
-                    sys.stdout.write(line)
-                proc.communicate()
+        if self.runner.mode == "stream":
+            print(f"{self.runner.prefix}{cmd}")
+        return self._run(cmd)
+
+    def cache_var(self, name: str) -> str | None:
+        """
+        Read a variable from the CMakeCache.txt of the destination directory.
+
+        :param name: Cache variable name.
+        :type name: str
+        :return: The variable value, `None` if not configured or not found.
+        :rtype: str | None
+        """
+        try:
+            with open(self.destination / "CMakeCache.txt", 'r', encoding='utf-8') as file:
+                for line in file:
+                    if line.startswith(f"{name}:"):
+                        return line.partition("=")[2].strip()
+        except OSError:
+            pass
+        return None
+
+    def toolchain(self) -> str:
+        # The compiler is resolved in PATH again, so switching toolchains
+        # through PATH or upgrading it in place changes the identity
+        compiler: str | None = self.cache_var("CMAKE_C_COMPILER")
+        if not compiler:
+            return ""
+        return self._compiler(Path(compiler).name)
 
-    def configure(self, config: str, btype: str = "Debug", generator: str = "Ninja"):
+    def fingerprint(
+        self,
+        config: str,
+        btype: str,
+        generator: str,
+        defconfig: Path | None = None
+    ) -> dict[str, str]:
+        """
+        Everything that decides the outcome of a configure step.
+
+        :param config: Board configuration.
+        :type config: str
+        :param btype: Build type.
+        :type btype: str
+        :param generator: cmake generator.
+        :type generator: str
+        :param defconfig: Path to the board defconfig, hashed when given.
+        :type defconfig: Path | None
+        :return: The fingerprint.
+        :rtype: dict[str, str]
+        """
+        return {
+            "config": config,
+            "defconfig": self._digest(defconfig),
+            "generator": generator,
+            "btype": btype,
+            "toolchain": self.toolchain(),
+            "launcher": self.cache.launcher if self.cache is not None else "",
+            "exports": "compile_commands",
+        }
+
+    def _generated(self, generator: str) -> bool:
+        build_file: str = "build.ninja" if "Ninja" in generator else "Makefile"
+        return (self.destination / build_file).is_file()
+
+    def configure(
+        self,
+        config: str,
+        btype: str = "Debug",
+        generator: str | None = None,
+        defconfig: Path | None = None,
+        force: bool = False
+    ):
         """
         Configure cmake project
+
+        The configure step is skipped when the fingerprint recorded by the last
+        successful configure matches, or reduced to a re-generate if only the
+        generated build files are missing.
+
+        :param generator: cmake generator, defaults to the one of the builder.
+        :type generator: str | None
+        :param defconfig: Path to the board defconfig, part of the fingerprint.
+        :type defconfig: Path | None
+        :param force: Always run the full configure step.
+        :type force: bool
         """
+        generator = generator or self.generator
+        if self._checkout() is False:
+            return 1
+        defconfig = self._defconfig(defconfig)
+        expected: dict[str, str] = self.fingerprint(config, btype, generator, defconfig)
+
+        if force is False and self._recorded_fingerprint() == expected:
+            if self._generated(generator) is True:
+                if self.runner.mode != "quiet":
+                    print(f"{self.runner.prefix}configuration up to date")
+                return 0
+            return self._run_cmake_cmd([
+                "-S", f"{self.source}",
+                "-B", f"{self.destination}",
+            ])
 
-        self._run_cmake_cmd([
+        # Never leave a matching fingerprint behind a failed configure
+        self._record_fingerprint(None)
+        ret: int = self._run_cmake_cmd([
             "-S", f"{self.source}",
             "-B", f"{self.destination}",
             "-G", f"{generator}",
             "-D", f"BOARD_CONFIG={config}",
-            "-D", f"CMAKE_BUILD_TYPE={btype}"
-        ])
+            "-D", f"CMAKE_BUILD_TYPE={btype}",
+            # Merged into the workspace database, see `nxtool.utils.compdb`
+            "-D", "CMAKE_EXPORT_COMPILE_COMMANDS=ON"
+        ] + (self.cache.cmake_args() if self.cache is not None else []))
 
-    def build(self, target: str = "all"):
+        if ret == 0:
+            self._record_fingerprint(self.fingerprint(config, btype, generator, defconfig))
+        return ret
+
+    def build(self, target: str = "all", jobs: int | None = None):
         """
         build project
         """
-        self._run_cmake_cmd([
+        if self._checkout() is False:
+            return 1
+        return self._run_cmake_cmd([
             "--build", f"{self.destination}",
             "--target", f"{target}",
-        ])
+        ] + ([] if jobs is None else ["--parallel", f"{jobs}"]))
 
     def install(self, directory: str | None = None):
         pass
 
     def clean(self):
         "clean project"
-        self._run_cmake_cmd([
+        return self._run_cmake_cmd([
             "--build", f"{self.destination}",
             "--target", "clean"
         ])
+
+def project_builder(
+    inst: ProjectInstance,
+    cache: CompilerCache | None = None,
+    runner: ProcessRunner | None = None,
+    destination: Path | None = None
+) -> Builder:
+    """
+    Builder selected by the options of a project.
+
+    The "generator" option "make" selects the make backend, with the
+    "snapshot" option deciding where it builds and the "timing" option
+    recording compile times. Any other value is the cmake
+    generator, "Ninja" by default. Projects pinning revisions build from
+    worktrees, see `nxtool.utils.worktrees`.
+
+    :param inst: The project.
+    :type inst: ProjectInstance
+    :param destination: Build directory, defaults to the one of the project.
+    :type destination: Path | None
+    :rtype: Builder
+    """
+    worktree: Worktree | None = Worktree.of(inst)
+    source: Path = PathsStore.nxtool_root / "nuttx" if worktree is None else worktree.nuttx
+    destination = destination or inst.build_dir
+    generator: str = inst.opts.get("generator", "Ninja")
+    builder: Builder
+    if generator == "make":
+        builder = MakeBuilder(
+            source, destination, cache, runner,
+            timing=inst.opts.get("timing") == "on",
+            snapshot=inst.opts.get("snapshot", "none")  # type: ignore[arg-type]
+        )
+    else:
+        builder = CMakeBuilder(source, destination, cache, runner, generator=generator)
+    builder.worktree = worktree
+    return builder
+
+def in_tree(inst: ProjectInstance) -> bool:
+    """
+    Whether a project builds inside the nuttx checkout.
+    """
+    return inst.opts.get("generator") == "make" and inst.opts.get("snapshot", "none") == "none"
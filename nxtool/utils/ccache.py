@@ -0,0 +1,193 @@
+"""
+Wrapper over compiler launcher caches. For the moment ccache and sccache are supported
+
+A single cache directory under .nxtool is shared by every project of the workspace,
+so projects that differ only by a few Kconfig options reuse each other's objects.
+"""
+
+import json
+import os
+import shutil
+import subprocess
+
+from dataclasses import dataclass
+from pathlib import Path
+
+from nxtool.config.configuration import ConfigStore, PathsStore
+from nxtool.utils.fs import parse_size
+
+@dataclass
+class CacheStats():
+    """
+    Statistics reported by the compiler cache.
+
+    Sizes are in bytes, fields the launcher does not report are `None`.
+    """
+    hits: int = 0
+    misses: int = 0
+    size: int | None = None
+    max_size: int | None = None
+    files: int | None = None
+    evictions: int | None = None
+
+    @property
+    def hit_rate(self) -> float | None:
+        total: int = self.hits + self.misses
+        return None if total == 0 else self.hits / total
+
+class CompilerCache():
+    """
+    Compiler launcher cache shared by all workspace projects.
+
+    Attributes:
+        launcher (str): Path to the ccache or sccache executable.
+        cache_dir (Path): Directory holding the cached objects.
+        max_size (str | None): Size limit passed to the launcher, e.g. "5G".
+    """
+    SUPPORTED: tuple[str, ...] = ("ccache", "sccache")
+
+    def __init__(self, launcher: str, cache_dir: Path, max_size: str | None = None) -> None:
+        self.launcher = launcher
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+
+    @property
+    def kind(self) -> str:
+        """
+        Launcher flavour, either "ccache" or "sccache".
+        """
+        return "sccache" if Path(self.launcher).name.startswith("sccache") else "ccache"
+
+    @classmethod
+    def detect(
+        cls,
+        launcher: str,
+        cache_dir: Path,
+        max_size: str | None = None
+    ) -> "CompilerCache | None":
+        """
+        Find the requested launcher in PATH.
+
+        :param launcher: "auto", "none", a supported launcher name or a path to it.
+            "auto" prefers ccache over sccache.
+        :type launcher: str
+        :param cache_dir: Shared cache directory.
+        :type cache_dir: Path
+        :param max_size: Size limit of the cache.
+        :type max_size: str | None
+        :return: The cache, or `None` when disabled or not installed.
+        :rtype: CompilerCache | None
+        """
+        if launcher in ("", "none"):
+            return None
+
+        candidates: tuple[str, ...] = cls.SUPPORTED if launcher == "auto" else (launcher,)
+        for candidate in candidates:
+            path: str | None = shutil.which(candidate)
+            if path is not None:
+                return cls(path, cache_dir, max_size)
+        return None
+
+    def env(self) -> dict[str, str]:
+        """
+        Environment variables pointing the launcher at the shared cache.
+        """
+        if self.kind == "sccache":
+            env = {"SCCACHE_DIR": f"{self.cache_dir}"}
+            if self.max_size is not None:
+                env["SCCACHE_CACHE_SIZE"] = self.max_size
+        else:
+            env = {"CCACHE_DIR": f"{self.cache_dir}"}
+            if self.max_size is not None:
+                env["CCACHE_MAXSIZE"] = self.max_size
+        return env
+
+    def cmake_args(self) -> list[str]:
+        """
+        cmake definitions setting the compiler launcher.
+        """
+        return [
+            "-D", f"CMAKE_C_COMPILER_LAUNCHER={self.launcher}",
+            "-D", f"CMAKE_CXX_COMPILER_LAUNCHER={self.launcher}",
+        ]
+
+    def make_args(self) -> list[str]:
+        """
+        make variables setting the compiler launcher, nuttx toolchain
+        definitions prefix the compiler with $(CCACHE).
+        """
+        return [f"CCACHE={self.launcher}"]
+
+    def _run(self, args: list[str]) -> str:
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        return subprocess.run(
+            [self.launcher] + args,
+            env=os.environ | self.env(),
+            capture_output=True, text=True, check=True
+        ).stdout
+
+    def zero(self) -> None:
+        """
+        Reset the cache statistics.
+        """
+        self._run(["-z"] if self.kind == "ccache" else ["--zero-stats"])
+
+    def stats(self) -> CacheStats:
+        """
+        Query the launcher for cache statistics.
+
+        :raises subprocess.CalledProcessError: If the launcher fails.
+        """
+        if self.kind == "sccache":
+            return self._sccache_stats()
+        return self._ccache_stats()
+
+    def _ccache_stats(self) -> CacheStats:
+        values: dict[str, int] = {}
+        for line in self._run(["--print-stats"]).splitlines():
+            key, _, value = line.partition("\t")
+            if value.strip().isdigit():
+                values[key] = int(value)
+
+        stats = CacheStats(
+            hits=values.get("direct_cache_hit", 0) + values.get("preprocessed_cache_hit", 0),
+            misses=values.get("cache_miss", 0),
+            files=values.get("files_in_cache"),
+            evictions=values.get("cleanups_performed"),
+        )
+        if "cache_size_kibibyte" in values:
+            stats.size = values["cache_size_kibibyte"] * 1024
+        try:
+            stats.max_size = parse_size(self._run(["-k", "max_size"]).strip())
+        except (ValueError, subprocess.CalledProcessError):
+            pass
+        return stats
+
+    def _sccache_stats(self) -> CacheStats:
+        data: dict = json.loads(self._run(["--show-stats", "--stats-format=json"]))
+        counters: dict = data.get("stats", {})
+
+        def total(name: str) -> int:
+            return sum(counters.get(name, {}).get("counts", {}).values())
+
+        # sccache does not report evictions
+        return CacheStats(
+            hits=total("cache_hits"),
+            misses=total("cache_misses"),
+            size=data.get("cache_size"),
+            max_size=data.get("max_cache_size"),
+        )
+
+def workspace_cache() -> CompilerCache | None:
+    """
+    Compiler cache configured in the `[cache]` section of the workspace config.
+
+    :return: The workspace cache, or `None` when disabled or no launcher is installed.
+    :rtype: CompilerCache | None
+    """
+    cfg: ConfigStore = ConfigStore()
+    return CompilerCache.detect(
+        cfg.cache.get("launcher", "auto"),
+        PathsStore.nxtool_ccache_dir,
+        cfg.cache.get("max_size")
+    )
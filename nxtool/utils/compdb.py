@@ -0,0 +1,282 @@
+"""
+Workspace compilation database and header include graph.
+
+clangd reads a single compile_commands.json, while every project builds in a
+directory of its own. nxtool merges the databases of all workspace projects
+into compile_commands.json at the workspace root, one entry per source file,
+so switching projects leaves the IDE index alone. A file compiled by several
+projects gets the entry of the current project, otherwise the one of the most
+recently built project.
+
+The database of a project is parsed into .nxtool/index/compdb/<project>.json
+after each of its builds, only when the build changed it. The merged database
+is put together from these caches and written again only when its content
+changes.
+
+The include graph of a project, kept in .nxtool/index/includes/<project>.json.gz,
+maps every header to the translation units including it. It is taken from the
+dependencies the compiler recorded during the build (see
+`nxtool.utils.depfile`), sources are never parsed, and it is refreshed when
+they change.
+"""
+
+import gzip
+import json
+import os
+
+from pathlib import Path
+from typing import Any
+
+from nxtool.config.configuration import PathsStore, ProjectInstance, ProjectStore
+from nxtool.utils.builders import MakeBuilder, project_builder
+from nxtool.utils.depfile import NINJA_DEPS, depfiles, parse_depfile, read_ninja_deps
+from nxtool.utils.fs import atomic_write, file_lock
+
+COMPILE_COMMANDS: str = "compile_commands.json"
+
+def _signature(paths: list[Path]) -> list[Any] | None:
+    """
+    Changes when any of `paths` changes, `None` if none of them exists.
+    """
+    sig: list[Any] = []
+    for path in paths:
+        try:
+            st = path.stat()
+        except OSError:
+            continue
+        sig.append([f"{path}", st.st_mtime_ns, st.st_size])
+    return sig or None
+
+def _entry_file(entry: dict[str, Any]) -> str:
+    return os.path.normpath(os.path.join(entry.get("directory", ""), entry["file"]))
+
+class ProjectIndex():
+    """
+    Compilation database and include graph of a single project.
+
+    Attributes:
+        name (str): The project.
+        output (Path): Directory the project builds in.
+        roots (list[Path]): Directories the build writes dependencies to,
+            make builds also compile apps outside of the nuttx tree.
+    """
+    def __init__(self, inst: ProjectInstance):
+        self.name: str = inst.name
+        builder = project_builder(inst)
+        self.output: Path = builder.output_dir
+        self.roots: list[Path] = [self.output]
+        if isinstance(builder, MakeBuilder):
+            self.roots.append(builder.apps)
+        self._commands: Path = PathsStore.nxtool_index_dir / "compdb" / f"{self.name}.json"
+        self._includes: Path = PathsStore.nxtool_index_dir / "includes" / f"{self.name}.json.gz"
+
+    @staticmethod
+    def _load(path: Path) -> dict[str, Any] | None:
+        try:
+            if path.suffix == ".gz":
+                with gzip.open(path, 'rt', encoding='utf-8') as file:
+                    return json.load(file)
+            return json.loads(path.read_text(encoding='utf-8'))
+        except (OSError, ValueError, EOFError):
+            return None
+
+    @staticmethod
+    def _store(path: Path, data: dict[str, Any]) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        raw: bytes = json.dumps(data, separators=(",", ":")).encode('utf-8')
+        atomic_write(path, gzip.compress(raw, mtime=0) if path.suffix == ".gz" else raw)
+
+    def commands(self, refresh: bool = True) -> dict[str, Any] | None:
+        """
+        Compilation database of the project, parsed again if the build changed it.
+
+        :param refresh: Check the database of the build, otherwise only the
+            cache is read.
+        :type refresh: bool
+        :return: "entries" of the database and "built", the time it was
+            written by the build, `None` if the project has none.
+        :rtype: dict[str, Any] | None
+        """
+        cached: dict[str, Any] | None = self._load(self._commands)
+        if refresh is False:
+            return cached
+        source: Path = self.output / COMPILE_COMMANDS
+        sig: list[Any] | None = _signature([source])
+        if cached is not None and cached.get("signature") == sig:
+            return cached if sig is not None else None
+        if sig is None:
+            self._commands.unlink(missing_ok=True)
+            return None
+
+        try:
+            entries: list[dict[str, Any]] = [
+                e for e in json.loads(source.read_text(encoding='utf-8'))
+                if isinstance(e, dict) and "file" in e
+            ]
+        except (OSError, ValueError) as e:
+            print(f"[{self.name}] unreadable {source}: {e}")
+            return None
+        data: dict[str, Any] = {"signature": sig, "built": sig[0][1], "entries": entries}
+        self._store(self._commands, data)
+        return data
+
+    def _deps_sources(self, cached: dict[str, Any] | None, refresh: bool) -> list[Path]:
+        """
+        Dependency files of the build. Walking the trees for make depfiles
+        takes a while, without `refresh` the files of the cached graph are
+        reused: only a build adds new ones.
+        """
+        ninja: Path = self.output / NINJA_DEPS
+        if ninja.is_file():
+            return [ninja]
+        if refresh is False and cached is not None and cached.get("signature"):
+            return [Path(p) for p, _, _ in cached["signature"]]
+        return sorted(p for root in self.roots for p in depfiles(root))
+
+    def includes(self, refresh: bool = True) -> dict[str, Any] | None:
+        """
+        Include graph of the project, built again if the build dependencies changed.
+
+        :param refresh: Look for dependency files the build added, otherwise
+            only the files of the cached graph are checked.
+        :type refresh: bool
+        :return: "units", the translation units, and "headers", the indexes
+            in "units" of the units including every header. `None` if the
+            project recorded no dependencies.
+        :rtype: dict[str, Any] | None
+        """
+        cached: dict[str, Any] | None = self._load(self._includes)
+        sources: list[Path] = self._deps_sources(cached, refresh)
+        sig: list[Any] | None = _signature(sources)
+        if cached is not None and cached.get("signature") == sig:
+            return cached if sig is not None else None
+        if sig is None:
+            self._includes.unlink(missing_ok=True)
+            return None
+
+        units: dict[str, int] = {}
+        headers: dict[str, set[int]] = {}
+        for path in sources:
+            try:
+                rules = (
+                    read_ninja_deps(path) if path.name == NINJA_DEPS
+                    else parse_depfile(
+                        path.read_text(encoding='utf-8', errors='surrogateescape'), path.parent
+                    )
+                )
+                for _, inputs in rules:
+                    unit: int = units.setdefault(inputs[0], len(units))
+                    for header in inputs[1:]:
+                        headers.setdefault(header, set()).add(unit)
+            except (OSError, ValueError) as e:
+                print(f"[{self.name}] unreadable {path}: {e}")
+
+        data: dict[str, Any] = {
+            "signature": sig,
+            "units": list(units),
+            "headers": {h: sorted(u) for h, u in headers.items()},
+        }
+        self._store(self._includes, data)
+        return data
+
+class WorkspaceIndex():
+    """
+    Merged compilation database and include graphs of the workspace projects.
+    """
+    def __init__(self, prj: ProjectStore | None = None):
+        """
+        :param prj: Workspace projects, loaded if not given.
+        :type prj: ProjectStore | None
+        """
+        self.prj: ProjectStore = prj or ProjectStore()
+        self.merged: Path = PathsStore.nxtool_root / COMPILE_COMMANDS
+
+    def _projects(self) -> list[ProjectIndex]:
+        return [ProjectIndex(inst) for inst in self.prj.projects.values()]
+
+    def _forget_removed(self) -> None:
+        names: set[str] = set(self.prj.projects)
+        for sub, suffix in (("compdb", ".json"), ("includes", ".json.gz")):
+            for path in (PathsStore.nxtool_index_dir / sub).glob(f"*{suffix}"):
+                if path.name[:-len(suffix)] not in names:
+                    path.unlink(missing_ok=True)
+
+    def update(self, names: list[str] | None = None) -> bool:
+        """
+        Refresh the index of projects that were just built and the merged
+        compilation database.
+
+        The caches of other projects are only read, failures are reported and
+        never fail the build.
+
+        :param names: Projects that were built, `None` refreshes all of them.
+        :type names: list[str] | None
+        :return: `True` if the merged database was written.
+        :rtype: bool
+        """
+        current: str | None = self.prj.current.name if self.prj.current is not None else None
+        databases: list[tuple[str, dict[str, Any]]] = []
+        try:
+            PathsStore.nxtool_index_dir.mkdir(parents=True, exist_ok=True)
+            with file_lock(PathsStore.nxtool_index_dir / COMPILE_COMMANDS):
+                if names is None:
+                    self._forget_removed()
+                for index in self._projects():
+                    built: bool = names is None or index.name in names
+                    data: dict[str, Any] | None = index.commands(refresh=built)
+                    if built is True:
+                        index.includes()
+                    if data is not None:
+                        databases.append((index.name, data))
+
+                # The current project first, then the most recently built
+                databases.sort(key=lambda d: (d[0] != current, -d[1]["built"]))
+                merged: dict[str, dict[str, Any]] = {}
+                for _, data in databases:
+                    for entry in data["entries"]:
+                        merged.setdefault(_entry_file(entry), entry)
+
+                content: str = json.dumps(
+                    [merged[f] for f in sorted(merged)], indent=2
+                ) + "\n"
+                try:
+                    if self.merged.read_text(encoding='utf-8') == content:
+                        return False
+                except OSError:
+                    pass
+                if len(merged) == 0 and not self.merged.exists():
+                    return False
+                atomic_write(self.merged, content)
+                return True
+        except OSError as e:
+            print(f"Cannot update {self.merged}: {e}")
+            return False
+
+    def affected(self, header: str) -> list[dict[str, str]]:
+        """
+        Translation units of every project affected by a header.
+
+        :param header: Path of the header, relative to the current directory,
+            or any trailing part of it ("nuttx/sched.h").
+        :type header: str
+        :return: "project", "header" and "unit" of every translation unit
+            including the header, directly or not.
+        :rtype: list[dict[str, str]]
+        """
+        exact: str = os.path.abspath(header)
+        suffix: str = "/" + os.path.normpath(header).lstrip("/")
+        rows: list[dict[str, str]] = []
+        for index in sorted(self._projects(), key=lambda i: i.name):
+            graph: dict[str, Any] | None = index.includes(refresh=False)
+            if graph is None:
+                continue
+            headers: dict[str, list[int]] = graph["headers"]
+            matches: list[str] = (
+                [exact] if exact in headers else [h for h in headers if h.endswith(suffix)]
+            )
+            for match in sorted(matches):
+                rows.extend(
+                    {"project": index.name, "header": match, "unit": graph["units"][u]}
+                    for u in headers[match]
+                )
+        return rows
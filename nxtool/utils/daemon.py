@@ -0,0 +1,47 @@
+"""
+Client side of the workspace daemon protocol.
+
+The daemon (see `nxtool.cmd.daemon`) listens on a Unix socket in the
+workspace directory. Every connection carries a single request, a JSON object
+on one line, and the daemon answers with a JSON object before closing it:
+
+    {"op": "run", "argv": ["info", "project"]}
+    {"handled": true, "code": 0, "out": "..."}
+
+Ops are "run", "status" and "stop". A "run" the daemon cannot answer comes
+back with "handled" false and is run in process by the caller.
+
+This module is imported on the fast path, keep its imports light.
+"""
+import json
+import socket
+
+from pathlib import Path
+from typing import Any
+
+# Seconds a client waits for the daemon before running the command itself
+TIMEOUT: float = 2.0
+
+def request(path: Path, message: dict[str, Any], timeout: float = TIMEOUT) -> dict[str, Any] | None:
+    """
+    Send a request to the daemon listening on `path`.
+
+    :param path: The daemon socket.
+    :type path: Path
+    :param message: The request.
+    :type message: dict[str, Any]
+    :param timeout: Seconds to wait for the answer.
+    :type timeout: float
+    :return: The answer, `None` if no daemon answered.
+    :rtype: dict[str, Any] | None
+    """
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(timeout)
+            sock.connect(f"{path}")
+            sock.sendall(json.dumps(message).encode('utf-8') + b"\n")
+            sock.shutdown(socket.SHUT_WR)
+            with sock.makefile('rb') as stream:
+                return json.loads(stream.read())
+    except (OSError, ValueError):
+        return None
@@ -0,0 +1,115 @@
+"""
+Dependency information written by the compiler during a build.
+
+Compilers invoked with -MD write a make style depfile per object file:
+
+    sched/foo.o: sched/foo.c include/nuttx/config.h \
+      include/nuttx/sched.h
+
+make builds keep them next to the objects (nuttx concatenates them into
+Make.dep files), ninja folds them into the binary `.ninja_deps` log of the
+build directory and deletes them. Both list the source of the object first,
+then every header it includes.
+"""
+
+import os
+import re
+import struct
+
+from collections.abc import Iterator
+from pathlib import Path
+
+NINJA_DEPS: str = ".ninja_deps"
+
+_NINJA_DEPS_MAGIC: bytes = b"# ninjadeps\n"
+
+# "target: prerequisites", the colon of a Windows drive letter is not a separator
+_RULE = re.compile(r"^(.*?[^\\]):(?:\s+|$)(.*)$")
+_SPACES = re.compile(r"(?<!\\)\s+")
+
+def _normalize(base: Path, path: str) -> str:
+    return os.path.normpath(os.path.join(base, path))
+
+def parse_depfile(text: str, base: Path) -> Iterator[tuple[str, list[str]]]:
+    """
+    Rules of a make style depfile.
+
+    Phony rules without prerequisites (written by -MP) are skipped.
+
+    :param text: Content of the depfile.
+    :type text: str
+    :param base: Directory relative paths are resolved from.
+    :type base: Path
+    :return: The target and its prerequisites of every rule, normalized.
+    :rtype: Iterator[tuple[str, list[str]]]
+    """
+    text = text.replace("\\\r\n", " ").replace("\\\n", " ")
+    for line in text.splitlines():
+        match: re.Match | None = _RULE.match(line.strip())
+        if match is None:
+            continue
+        prereqs: list[str] = [
+            _normalize(base, p.replace("\\ ", " ").replace("$$", "$"))
+            for p in _SPACES.split(match.group(2)) if p
+        ]
+        if len(prereqs) > 0:
+            yield _normalize(base, match.group(1).replace("\\ ", " ")), prereqs
+
+def read_ninja_deps(path: Path) -> Iterator[tuple[str, list[str]]]:
+    """
+    Dependencies recorded in a ninja deps log, format version 3 or 4.
+
+    The log is a sequence of records: path records give the next path id,
+    dependency records list the input ids of an output, a later record for the
+    same output replacing an earlier one. A record cut short by an interrupted
+    build ends the log.
+
+    :param path: The `.ninja_deps` file.
+    :type path: Path
+    :return: Every output with its inputs, normalized against the build directory.
+    :rtype: Iterator[tuple[str, list[str]]]
+    :raises ValueError: If the file is not a ninja deps log of a known version.
+    """
+    data: bytes = path.read_bytes()
+    if not data.startswith(_NINJA_DEPS_MAGIC) or len(data) < len(_NINJA_DEPS_MAGIC) + 4:
+        raise ValueError(f"{path} is not a ninja deps log")
+    version: int = struct.unpack_from("<i", data, len(_NINJA_DEPS_MAGIC))[0]
+    if version not in (3, 4):
+        raise ValueError(f"{path} has unsupported ninja deps version {version}")
+    # mtime of the output, one 32-bit word in version 3, two in version 4
+    mtime_words: int = 1 if version == 3 else 2
+
+    paths: list[str] = []
+    deps: dict[int, tuple[int, ...]] = {}
+    pos: int = len(_NINJA_DEPS_MAGIC) + 4
+    while pos + 4 <= len(data):
+        header: int = struct.unpack_from("<I", data, pos)[0]
+        pos += 4
+        size: int = header & 0x7FFFFFFF
+        if size < 4 or size % 4 != 0 or pos + size > len(data):
+            break
+        if header & 0x80000000:
+            ids: tuple[int, ...] = struct.unpack_from(f"<{size // 4}i", data, pos)
+            deps[ids[0]] = ids[1 + mtime_words:]
+        else:
+            # NUL padded to 4 bytes, followed by the checksum of the id
+            name: bytes = data[pos:pos + size - 4].rstrip(b"\0")
+            paths.append(name.decode('utf-8', errors='surrogateescape'))
+        pos += size
+
+    base: Path = path.parent
+    for out, inputs in deps.items():
+        if 0 <= out < len(paths) and all(0 <= i < len(paths) for i in inputs):
+            yield _normalize(base, paths[out]), [_normalize(base, paths[i]) for i in inputs]
+
+def depfiles(root: Path) -> Iterator[Path]:
+    """
+    make style depfiles below `root`: per object `.d` and `.ddc` files and
+    nuttx `Make.dep` files.
+    """
+    for dirpath, dirnames, filenames in os.walk(root):
+        # Version control metadata only
+        dirnames[:] = [d for d in dirnames if d != ".git"]
+        for name in filenames:
+            if name == "Make.dep" or name.endswith((".d", ".ddc")):
+                yield Path(dirpath) / name
@@ -0,0 +1,208 @@
+"""
+Compiler diagnostics pulled out of build output as it streams by.
+
+Every line a build tool writes goes through a `Collector` (see
+`nxtool.utils.process`). GCC and Clang warnings and errors,
+
+    sched/foo.c:12:5: warning: unused variable 'x' [-Wunused-variable]
+
+are counted by file, line and message, so a header warning repeated by every
+translation unit including it is kept once. Memory stays bounded whatever the
+size of the output: messages are truncated and past `MAX_UNIQUE` distinct
+diagnostics only the counts grow.
+
+The diagnostics of the last build of every configuration are kept in
+.nxtool/logs/diagnostics, `nxtool build diagnostics` reads these summaries
+and never the raw logs.
+"""
+import json
+import os
+import re
+import time
+
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from nxtool.config.paths import PathsStore
+from nxtool.utils.fs import atomic_write
+
+# Distinct diagnostics kept per process
+MAX_UNIQUE: int = 5000
+# Characters of a message kept
+MAX_MESSAGE: int = 300
+
+SEVERITIES: tuple[str, ...] = ("error", "warning")
+
+_ANSI = re.compile(r"\x1b\[[0-9;]*[mK]")
+_DIAGNOSTIC = re.compile(
+    r"^(?P<file>(?:[A-Za-z]:)?[^:\s][^:]*?):(?P<line>\d+):(?:\d+:)?\s*"
+    r"(?P<severity>warning|error|fatal error):\s*(?P<message>.*?)"
+    r"(?:\s*\[(?P<flag>-W[^\]]*)\])?\s*$"
+)
+
+@dataclass
+class Diagnostic():
+    """
+    A distinct diagnostic and the number of times it was reported.
+    """
+    file: str
+    line: int
+    severity: str
+    message: str
+    flag: str | None = None
+    count: int = 1
+
+    @property
+    def key(self) -> tuple[str, int, str]:
+        return (self.file, self.line, self.message)
+
+@dataclass
+class Collector():
+    """
+    Bounded accumulator of the diagnostics of one process.
+
+    Attributes:
+        items (dict): Distinct diagnostics by file, line and message.
+        counts (dict[str, int]): Reported diagnostics by severity, repeats included.
+        dropped (int): Diagnostics not kept because `MAX_UNIQUE` was reached.
+    """
+    items: dict[tuple[str, int, str], Diagnostic] = field(default_factory=dict)
+    counts: dict[str, int] = field(default_factory=lambda: {s: 0 for s in SEVERITIES})
+    dropped: int = 0
+
+    def feed(self, line: str) -> None:
+        """
+        Account for a line of output, anything but a diagnostic is ignored.
+        """
+        # Cheap test first, nearly every line is something else
+        if "error" not in line and "warning:" not in line:
+            return
+        match: re.Match | None = _DIAGNOSTIC.match(_ANSI.sub("", line) if "\x1b" in line else line)
+        if match is None:
+            return
+
+        severity: str = "error" if match.group("severity") != "warning" else "warning"
+        self.counts[severity] += 1
+        message: str = match.group("message")[:MAX_MESSAGE]
+        key: tuple[str, int, str] = (match.group("file"), int(match.group("line")), message)
+        found: Diagnostic | None = self.items.get(key)
+        if found is not None:
+            found.count += 1
+        elif len(self.items) < MAX_UNIQUE:
+            self.items[key] = Diagnostic(
+                key[0], key[1], severity, message, match.group("flag")
+            )
+        else:
+            self.dropped += 1
+
+    def merge(self, other: "Collector") -> None:
+        """
+        Add the diagnostics of another process, e.g. of the configure step.
+        """
+        for name, count in other.counts.items():
+            self.counts[name] = self.counts.get(name, 0) + count
+        self.dropped += other.dropped
+        for key, diag in other.items.items():
+            found: Diagnostic | None = self.items.get(key)
+            if found is not None:
+                found.count += diag.count
+            elif len(self.items) < MAX_UNIQUE:
+                self.items[key] = Diagnostic(**vars(diag))
+            else:
+                self.dropped += 1
+
+def _relative(path: str, roots: list[Path]) -> str:
+    """
+    Path of a diagnostic relative to the workspace, as reported otherwise.
+    """
+    if os.path.isabs(path):
+        norm: str = os.path.normpath(path)
+        for root in roots:
+            if norm.startswith(f"{root}{os.sep}"):
+                return norm[len(f"{root}{os.sep}"):]
+    return path
+
+class DiagnosticsStore():
+    """
+    Diagnostics of the last build of every configuration.
+
+    A summary per configuration in .nxtool/logs/diagnostics, replaced by every
+    build of the configuration. Paths below the workspace root are stored
+    relative to it.
+    """
+    def __init__(self):
+        self.root: Path = PathsStore.nxtool_root
+        self.directory: Path = PathsStore.nxtool_logs_dir / "diagnostics"
+
+    def _path(self, config: str) -> Path:
+        return self.directory / f"{config.replace(':', '_').replace('/', '_')}.json"
+
+    def record(self, config: str, collector: Collector, success: bool) -> None:
+        """
+        Replace the summary of a configuration.
+
+        :param config: The `board:config` built.
+        :type config: str
+        :param collector: Diagnostics of the build.
+        :type collector: Collector
+        :param success: Whether the build succeeded.
+        :type success: bool
+        """
+        roots: list[Path] = [self.root.resolve()]
+        if f"{self.root}" != f"{roots[0]}":
+            roots.append(self.root)
+        data: dict[str, Any] = {
+            "config": config,
+            "time": int(time.time()),
+            "success": success,
+            "counts": collector.counts,
+            "dropped": collector.dropped,
+            "items": [
+                [_relative(d.file, roots), d.line, d.severity, d.message, d.flag, d.count]
+                for d in sorted(collector.items.values(), key=lambda d: d.key)
+            ],
+        }
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            atomic_write(self._path(config), json.dumps(data, separators=(",", ":")))
+        except OSError as e:
+            print(f"Cannot record the diagnostics of {config}: {e}")
+
+    def summaries(self) -> list[dict[str, Any]]:
+        """
+        Recorded summaries, sorted by configuration.
+        """
+        found: list[dict[str, Any]] = []
+        for path in self.directory.glob("*.json"):
+            try:
+                found.append(json.loads(path.read_text(encoding='utf-8')))
+            except (OSError, ValueError):
+                continue
+        return sorted(found, key=lambda s: s["config"])
+
+def prune_logs(directory: Path, keep: int | None, quota: int | None) -> None:
+    """
+    Remove the oldest compressed logs above a number of files or a total size.
+
+    :param directory: The log directory.
+    :type directory: Path
+    :param keep: Logs kept, `None` for no limit.
+    :type keep: int | None
+    :param quota: Total size of the logs in bytes, `None` for no limit.
+    :type quota: int | None
+    """
+    logs: list[tuple[float, int, Path]] = []
+    for path in directory.glob("*.log.gz"):
+        try:
+            st = path.stat()
+        except OSError:
+            continue
+        logs.append((st.st_mtime, st.st_size, path))
+    logs.sort(reverse=True)
+
+    total: int = 0
+    for i, (_, size, path) in enumerate(logs):
+        total += size
+        if (keep is not None and i >= keep) or (quota is not None and total > quota):
+            path.unlink(missing_ok=True)
@@ -0,0 +1,161 @@
+"""
+Minimal ELF reader for firmware size accounting.
+
+Only section headers and the symbol table are read, with `struct` straight
+from a memory mapping of the file, debug information is never touched.
+Both 32 and 64 bit and either byte order are supported.
+
+Allocated sections are classified like binutils `size` does:
+
+- text: read-only contents (code, constants), stored in flash
+- data: writable contents, stored in flash and copied to RAM
+- bss: writable space without contents, RAM only
+"""
+
+import mmap
+import struct
+
+from dataclasses import dataclass
+from pathlib import Path
+
+SHT_SYMTAB: int = 2
+SHT_NOBITS: int = 8
+SHF_WRITE: int = 0x1
+SHF_ALLOC: int = 0x2
+STT_OBJECT: int = 1
+STT_FUNC: int = 2
+
+@dataclass
+class Section():
+    name: str
+    type: int
+    flags: int
+    addr: int
+    offset: int
+    size: int
+    link: int
+    entsize: int
+
+    @property
+    def kind(self) -> str | None:
+        """
+        "text", "data" or "bss", `None` for sections not loaded on the target.
+        """
+        if not self.flags & SHF_ALLOC:
+            return None
+        if self.type == SHT_NOBITS:
+            return "bss"
+        return "data" if self.flags & SHF_WRITE else "text"
+
+class ElfFile():
+    """
+    Sections and sized symbols of an ELF file.
+    """
+    def __init__(self, path: Path):
+        """
+        :param path: The ELF file.
+        :type path: Path
+        :raises ValueError: If the file is not an ELF file.
+        :raises OSError: If the file cannot be read.
+        """
+        self.path: Path = path
+        with open(path, 'rb') as file:
+            try:
+                self._data: mmap.mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError as e:
+                # Empty file
+                raise ValueError(f"{path} is not an ELF file") from e
+
+        ident: bytes = self._data[:16]
+        if len(ident) < 16 or ident[:4] != b"\x7fELF":
+            raise ValueError(f"{path} is not an ELF file")
+        self._is64: bool = ident[4] == 2
+        self._endian: str = "<" if ident[5] == 1 else ">"
+        self.sections: list[Section] = self._read_sections()
+
+    def _read_sections(self) -> list[Section]:
+        e: str = self._endian
+        if self._is64:
+            shoff, = struct.unpack_from(f"{e}Q", self._data, 0x28)
+            shentsize, shnum, shstrndx = struct.unpack_from(f"{e}HHH", self._data, 0x3a)
+            fmt: str = f"{e}IIQQQQIIQQ"
+        else:
+            shoff, = struct.unpack_from(f"{e}I", self._data, 0x20)
+            shentsize, shnum, shstrndx = struct.unpack_from(f"{e}HHH", self._data, 0x2e)
+            fmt = f"{e}IIIIIIIIII"
+
+        raw: list[tuple[int, ...]] = [
+            struct.unpack_from(fmt, self._data, shoff + i * shentsize) for i in range(shnum)
+        ]
+        names_off: int = raw[shstrndx][4] if shstrndx < len(raw) else 0
+
+        def name(off: int) -> str:
+            end: int = self._data.find(b"\0", names_off + off)
+            return self._data[names_off + off:end].decode('ascii', errors='replace')
+
+        return [
+            Section(name(r[0]), r[1], r[2], r[3], r[4], r[5], r[6], r[9])
+            for r in raw
+        ]
+
+    def totals(self) -> dict[str, int]:
+        """
+        Size of every kind of section, plus the resulting flash and RAM use.
+        """
+        sizes: dict[str, int] = {"text": 0, "data": 0, "bss": 0}
+        for section in self.sections:
+            if section.kind is not None:
+                sizes[section.kind] += section.size
+        sizes["flash"] = sizes["text"] + sizes["data"]
+        sizes["ram"] = sizes["data"] + sizes["bss"]
+        return sizes
+
+    def kinds(self) -> dict[str, str]:
+        """
+        Kind of every allocated section, by name.
+        """
+        return {s.name: s.kind for s in self.sections if s.kind is not None}
+
+    def symbols(self) -> dict[str, tuple[int, str]]:
+        """
+        Functions and objects with a size, in allocated sections.
+
+        :return: Symbol name to size and section kind. Local symbols sharing
+            a name are added up.
+        :rtype: dict[str, tuple[int, str]]
+        """
+        symtab: Section | None = next(
+            (s for s in self.sections if s.type == SHT_SYMTAB), None
+        )
+        if symtab is None or symtab.entsize == 0:
+            return {}
+        strtab: Section = self.sections[symtab.link]
+
+        e: str = self._endian
+        data: memoryview = memoryview(self._data)[symtab.offset:symtab.offset + symtab.size]
+        if self._is64:
+            # name, info, other, shndx, value, size
+            entries = ((n, i, x, v, z) for n, i, _, x, v, z in struct.iter_unpack(f"{e}IBBHQQ", data))
+        else:
+            # name, value, size, info, other, shndx
+            entries = ((n, i, x, v, z) for n, v, z, i, _, x in struct.iter_unpack(f"{e}IIIBBH", data))
+
+        symbols: dict[str, tuple[int, str]] = {}
+        kinds: list[str | None] = [s.kind for s in self.sections]
+        strings: int = strtab.offset
+        for name_off, info, shndx, _, size in entries:
+            if size == 0 or info & 0xf not in (STT_OBJECT, STT_FUNC):
+                continue
+            if shndx == 0 or shndx >= len(kinds):
+                continue
+            kind: str | None = kinds[shndx]
+            if kind is None:
+                continue
+            start: int = strings + name_off
+            name: str = self._data[start:self._data.find(b"\0", start)].decode(
+                'utf-8', errors='replace'
+            )
+            if name in symbols:
+                size += symbols[name][0]
+            symbols[name] = (size, kind)
+        return symbols
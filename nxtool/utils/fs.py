@@ -0,0 +1,162 @@
+"""
+Filesystem helpers shared by the stores and caches kept under .nxtool
+"""
+
+import os
+import re
+import tempfile
+
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None  # type: ignore[assignment]
+
+def atomic_write(path: Path, data: str | bytes) -> None:
+    """
+    Write `data` to `path` so readers never observe a partially written file.
+
+    The content is written to a temporary file in the same directory and then
+    renamed over the destination, keeping the permissions of the file it replaces.
+
+    :param path: Destination file.
+    :type path: Path
+    :param data: Content to write, text is encoded as utf-8.
+    :type data: str | bytes
+    """
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as file:
+            file.write(data.encode('utf-8') if isinstance(data, str) else data)
+        try:
+            os.chmod(tmp, os.stat(path).st_mode & 0o777)
+        except FileNotFoundError:
+            os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+@contextmanager
+def file_lock(path: Path, shared: bool = False) -> Iterator[None]:
+    """
+    Hold an exclusive lock protecting `path` from other processes.
+
+    The lock is taken on a `<name>.lock` file next to `path`, the file itself
+    is replaced by `atomic_write` and a lock on it would not survive that.
+    Platforms without fcntl get no locking.
+
+    :param path: The protected file.
+    :type path: Path
+    :param shared: Hold a shared lock, for readers, instead.
+    :type shared: bool
+    """
+    if fcntl is None:
+        yield
+        return
+
+    try:
+        fd: int = os.open(path.with_name(f"{path.name}.lock"), os.O_RDWR | os.O_CREAT, 0o644)
+    except FileNotFoundError:
+        # No workspace, writing the protected file fails on its own
+        yield
+        return
+
+    try:
+        fcntl.flock(fd, fcntl.LOCK_SH if shared is True else fcntl.LOCK_EX)
+        yield
+    finally:
+        # Closing the descriptor releases the lock
+        os.close(fd)
+
+def try_lock(path: Path, shared: bool = False) -> int | None:
+    """
+    Take the lock of `file_lock` without waiting, held until `unlock`.
+
+    Any number of shared locks can be held together, an exclusive lock
+    excludes every other one.
+
+    :param path: The protected file or directory.
+    :type path: Path
+    :param shared: Take a shared lock instead of an exclusive one.
+    :type shared: bool
+    :return: Descriptor holding the lock, `None` if a conflicting lock is
+        held. -1 on platforms without fcntl.
+    :rtype: int | None
+    """
+    if fcntl is None:
+        return -1
+    fd: int = os.open(path.with_name(f"{path.name}.lock"), os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, (fcntl.LOCK_SH if shared is True else fcntl.LOCK_EX) | fcntl.LOCK_NB)
+    except BlockingIOError:
+        os.close(fd)
+        return None
+    return fd
+
+def unlock(fd: int) -> None:
+    """
+    Release a lock taken by `try_lock`.
+    """
+    if fd >= 0:
+        os.close(fd)
+
+def disk_usage(path: Path) -> int:
+    """
+    Disk space used by a directory tree in bytes, like `du -s`.
+
+    Symlinks are not followed, files vanishing during the walk are skipped.
+    """
+    total: int = 0
+    stack: list[str] = [f"{path}"]
+    while len(stack) > 0:
+        try:
+            with os.scandir(stack.pop()) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                        else:
+                            total += entry.stat(follow_symlinks=False).st_blocks * 512
+                    except OSError:
+                        continue
+        except OSError:
+            continue
+    return total
+
+_SIZE_UNITS: dict[str, int] = {
+    "": 1,
+    "k": 10**3, "m": 10**6, "g": 10**9, "t": 10**12,
+    "ki": 2**10, "mi": 2**20, "gi": 2**30, "ti": 2**40,
+}
+
+def parse_size(size: str) -> int:
+    """
+    Convert a human readable size to bytes.
+
+    Plain suffixes (k, M, G, T) are decimal and `i` suffixes (Ki, Mi, Gi, Ti)
+    are binary, the same convention ccache uses. A trailing `B` is ignored.
+
+    :param size: Size string such as "5G", "500 MiB" or "1024".
+    :type size: str
+    :return: Size in bytes.
+    :rtype: int
+    :raises ValueError: If the string is not a valid size.
+    """
+    m = re.fullmatch(r"\s*([0-9]*\.?[0-9]+)\s*([kmgt]i?)?b?\s*", size, re.IGNORECASE)
+    if m is None:
+        raise ValueError(f"invalid size '{size}'")
+    return int(float(m.group(1)) * _SIZE_UNITS[(m.group(2) or "").lower()])
+
+def format_size(size: float) -> str:
+    """
+    Convert a size in bytes to a short human readable string using binary units.
+    """
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if abs(size) < 1024:
+            return f"{size:.1f} {unit}" if unit != "B" else f"{int(size)} B"
+        size /= 1024
+    return f"{size:.1f} TiB"
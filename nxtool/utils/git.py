@@ -1,26 +1,309 @@
-import sys
 import subprocess
 
+from pathlib import Path
+
+from nxtool.utils.process import ProcessRunner
+
 class GitWrapper():
+    """
+    Wrapper over the git executable for a single remote repository.
+
+    Local paths are valid remotes. Note that git ignores `depth` and `filter`
+    for plain local paths, use a `file://` url to exercise them locally.
+    """
     def __init__(
         self,
-        repo: str
+        repo: str,
+        runner: ProcessRunner | None = None
     ) -> None:
         self.repo = repo
+        self.runner: ProcessRunner = runner or ProcessRunner()
 
-    def _run_git_cmd(self, args: list[str]) -> None:
+    def _run_git_cmd(self, args: list[str]) -> int:
         cmd = ['git'] + args
-        with subprocess.Popen(
-            cmd, stdout=subprocess.PIPE, text=True
-        ) as proc:
-            if proc.stdout:
-                for line in iter(proc.stdout.readline, ''):
-                    sys.stdout.write(line)
-                proc.communicate()
-
-    def clone(self, name: str | None):
-        self._run_git_cmd([
-            'clone',
+        return self.runner.run(cmd, log_name="git").returncode
+
+    @staticmethod
+    def _transfer_args(depth: int | None, filter: str | None) -> list[str]:
+        args: list[str] = []
+        if depth is not None:
+            args += ['--depth', f"{depth}"]
+        if filter is not None:
+            args += [f"--filter={filter}"]
+        return args
+
+    def clone(
+        self,
+        name: str | None,
+        depth: int | None = None,
+        filter: str | None = None,
+        reference: Path | None = None,
+        mirror: bool = False
+    ) -> int:
+        """
+        Clone the remote.
+
+        :param name: Destination directory, defaults to git's choice.
+        :type name: str | None
+        :param depth: Create a shallow clone with this many commits.
+        :type depth: int | None
+        :param filter: Partial clone filter, e.g. "blob:none".
+        :type filter: str | None
+        :param reference: Local repository to borrow objects from, ignored if missing.
+        :type reference: Path | None
+        :param mirror: Create a bare mirror of all refs.
+        :type mirror: bool
+        :return: git exit code.
+        :rtype: int
+        """
+        args: list[str] = ['clone'] + self._transfer_args(depth, filter)
+        if reference is not None:
+            args += ['--reference-if-able', f"{reference}"]
+        if mirror is True:
+            args += ['--mirror']
+        return self._run_git_cmd(args + [
             self.repo,
-            name or ""
-        ])
+        ] + ([name] if name else []))
+
+    def fetch(
+        self,
+        path: Path,
+        depth: int | None = None,
+        filter: str | None = None
+    ) -> int:
+        """
+        Incrementally fetch the remote into an existing repository.
+
+        :param path: The existing clone or mirror.
+        :type path: Path
+        :param depth: Keep the history shallow, limited to this many commits.
+        :type depth: int | None
+        :param filter: Partial clone filter, e.g. "blob:none".
+        :type filter: str | None
+        :return: git exit code.
+        :rtype: int
+        """
+        return self._run_git_cmd(
+            ['-C', f"{path}", 'fetch', '--prune'] + self._transfer_args(depth, filter)
+        )
+
+    def worktree_add(self, path: Path, dest: Path, rev: str) -> int:
+        """
+        Add a detached worktree of an existing repository, sharing its objects.
+
+        :param path: The existing clone.
+        :type path: Path
+        :param dest: Directory of the new worktree.
+        :type dest: Path
+        :param rev: Commit checked out in the worktree.
+        :type rev: str
+        :return: git exit code.
+        :rtype: int
+        """
+        return self._run_git_cmd(
+            ['-C', f"{path}", 'worktree', 'add', '--detach', f"{dest}", rev]
+        )
+
+    def worktree_remove(self, path: Path, dest: Path) -> int:
+        """
+        Remove a worktree of an existing repository, build outputs included.
+
+        :param path: The existing clone.
+        :type path: Path
+        :param dest: The worktree.
+        :type dest: Path
+        :return: git exit code.
+        :rtype: int
+        """
+        return self._run_git_cmd(
+            ['-C', f"{path}", 'worktree', 'remove', '--force', f"{dest}"]
+        )
+
+    def worktree_prune(self, path: Path) -> int:
+        """
+        Forget the worktrees of an existing repository whose directory is gone.
+
+        :param path: The existing clone.
+        :type path: Path
+        :return: git exit code.
+        :rtype: int
+        """
+        return self._run_git_cmd(['-C', f"{path}", 'worktree', 'prune'])
+
+    def checkout(self, path: Path, rev: str) -> int:
+        """
+        Detach the HEAD of a checkout or worktree at `rev`.
+
+        :param path: The checkout.
+        :type path: Path
+        :param rev: Commit to check out.
+        :type rev: str
+        :return: git exit code.
+        :rtype: int
+        """
+        return self._run_git_cmd(['-C', f"{path}", 'checkout', '--detach', '--quiet', rev])
+
+def resolve(repo: Path, rev: str) -> str | None:
+    """
+    Resolve a revision (branch, tag, commit) of `repo` to a commit hash.
+
+    Branches only known to the remote are found as `origin/<rev>`.
+
+    :param repo: Path to the repository working tree.
+    :type repo: Path
+    :param rev: The revision.
+    :type rev: str
+    :return: The commit hash, or `None` if `repo` does not have it.
+    :rtype: str | None
+    """
+    for candidate in (rev, f"origin/{rev}"):
+        try:
+            out: str = subprocess.run(
+                ["git", "-C", f"{repo}", "rev-parse", "--verify", "--quiet",
+                 f"{candidate}^{{commit}}"],
+                stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, check=False, text=True
+            ).stdout.strip()
+        except OSError:
+            return None
+        if out:
+            return out
+    return None
+
+def _query(repo: Path, args: list[str]) -> str | None:
+    """
+    Output of a read-only git command, `None` if it fails.
+    """
+    try:
+        proc = subprocess.run(
+            ["git", "-C", f"{repo}"] + args,
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, check=False,
+            text=True, errors="surrogateescape"
+        )
+    except OSError:
+        return None
+    return proc.stdout if proc.returncode == 0 else None
+
+def merge_base(repo: Path, rev: str) -> str | None:
+    """
+    Commit HEAD of `repo` forked from `rev`, like the base of a pull request.
+
+    :return: The commit hash, or `None` if `rev` is unknown or unrelated.
+    :rtype: str | None
+    """
+    commit: str | None = resolve(repo, rev)
+    if commit is None:
+        return None
+    out: str | None = _query(repo, ["merge-base", commit, "HEAD"])
+    if out is None:
+        return None
+    return out.strip() or None
+
+def changed_files(repo: Path, base: str) -> list[tuple[str, str]] | None:
+    """
+    Files of the working tree that differ from a commit, uncommitted and
+    untracked files included. Renames are reported as a deletion and an addition.
+
+    :param repo: Path to the repository working tree.
+    :type repo: Path
+    :param base: The commit compared with.
+    :type base: str
+    :return: Status letter ("A", "D", "M", ...) and path relative to `repo`,
+        `None` if git fails.
+    :rtype: list[tuple[str, str]] | None
+    """
+    diff: str | None = _query(repo, ["diff", "--name-status", "--no-renames", "-z", base])
+    untracked: str | None = _query(repo, ["ls-files", "--others", "--exclude-standard", "-z"])
+    if diff is None or untracked is None:
+        return None
+    fields: list[str] = diff.split("\0")
+    changes: list[tuple[str, str]] = [
+        (fields[i][:1], fields[i + 1]) for i in range(0, len(fields) - 1, 2)
+    ]
+    changes += [("A", path) for path in untracked.split("\0") if path]
+    return changes
+
+def changed_lines(repo: Path, base: str, path: str) -> tuple[list[int], list[int]]:
+    """
+    Lines of a file that differ between a commit and the working tree.
+
+    A deletion is reported at the line that follows it on the other side.
+
+    :return: Line numbers in the `base` version and in the working tree.
+    :rtype: tuple[list[int], list[int]]
+    """
+    out: str = _query(repo, ["diff", "-U0", "--no-color", base, "--", path]) or ""
+    old: list[int] = []
+    new: list[int] = []
+    for line in out.splitlines():
+        if not line.startswith("@@"):
+            continue
+        # @@ -start[,count] +start[,count] @@
+        ranges: list[str] = line.split()[1:3]
+        for side, lines in zip(ranges, (old, new)):
+            start, _, count = side[1:].partition(",")
+            n: int = int(count) if count else 1
+            lines.extend(range(int(start), int(start) + n) if n > 0 else [int(start) + 1])
+    return old, new
+
+def show(repo: Path, rev: str, path: str) -> str | None:
+    """
+    Content of a file at a revision, `None` if it did not exist.
+    """
+    return _query(repo, ["show", f"{rev}:{path}"])
+
+def _git_dir(repo: Path) -> Path:
+    """
+    Return the git directory of `repo`, following `.git` files used by
+    worktrees and submodules.
+    """
+    gitdir: Path = repo / ".git"
+    if gitdir.is_file():
+        content = gitdir.read_text(encoding='utf-8').strip()
+        if content.startswith("gitdir:"):
+            gitdir = (repo / content[len("gitdir:"):].strip()).resolve()
+    return gitdir
+
+def head(repo: Path) -> str | None:
+    """
+    Resolve the commit HEAD of `repo` points to without spawning git.
+
+    Symbolic refs are followed through loose refs first and packed-refs second.
+
+    :param repo: Path to the repository working tree.
+    :type repo: Path
+    :return: The commit hash, or `None` if it cannot be resolved.
+    :rtype: str | None
+    """
+    gitdir: Path = _git_dir(repo)
+    try:
+        ref: str = (gitdir / "HEAD").read_text(encoding='utf-8').strip()
+    except OSError:
+        return None
+
+    if not ref.startswith("ref:"):
+        return ref or None
+    ref = ref[len("ref:"):].strip()
+
+    # Worktrees keep their HEAD locally but share refs with the main repository
+    common: Path = gitdir
+    try:
+        common = (gitdir / (gitdir / "commondir").read_text(encoding='utf-8').strip()).resolve()
+    except OSError:
+        pass
+
+    for base in dict.fromkeys((gitdir, common)):
+        try:
+            return (base / ref).read_text(encoding='utf-8').strip()
+        except OSError:
+            continue
+
+    try:
+        with open(common / "packed-refs", 'r', encoding='utf-8') as file:
+            for line in file:
+                sha, _, name = line.strip().partition(" ")
+                if name == ref:
+                    return sha
+    except OSError:
+        pass
+
+    return None
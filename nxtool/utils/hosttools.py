@@ -0,0 +1,172 @@
+"""
+Host tools built once per nuttx revision.
+
+The tools declared in nuttx/tools/CMakeLists.txt (mkconfig, mkversion, ...) are
+built from that standalone project into `.nxtool/bin/<rev>/` and shared by every
+make build of that revision, instead of being compiled again by each of them.
+CMake builds do not use them: the nuttx CMake project builds its host tools
+in every build directory.
+"""
+
+import dataclasses
+import json
+import shutil
+import time
+
+from pathlib import Path
+from typing import Any
+
+from nxtool.config.configuration import PathsStore, ToolsStore
+from nxtool.utils.fs import atomic_write, file_lock
+from nxtool.utils.git import head
+from nxtool.utils.process import ProcessRunner
+
+class HostTools():
+    """
+    Cache of the nuttx host tools for the revision of a nuttx source tree.
+
+    Attributes:
+        nuttx (Path): nuttx source tree the tools are built from.
+        rev (str | None): HEAD of `nuttx`.
+        bin_dir (Path | None): Directory holding the tools, `None` if the
+            revision is unknown (not a git checkout).
+    """
+    # Revisions kept in .nxtool/bin besides the current one
+    KEEP_REVISIONS: int = 3
+    MANIFEST: str = "tools.json"
+
+    def __init__(self, nuttx: Path | None = None, runner: ProcessRunner | None = None) -> None:
+        """
+        :param nuttx: nuttx source tree, defaults to the workspace checkout.
+            The worktree of a pinned revision gets the tools of that revision.
+        :type nuttx: Path | None
+        :param runner: Process runner template, the tools build gets a copy
+            prefixed with "[hosttools]".
+        :type runner: ProcessRunner | None
+        """
+        self.runner: ProcessRunner = dataclasses.replace(
+            runner or ProcessRunner(), prefix="[hosttools] "
+        )
+        self.nuttx: Path = nuttx or PathsStore.nxtool_root / "nuttx"
+        self.rev: str | None = head(self.nuttx)
+        self.bin_dir: Path | None = (
+            PathsStore.nxtool_bin_dir / self.rev if self.rev is not None else None
+        )
+
+    def manifest(self) -> dict[str, Any] | None:
+        """
+        Outcome of the last tools build for this revision, `None` if never built.
+        """
+        if self.bin_dir is None:
+            return None
+        try:
+            return json.loads((self.bin_dir / self.MANIFEST).read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return None
+
+    def state(self) -> dict[str, str]:
+        """
+        Build state of every tool: "cached", "failed" (the tools build failed),
+        "unavailable" (not built on this host) or "missing" (not built yet).
+        """
+        manifest: dict[str, Any] | None = self.manifest()
+        state: dict[str, str] = {}
+        for tool in ToolsStore().tools_list:
+            if self.bin_dir is not None and (self.bin_dir / tool).is_file():
+                state[tool] = "cached"
+            elif manifest is None:
+                state[tool] = "missing"
+            elif manifest["success"] is False:
+                state[tool] = "failed"
+            else:
+                state[tool] = "unavailable"
+        return state
+
+    def ensure(self, force: bool = False, jobs: int | None = None) -> bool:
+        """
+        Build the tools unless this revision was already built.
+
+        Concurrent callers, threads or processes, wait for the first one to
+        finish and then reuse its result. A failed build is not retried
+        unless `force` is set.
+
+        :param force: Build again even if this revision was already built.
+        :type force: bool
+        :param jobs: Parallel jobs for the tools build.
+        :type jobs: int | None
+        :return: `True` if the tools are available.
+        :rtype: bool
+        """
+        if self.bin_dir is None or len(ToolsStore().tools_list) == 0:
+            return False
+
+        PathsStore.nxtool_bin_dir.mkdir(parents=True, exist_ok=True)
+        with file_lock(PathsStore.nxtool_bin_dir / "build"):
+            manifest: dict[str, Any] | None = self.manifest()
+            if force is False and manifest is not None:
+                return manifest["success"]
+            return self._build(jobs)
+
+    def _build(self, jobs: int | None) -> bool:
+        assert self.bin_dir is not None
+        tools: list[str] = ToolsStore().tools_list
+        build_dir: Path = self.bin_dir / ".build"
+        self.bin_dir.mkdir(parents=True, exist_ok=True)
+
+        try:
+            ret: int = self.runner.run([
+                "cmake", "-S", f"{self.nuttx / 'tools'}", "-B", f"{build_dir}",
+                "-D", "CMAKE_BUILD_TYPE=Release",
+            ], log_name="hosttools").returncode
+            if ret == 0:
+                # Some tools are only declared on some hosts, build what exists
+                ret = self.runner.run(
+                    ["cmake", "--build", f"{build_dir}"]
+                    + ([] if jobs is None else ["--parallel", f"{jobs}"]),
+                    log_name="hosttools"
+                ).returncode
+        except OSError as e:
+            print(f"{self.runner.prefix}{e}")
+            ret = 127
+
+        built: list[str] = []
+        for tool in tools:
+            binary: Path = build_dir / tool
+            if binary.is_file():
+                shutil.copy2(binary, self.bin_dir / tool)
+                built.append(tool)
+
+        atomic_write(self.bin_dir / self.MANIFEST, json.dumps({
+            "rev": self.rev,
+            "success": ret == 0,
+            "tools": built,
+            "time": int(time.time()),
+        }))
+        shutil.rmtree(build_dir, ignore_errors=True)
+        self._prune()
+        return ret == 0
+
+    def _prune(self) -> None:
+        """
+        Remove the tools of all but the most recently built revisions.
+        """
+        revs: list[Path] = sorted(
+            (p for p in PathsStore.nxtool_bin_dir.iterdir() if p.is_dir() and p != self.bin_dir),
+            key=lambda p: p.stat().st_mtime,
+            reverse=True
+        )
+        for old in revs[self.KEEP_REVISIONS:]:
+            shutil.rmtree(old, ignore_errors=True)
+
+def workspace_tools(nuttx: Path | None = None, runner: ProcessRunner | None = None) -> Path | None:
+    """
+    Host tools directory for the builds of a nuttx source tree, building the
+    tools first if needed.
+
+    :param nuttx: nuttx source tree, defaults to the workspace checkout.
+    :type nuttx: Path | None
+    :return: The directory, `None` if the tools are not available.
+    :rtype: Path | None
+    """
+    tools: HostTools = HostTools(nuttx, runner)
+    return tools.bin_dir if tools.ensure() is True else None
@@ -0,0 +1,393 @@
+"""
+Change impact analysis: the board configurations whose build output a set of
+changed files can change.
+
+Every changed file is first scoped by its place in the tree:
+
+- boards/: the configurations below the closest directory holding any. A
+  defconfig is its own configuration, a board directory all the configurations
+  of the board, a chip directory every board of the chip.
+- arch/<arch>/src/<chip> and arch/<arch>/include/<chip>: the configurations
+  with that CONFIG_ARCH_CHIP, anything else in arch/<arch> the whole arch.
+- Documentation and text files: none.
+- anything else, public headers, Kconfig files, tools and build scripts
+  included: all configurations.
+
+Sources, private headers and build files are then narrowed by the Kconfig
+symbols the build files guard them with. The Make.defs, Makefile and
+CMakeLists.txt files of nuttx and apps are read for blocks like
+
+    ifeq ($(CONFIG_SENSORS),y)        if(CONFIG_SENSORS)
+      CSRCS += bmp180.c                 list(APPEND SRCS bmp180.c)
+    endif                             endif()
+
+A source is narrowed by the conditions around its mentions in the build files
+of its directory. Every directory up to the root is narrowed by the conditions
+around its mentions in the build files of its parent, and by those around all
+of its own Make.defs or CMakeLists.txt, the usual way a nuttx driver directory
+or an app is switched on. A changed build file is narrowed by the conditions
+around the changed lines, in the old and the new version.
+
+When the analysis cannot tell it keeps the wider set: a source no build file
+of its directory mentions, negated conditions and else branches, a checkout
+without a Kconfig tree.
+"""
+import re
+
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass
+from pathlib import Path, PurePosixPath
+
+from nxtool.utils.git import changed_lines, show
+from nxtool.utils.kconfig import parse_defconfig
+
+BUILD_FILES: tuple[str, ...] = ("Make.defs", "Makefile", "CMakeLists.txt")
+SOURCES: frozenset[str] = frozenset({".c", ".S", ".s", ".asm", ".cc", ".cpp", ".cxx"})
+HEADERS: frozenset[str] = frozenset({".h", ".hh", ".hpp", ".hxx"})
+
+# Files that never reach a build output
+NO_OUTPUT_DIRS: frozenset[str] = frozenset({"Documentation", ".github"})
+NO_OUTPUT_SUFFIXES: frozenset[str] = frozenset({".md", ".rst"})
+NO_OUTPUT_NAMES: frozenset[str] = frozenset({
+    "LICENSE", "NOTICE", "DISCLAIMER", "ReleaseNotes", "CODEOWNERS", ".asf.yaml", ".gitignore",
+})
+
+# Symbols guarding a block, it is built when any of them is enabled
+Gate = frozenset[str]
+# Gates around a line, it is built when all of them hold
+Guard = tuple[Gate, ...]
+
+_SYMBOL = re.compile(r"CONFIG_(\w+)")
+_MAKE_IF = re.compile(r"^\s*(ifeq|ifneq|ifdef|ifndef)\b\s*(.*)$")
+_MAKE_ARGS = re.compile(r"^\((.*),(.*)\)$")
+_CMAKE_IF = re.compile(r"^\s*if\s*\((.*)$", re.IGNORECASE)
+_ELSE = re.compile(r"^\s*(else|elseif)\b", re.IGNORECASE)
+_ENDIF = re.compile(r"^\s*endif\b", re.IGNORECASE)
+# Build files included by the parent directory, make and CMake
+_INCLUDED: tuple[str, ...] = ("Make.defs", "CMakeLists.txt")
+
+def _make_gate(kind: str, args: str) -> Gate | None:
+    """
+    Symbols one of which a make conditional needs, `None` if it needs none.
+    """
+    symbols: Gate = frozenset(_SYMBOL.findall(args))
+    if len(symbols) == 0 or kind == "ifndef":
+        return None
+    if kind == "ifdef":
+        return symbols
+    match: re.Match | None = _MAKE_ARGS.match(args.strip())
+    if match is None:
+        return None
+    values: list[str] = [s.strip().strip("\"'") for s in match.groups() if "CONFIG_" not in s]
+    if len(values) != 1:
+        return None
+    # ifeq ($(CONFIG_X),y) and ifneq ($(CONFIG_X),), not their negations
+    if (kind == "ifeq" and values[0] not in ("", "n")) or (kind == "ifneq" and values[0] == ""):
+        return symbols
+    return None
+
+def _cmake_gate(condition: str) -> Gate | None:
+    """
+    Symbols one of which a CMake if() needs, `None` if it needs none.
+    """
+    symbols: Gate = frozenset(_SYMBOL.findall(condition))
+    if len(symbols) == 0 or re.search(r"\bNOT\b", condition) or '""' in condition:
+        return None
+    return symbols
+
+def guards(text: str) -> list[Guard]:
+    """
+    Guard of every line of a make or CMake file.
+
+    Conditional lines (if, else, endif) get the guard of the block around
+    them, changing one changes what that whole block builds.
+
+    :param text: Content of the build file.
+    :type text: str
+    :return: The guard of every line, in order.
+    :rtype: list[Guard]
+    """
+    result: list[Guard] = []
+    stack: list[Gate | None] = []
+    for line in text.splitlines():
+        make: re.Match | None = _MAKE_IF.match(line)
+        cmake: re.Match | None = _CMAKE_IF.match(line) if make is None else None
+        if make is not None or cmake is not None:
+            result.append(tuple(g for g in stack if g is not None))
+            stack.append(
+                _make_gate(make.group(1), make.group(2)) if make is not None
+                else _cmake_gate(cmake.group(1))  # type: ignore[union-attr]
+            )
+        elif _ELSE.match(line) or _ENDIF.match(line):
+            result.append(tuple(g for g in stack[:-1] if g is not None))
+            if stack and _ENDIF.match(line):
+                stack.pop()
+            elif stack:
+                # Whatever else needs, it is not the symbols of the if
+                stack[-1] = None
+        else:
+            result.append(tuple(g for g in stack if g is not None))
+    return result
+
+def _mention(name: str) -> re.Pattern:
+    return re.compile(rf"(?<![\w.\-]){re.escape(name)}(?![\w.\-])")
+
+class BuildFiles():
+    """
+    Parsed build files of a checkout, read once.
+    """
+    def __init__(self, root: Path):
+        self.root: Path = root
+        self._lines: dict[PurePosixPath, list[tuple[str, Guard]]] = {}
+
+    def lines(self, path: PurePosixPath) -> list[tuple[str, Guard]]:
+        """
+        Lines of a build file with their guard, none if it does not exist.
+        """
+        if path not in self._lines:
+            try:
+                text: str = (self.root / path).read_text(encoding='utf-8', errors='replace')
+            except OSError:
+                text = ""
+            self._lines[path] = list(zip(text.splitlines(), guards(text)))
+        return self._lines[path]
+
+    def mentions(self, directory: PurePosixPath, name: str) -> list[Guard]:
+        """
+        Guards of the lines of the build files of a directory mentioning `name`.
+        """
+        pattern: re.Pattern = _mention(name)
+        found: list[Guard] = []
+        for build in BUILD_FILES:
+            found.extend(g for text, g in self.lines(directory / build) if pattern.search(text))
+        return found
+
+    def wrapped(self, directory: PurePosixPath) -> list[Guard]:
+        """
+        Guards shared by every statement of the included build files of a
+        directory, one per file. An empty guard means the files are not wrapped.
+        """
+        found: list[Guard] = []
+        for build in _INCLUDED:
+            common: set[Gate] | None = None
+            for text, guard in self.lines(directory / build):
+                stripped: str = text.strip()
+                if (not stripped or stripped.startswith("#") or _MAKE_IF.match(text)
+                        or _CMAKE_IF.match(text) or _ELSE.match(text) or _ENDIF.match(text)):
+                    continue
+                common = set(guard) if common is None else common & set(guard)
+            if common is not None:
+                found.append(tuple(common))
+        return found
+
+@dataclass
+class Impact():
+    """
+    Configurations a changed file can affect.
+    """
+    repo: str
+    path: str
+    configs: frozenset[str]
+    reason: str
+
+class ImpactAnalysis():
+    """
+    Maps changed files of the nuttx and apps checkouts to board configurations.
+    """
+    def __init__(
+        self,
+        defconfigs: Iterable[tuple[str, str]],
+        roots: dict[str, Path],
+        enabling: Callable[[str], frozenset[str] | None]
+    ):
+        """
+        :param defconfigs: `board:config` names with the defconfig path
+            relative to nuttx, see `BoardsStore.defconfigs`.
+        :type defconfigs: Iterable[tuple[str, str]]
+        :param roots: Checkouts by name, "nuttx" and "apps".
+        :type roots: dict[str, Path]
+        :param enabling: Configurations enabling a symbol, `None` when unknown.
+        :type enabling: Callable[[str], frozenset[str] | None]
+        """
+        self.defconfigs: dict[str, PurePosixPath] = {
+            label: PurePosixPath(path) for label, path in defconfigs
+        }
+        self.all: frozenset[str] = frozenset(self.defconfigs)
+        self.roots: dict[str, Path] = roots
+        self.enabling: Callable[[str], frozenset[str] | None] = enabling
+        self.build_files: dict[str, BuildFiles] = {
+            name: BuildFiles(root) for name, root in roots.items()
+        }
+        # Without a Kconfig tree (apps before its first configure) the
+        # symbols of the checkout are unknown
+        self.narrows: dict[str, bool] = {
+            name: (root / "Kconfig").is_file() for name, root in roots.items()
+        }
+        self._chips: dict[str, str] | None = None
+
+    def _chip(self, label: str) -> str:
+        if self._chips is None:
+            self._chips = {}
+            for name, path in self.defconfigs.items():
+                try:
+                    value: str = parse_defconfig(self.roots["nuttx"] / path).get("ARCH_CHIP", "")
+                except OSError:
+                    value = ""
+                # boards/<arch>/<chip>/<board>/configs/<config>/defconfig
+                self._chips[name] = value.strip('"') or path.parts[2]
+        return self._chips[label]
+
+    def _under(self, directory: PurePosixPath) -> frozenset[str]:
+        parts: tuple[str, ...] = directory.parts
+        return frozenset(
+            label for label, path in self.defconfigs.items() if path.parts[:len(parts)] == parts
+        )
+
+    def _place(self, repo: str, path: PurePosixPath) -> tuple[frozenset[str], frozenset[str], str]:
+        """
+        Scope of a file from its place in the tree.
+
+        :return: The scope, a wider one for sources no build file mentions,
+            and a description.
+        """
+        parts: tuple[str, ...] = path.parts
+        if repo != "nuttx" or len(parts) < 3 or parts[0] not in ("boards", "arch"):
+            return self.all, self.all, "all configurations"
+
+        if parts[0] == "boards":
+            directory: PurePosixPath = path.parent
+            while len(directory.parts) > 1:
+                found: frozenset[str] = self._under(directory)
+                if found:
+                    return found, found, f"configurations below {directory}"
+                directory = directory.parent
+            return self.all, self.all, "all configurations"
+
+        arch: frozenset[str] = self._under(PurePosixPath("boards", parts[1]))
+        if len(parts) > 4 and parts[2] in ("src", "include"):
+            chip: frozenset[str] = frozenset(l for l in arch if self._chip(l) == parts[3])
+            if chip:
+                return chip, arch, f"chip {parts[3]}"
+        return arch, arch, f"arch {parts[1]}"
+
+    def _narrow(self, repo: str, found: list[Guard]) -> tuple[frozenset[str] | None, set[str]]:
+        """
+        Configurations building any of the guarded lines, `None` for all of them.
+
+        :return: The configurations and the symbols they were selected by.
+        """
+        if len(found) == 0 or self.narrows.get(repo) is not True:
+            return None, set()
+        union: set[str] = set()
+        symbols: set[str] = set()
+        for guard in found:
+            if len(guard) == 0:
+                return None, set()
+            configs: frozenset[str] = self.all
+            for gate in guard:
+                enabled: set[str] = set()
+                for name in gate:
+                    by: frozenset[str] | None = self.enabling(name)
+                    if by is None:
+                        return None, set()
+                    enabled |= by
+                configs &= enabled
+                symbols |= gate
+            union |= configs
+        return frozenset(union), symbols
+
+    def _directory(
+        self,
+        repo: str,
+        directory: PurePosixPath,
+        exclude: PurePosixPath | None = None
+    ) -> tuple[frozenset[str] | None, set[str]]:
+        """
+        Configurations building a directory, from the build files of every
+        directory up to the root.
+
+        :param exclude: A changed build file of `directory`, the guards of the
+            directory's own build files are not trusted then.
+        """
+        files: BuildFiles = self.build_files[repo]
+        scope: frozenset[str] | None = None
+        symbols: set[str] = set()
+        own: bool = exclude is None
+        while len(directory.parts) > 0:
+            for found in (
+                files.mentions(directory.parent, directory.name),
+                files.wrapped(directory) if own is True else [],
+            ):
+                configs, used = self._narrow(repo, found)
+                if configs is not None:
+                    scope = configs if scope is None else scope & configs
+                    symbols |= used
+            own = True
+            directory = directory.parent
+        return scope, symbols
+
+    def _changed_lines(self, repo: str, path: PurePosixPath, base: str) -> list[Guard]:
+        root: Path = self.roots[repo]
+        old, new = changed_lines(root, base, f"{path}")
+        new_guards: list[Guard] = [g for _, g in self.build_files[repo].lines(path)]
+        old_text: str | None = show(root, base, f"{path}")
+        old_guards: list[Guard] = guards(old_text) if old_text is not None else []
+        if len(old) == 0 and len(new) == 0:
+            # Untracked, git diff does not know it
+            new = list(range(1, len(new_guards) + 1))
+        found: list[Guard] = []
+        for lines, side in ((old, old_guards), (new, new_guards)):
+            # Past the end is outside any block
+            found.extend(side[n - 1] if 0 < n <= len(side) else () for n in lines)
+        return found or [()]
+
+    def impact(self, repo: str, status: str, path: str, base: str) -> Impact:
+        """
+        Configurations a changed file can affect.
+
+        :param repo: The checkout, "nuttx" or "apps".
+        :type repo: str
+        :param status: git status letter of the change, "D" for deleted files.
+        :type status: str
+        :param path: Path relative to the checkout.
+        :type path: str
+        :param base: Commit the checkout is compared with.
+        :type base: str
+        :rtype: Impact
+        """
+        rel: PurePosixPath = PurePosixPath(path)
+        if (rel.parts[0] in NO_OUTPUT_DIRS or rel.suffix in NO_OUTPUT_SUFFIXES
+                or rel.name in NO_OUTPUT_NAMES):
+            return Impact(repo, path, frozenset(), "no build output")
+
+        scope, wider, reason = self._place(repo, rel)
+        narrowed: frozenset[str] | None = None
+        symbols: set[str] = set()
+        if rel.name in BUILD_FILES and len(rel.parts) > 1:
+            narrowed, symbols = self._narrow(repo, self._changed_lines(repo, rel, base))
+            within, more = self._directory(repo, rel.parent, exclude=rel)
+            if within is not None:
+                narrowed = within if narrowed is None else narrowed & within
+                symbols |= more
+        elif status == "D" or (rel.suffix in HEADERS and "include" not in rel.parts):
+            # Nothing builds a deleted file, a private header only its directory
+            narrowed, symbols = self._directory(repo, rel.parent)
+        elif rel.suffix in SOURCES:
+            found: list[Guard] = self.build_files[repo].mentions(rel.parent, rel.name)
+            if len(found) == 0:
+                # Built from somewhere else
+                if wider != scope:
+                    reason = f"{reason} and beyond, not in the build files of its directory"
+                scope = wider
+            else:
+                narrowed, symbols = self._narrow(repo, found)
+                within, more = self._directory(repo, rel.parent)
+                if within is not None:
+                    narrowed = within if narrowed is None else narrowed & within
+                    symbols |= more
+
+        if narrowed is not None:
+            guarded: str = f"guarded by {', '.join(sorted(symbols))}"
+            reason = guarded if scope == self.all else f"{reason}, {guarded}"
+            scope = scope & narrowed
+        return Impact(repo, path, scope, reason)
@@ -0,0 +1,263 @@
+"""
+Kconfig helpers.
+
+Literal defconfig parsing needs nothing but the file. Resolving configurations
+needs the nuttx Kconfig tree, which is parsed once with kconfiglib and then
+shared with forked workers, kconfiglib is only imported when that happens.
+"""
+
+import multiprocessing
+import os
+import re
+
+from collections.abc import Callable, Iterable, Iterator
+from pathlib import Path
+from typing import Any, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+_SET = re.compile(r"^CONFIG_([A-Za-z0-9_]+)=(.*)$")
+_NOT_SET = re.compile(r"^# CONFIG_([A-Za-z0-9_]+) is not set$")
+
+# Kconfig instance inherited by forked workers, see `fork_map`
+_kconf: Any = None
+
+def symbol_name(name: str) -> str:
+    """
+    Normalize a symbol name, the CONFIG_ prefix is optional.
+    """
+    return name[len("CONFIG_"):] if name.startswith("CONFIG_") else name
+
+def parse_defconfig(path: Path) -> dict[str, str]:
+    """
+    Read the symbol assignments of a defconfig.
+
+    :param path: Path to the defconfig.
+    :type path: Path
+    :return: Symbol name (without CONFIG_) to value, "n" for `is not set` lines.
+    :rtype: dict[str, str]
+    """
+    values: dict[str, str] = {}
+    with open(path, 'r', encoding='utf-8', errors='replace') as file:
+        for line in file:
+            line = line.strip()
+            m = _SET.match(line)
+            if m is not None:
+                values[m.group(1)] = m.group(2)
+                continue
+            m = _NOT_SET.match(line)
+            if m is not None:
+                values[m.group(1)] = "n"
+    return values
+
+def enabled(values: dict[str, str]) -> set[str]:
+    """
+    Symbols that are set to anything but "n" or an empty value.
+    """
+    return {name for name, value in values.items() if value not in ("n", "", '""')}
+
+def kconfig_env(nuttx: Path, apps: Path, stub_dir: Path) -> dict[str, str]:
+    """
+    Environment the nuttx Kconfig tree expects, mirroring tools/Unix.mk.
+
+    apps/Kconfig is generated by the apps build. When it does not exist yet an
+    empty stand-in from `stub_dir` is used, apps symbols are then unknown.
+    """
+    appsbin: Path = apps
+    if not (apps / "Kconfig").is_file():
+        stub_dir.mkdir(parents=True, exist_ok=True)
+        (stub_dir / "Kconfig").touch()
+        appsbin = stub_dir
+
+    external: Path = nuttx / "external"
+    if not (external / "Kconfig").is_file():
+        external = nuttx / "dummy"
+
+    return {
+        "srctree": f"{nuttx}",
+        "APPSDIR": f"{apps}",
+        "APPSBINDIR": f"{appsbin}",
+        "BINDIR": f"{nuttx}",
+        "EXTERNALDIR": f"{external}",
+        "DRIVERS_PLATFORM_DIR": f"{nuttx / 'drivers' / 'dummy'}",
+        "ARCH": os.environ.get("ARCH", ""),
+    }
+
+def load_kconfig(nuttx: Path, apps: Path, stub_dir: Path) -> Any:
+    """
+    Parse the nuttx Kconfig tree.
+
+    :return: A `kconfiglib.Kconfig` instance, warnings are collected in its
+        `warnings` list instead of being printed.
+    :raises ImportError: If kconfiglib is not installed.
+    :raises kconfiglib.KconfigError: If the tree cannot be parsed.
+    """
+    import kconfiglib
+
+    os.environ.update(kconfig_env(nuttx, apps, stub_dir))
+    kconf = kconfiglib.Kconfig(
+        f"{nuttx / 'Kconfig'}", warn_to_stderr=False
+    )
+    # Only warnings raised by loading configurations are of interest
+    kconf.warnings.clear()
+    return kconf
+
+def resolved(kconf: Any, defconfig: Path) -> set[str]:
+    """
+    Symbols enabled once `defconfig` is applied and all defaults are resolved.
+    """
+    kconf.load_config(f"{defconfig}", replace=True)
+    return {
+        sym.name for sym in kconf.unique_defined_syms
+        if sym.str_value not in ("n", "")
+    }
+
+# Symbols `make savedefconfig` keeps even when they hold the default value
+_MANDATORY = re.compile(r"^(ARCH|ARCH_CHIP|ARCH_BOARD|ARCH_CHIP_\w+|ARCH_BOARD_\w+|ARCH_CUSTOM\w*)$")
+
+# Mandatory symbols of the Kconfig tree, found once
+_mandatory: tuple[Any, list[Any]] | None = None
+
+DEFCONFIG_HEADER: str = """\
+#
+# This file is autogenerated: PLEASE DO NOT EDIT IT.
+#
+# You can use "make menuconfig" to make any modifications to the installed .config file.
+# You can then do "make savedefconfig" to generate a new defconfig file that includes your
+# modifications.
+#
+"""
+
+def _literal(value: str) -> str:
+    if len(value) >= 2 and value.startswith('"') and value.endswith('"'):
+        return value[1:-1].replace('\\"', '"').replace("\\\\", "\\")
+    return value
+
+def _same(sym: Any, assigned: str) -> bool:
+    import kconfiglib
+
+    got: str = sym.str_value
+    if sym.orig_type in (kconfiglib.BOOL, kconfiglib.TRISTATE):
+        return got == (assigned or "n")
+    if sym.orig_type in (kconfiglib.INT, kconfiglib.HEX):
+        try:
+            base: int = 16 if sym.orig_type == kconfiglib.HEX else 10
+            return int(got, base) == int(assigned, base)
+        except ValueError:
+            return got == assigned
+    return got == _literal(assigned)
+
+def check(kconf: Any, defconfig: Path) -> dict[str, Any]:
+    """
+    Apply `defconfig` and report the assignments that did not hold.
+
+    :param kconf: Parsed Kconfig tree.
+    :param defconfig: Path to the defconfig.
+    :type defconfig: Path
+    :return: "unknown", symbols the tree does not define, and "unmet",
+        assignments overridden by Kconfig with the "symbol", the "value"
+        assigned, the value it "got" and the "reason".
+    :rtype: dict[str, Any]
+    """
+    import kconfiglib
+
+    values: dict[str, str] = parse_defconfig(defconfig)
+    kconf.load_config(f"{defconfig}", replace=True)
+    kconf.warnings.clear()
+
+    unknown: list[str] = []
+    unmet: list[dict[str, str]] = []
+    for name, value in values.items():
+        sym: Any = kconf.syms.get(name)
+        if sym is None or not sym.nodes:
+            unknown.append(name)
+            continue
+        if _same(sym, value):
+            continue
+        if value != "n" and kconfiglib.expr_value(sym.direct_dep) == 0:
+            reason: str = f"depends on {kconfiglib.expr_str(sym.direct_dep)}"
+        elif value == "n" and kconfiglib.expr_value(sym.rev_dep) != 0:
+            reason = f"selected by {kconfiglib.expr_str(sym.rev_dep)}"
+        elif sym.choice is not None:
+            selection: Any = sym.choice.selection
+            reason = f"choice set to {selection.name if selection is not None else 'n'}"
+        else:
+            reason = "not assignable"
+        unmet.append({"symbol": name, "value": value, "got": sym.str_value, "reason": reason})
+    return {"unknown": unknown, "unmet": unmet}
+
+def savedefconfig(kconf: Any, stub_dir: Path) -> str:
+    """
+    Minimal defconfig of the loaded configuration, the way `make savedefconfig`
+    writes it: kconfig's minimal configuration without CONFIG_APPS_DIR, the
+    arch, chip and board lines kept, sorted, behind the nuttx header.
+
+    :param kconf: Kconfig tree with a configuration loaded, see `check`.
+    :param stub_dir: Directory for the temporary minimal configuration.
+    :type stub_dir: Path
+    :return: Content of the normalized defconfig.
+    :rtype: str
+    """
+    import tempfile
+
+    stub_dir.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=stub_dir, prefix=".savedefconfig.", suffix=".tmp")
+    os.close(fd)
+    try:
+        kconf.write_min_config(tmp, header="")
+        with open(tmp, 'r', encoding='utf-8') as file:
+            lines: set[str] = {line.rstrip("\n") for line in file if line.strip()}
+    finally:
+        os.unlink(tmp)
+
+    global _mandatory
+    if _mandatory is None or _mandatory[0] is not kconf:
+        _mandatory = (kconf, [s for s in kconf.unique_defined_syms if _MANDATORY.match(s.name)])
+    for sym in _mandatory[1]:
+        line: str = sym.config_string.rstrip("\n")
+        if line.startswith("CONFIG_"):
+            lines.add(line)
+    lines = {
+        line for line in lines
+        if not line.startswith(("CONFIG_APPS_DIR=", "# CONFIG_APPS_DIR "))
+    }
+    # sort with LC_ALL=C
+    return DEFCONFIG_HEADER + "".join(
+        f"{line}\n" for line in sorted(lines, key=lambda line: line.encode('utf-8'))
+    )
+
+def current() -> Any:
+    """
+    Kconfig instance of the current `fork_map` worker.
+    """
+    return _kconf
+
+def fork_map(
+    kconf: Any,
+    func: Callable[[T], R],
+    items: Iterable[T],
+    jobs: int | None = None
+) -> Iterator[R]:
+    """
+    Apply `func` to `items` in forked workers sharing an already parsed Kconfig.
+
+    Workers inherit `kconf` through fork instead of parsing the tree again,
+    `func` reaches it with `current()`. Results are yielded as they complete.
+    Platforms without fork run everything in the current process.
+
+    :param kconf: Parsed Kconfig tree.
+    :param func: Picklable function applied to every item.
+    :param items: Work items.
+    :param jobs: Number of workers, defaults to the cpu count.
+    """
+    global _kconf
+    _kconf = kconf
+
+    jobs = jobs or os.cpu_count() or 1
+    if jobs == 1 or "fork" not in multiprocessing.get_all_start_methods():
+        yield from map(func, items)
+        return
+
+    with multiprocessing.get_context("fork").Pool(jobs) as pool:
+        yield from pool.imap_unordered(func, items, chunksize=4)
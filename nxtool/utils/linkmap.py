@@ -0,0 +1,103 @@
+"""
+GNU ld map file parser.
+
+Only the "Linker script and memory map" part is read, and only the input
+section lines of it are split, which keeps multi-megabyte maps fast:
+
+    .text           0x08000000     0x1a4c        <- output section
+     .text.main     0x08000000       0x24 libapps.a(main.o)
+     .text.a_very_long_input_section_name
+                    0x08000024       0x10 libsched.a(sched_lock.o)
+                    0x08000024                sched_lock   <- symbol, skipped
+"""
+
+import os
+
+from pathlib import Path
+
+def _is_hex(value: str) -> bool:
+    return value.startswith("0x")
+
+def object_name(name: str, root: str | None = None) -> str:
+    """
+    Short name of a linked file: "libsched.a(sched_lock.o)" for archive
+    members, the path relative to `root` for plain object files.
+    """
+    lib, sep, member = name.partition("(")
+    if sep:
+        return f"{os.path.basename(lib)}({member}"
+    if root is not None and name.startswith(root):
+        return name[len(root):].lstrip("/")
+    return name
+
+def library_name(obj: str) -> str:
+    """
+    Library of an object returned by `object_name`, "(objects)" for plain objects.
+    """
+    lib, sep, _ = obj.partition("(")
+    return lib if sep else "(objects)"
+
+def parse(
+    path: Path,
+    kinds: dict[str, str],
+    root: Path | None = None
+) -> dict[str, list[int]]:
+    """
+    Attribute the allocated input sections of a link to the files they come from.
+
+    :param path: The map file.
+    :type path: Path
+    :param kinds: Kind ("text", "data" or "bss") of every allocated output
+        section, see `ElfFile.kinds`. Input sections of other output sections
+        are not loaded on the target and are skipped.
+    :type kinds: dict[str, str]
+    :param root: Build directory, plain object paths are made relative to it.
+    :type root: Path | None
+    :return: Object name (see `object_name`) to its text, data and bss sizes.
+    :rtype: dict[str, list[int]]
+    """
+    index: dict[str, int] = {"text": 0, "data": 1, "bss": 2}
+    prefix: str | None = f"{root}/" if root is not None else None
+    objects: dict[str, list[int]] = {}
+    kind: int | None = None
+    wrapped: bool = False
+
+    def add(size: str, name: str) -> None:
+        n: int = int(size, 16)
+        if n == 0 or kind is None:
+            return
+        obj: str = object_name(name, prefix)
+        sizes: list[int] | None = objects.get(obj)
+        if sizes is None:
+            sizes = objects[obj] = [0, 0, 0]
+        sizes[kind] += n
+
+    with open(path, 'r', encoding='utf-8', errors='replace') as file:
+        for line in file:
+            if line.startswith("Linker script and memory map"):
+                break
+
+        for line in file:
+            first: str = line[:1]
+            if first == " ":
+                if line[1:2] not in (" ", "*"):
+                    # Input section, its name may be long enough to wrap
+                    parts: list[str] = line.split(None, 3)
+                    if len(parts) == 4 and _is_hex(parts[1]):
+                        add(parts[2], parts[3].rstrip())
+                        wrapped = False
+                    else:
+                        wrapped = len(parts) == 1
+                elif wrapped is True:
+                    wrapped = False
+                    parts = line.split(None, 2)
+                    if len(parts) == 3 and _is_hex(parts[0]) and _is_hex(parts[1]):
+                        add(parts[1], parts[2].rstrip())
+            elif first not in ("\n", ""):
+                wrapped = False
+                if line.startswith("OUTPUT("):
+                    break
+                # Output section, or a linker script statement
+                k: str | None = kinds.get(line.split(None, 1)[0])
+                kind = index[k] if k is not None else None
+    return objects
@@ -0,0 +1,153 @@
+"""
+Build timing analysis based on the ninja log format.
+
+ninja writes one line per finished edge to `.ninja_log` in the build directory:
+
+    # ninja log v5
+    <start ms> <end ms> <restat mtime> <output> <command hash>
+
+Make based builds produce the same format through `nxtool.utils.timing`,
+with absolute timestamps instead of times relative to the build start.
+
+The log holds no dependency information, so the critical path is estimated
+from timing alone: starting from the last step to finish, the predecessor of
+a step is the latest step that finished before it started. For a build that
+is never starved of jobs this is the chain of steps that kept the build busy.
+"""
+
+from dataclasses import dataclass
+from pathlib import Path
+
+NINJA_LOG: str = ".ninja_log"
+TIMING_LOG: str = ".nxtool_log"
+
+@dataclass
+class Step():
+    """
+    A build step, all outputs produced by a single command.
+    """
+    start: int
+    end: int
+    outputs: list[str]
+
+    @property
+    def duration(self) -> int:
+        return self.end - self.start
+
+    @property
+    def name(self) -> str:
+        return self.outputs[0]
+
+    @property
+    def kind(self) -> str:
+        """
+        "compile" for object files, "link" for everything else (archives,
+        executables, binaries)
+        """
+        if self.name.endswith((".o", ".obj")):
+            return "compile"
+        return "link"
+
+@dataclass
+class BuildTiming():
+    """
+    Timing summary of a single build, all times in milliseconds.
+    """
+    steps: list[Step]
+    wall: int
+    cpu: int
+    critical: list[Step]
+
+    @property
+    def parallelism(self) -> float:
+        return self.cpu / self.wall if self.wall > 0 else 0.0
+
+    @property
+    def critical_time(self) -> int:
+        return sum(s.duration for s in self.critical)
+
+    def slowest(self, kind: str, count: int) -> list[Step]:
+        steps: list[Step] = [s for s in self.steps if s.kind == kind]
+        return sorted(steps, key=lambda s: s.duration, reverse=True)[:count]
+
+def find_log(build_dir: Path) -> Path | None:
+    """
+    Timing log of a build directory, the ninja one takes precedence.
+    """
+    for name in (NINJA_LOG, TIMING_LOG):
+        if (build_dir / name).is_file():
+            return build_dir / name
+    return None
+
+def parse(path: Path) -> list[Step]:
+    """
+    Parse a ninja log and return the steps of the most recent build.
+
+    In a ninja log, a new build is detected when an entry finishes earlier
+    than the previous one, ninja restarts its clock on every run. The make
+    timing log holds a single build (`MakeBuilder.build` removes it first)
+    whose parallel jobs append their lines in any order. Outputs produced by
+    the same command share their start and end times and are merged into one
+    step.
+
+    :param path: Path to the log.
+    :type path: Path
+    :return: Steps of the last build, sorted by start time.
+    :rtype: list[Step]
+    """
+    steps: dict[tuple[int, int, str], Step] = {}
+    restarts: bool = path.name == NINJA_LOG
+    last_end: int = 0
+    with open(path, 'r', encoding='utf-8', errors='replace') as file:
+        for line in file:
+            if line.startswith("#"):
+                continue
+            fields: list[str] = line.rstrip("\n").split("\t")
+            if len(fields) < 5:
+                continue
+            try:
+                start, end = int(fields[0]), int(fields[1])
+            except ValueError:
+                continue
+
+            if restarts is True and end < last_end:
+                steps.clear()
+            last_end = end
+
+            key = (start, end, fields[4])
+            if key in steps:
+                steps[key].outputs.append(fields[3])
+            else:
+                steps[key] = Step(start, end, [fields[3]])
+
+    return sorted(steps.values(), key=lambda s: (s.start, s.end))
+
+def analyze(steps: list[Step]) -> BuildTiming:
+    """
+    Compute wall time, cpu time and the estimated critical path of a build.
+
+    :param steps: Steps of a single build.
+    :type steps: list[Step]
+    :rtype: BuildTiming
+    """
+    if len(steps) == 0:
+        return BuildTiming([], 0, 0, [])
+
+    by_end: list[Step] = sorted(steps, key=lambda s: s.end)
+    critical: list[Step] = [by_end[-1]]
+
+    # Walk back through the steps sorted by end time, each predecessor is the
+    # latest step that ended before the current one started
+    i: int = len(by_end) - 2
+    while i >= 0:
+        if by_end[i].end <= critical[-1].start:
+            critical.append(by_end[i])
+        i -= 1
+    critical.reverse()
+
+    return BuildTiming(
+        steps=steps,
+        wall=max(s.end for s in steps) - min(s.start for s in steps),
+        cpu=sum(s.duration for s in steps),
+        critical=critical,
+    )
@@ -0,0 +1,68 @@
+"""
+Machine readable output of listings.
+
+Rows are written as they are produced, so long listings start printing right
+away and are never held in memory as a whole, even as a JSON array.
+"""
+import json
+import sys
+
+from collections.abc import Iterable
+from typing import Any, Literal, TextIO
+
+Format = Literal["text", "json", "jsonl", "tsv"]
+
+FORMATS: tuple[str, ...] = ("text", "json", "jsonl", "tsv")
+
+def _tsv_field(value: Any) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "true" if value is True else "false"
+    if isinstance(value, (dict, list, tuple)):
+        value = json.dumps(value, separators=(",", ":"))
+    return (
+        f"{value}".replace("\\", "\\\\").replace("\t", "\\t")
+        .replace("\n", "\\n").replace("\r", "\\r")
+    )
+
+def emit(
+    rows: Iterable[dict[str, Any]],
+    fmt: Format,
+    columns: list[str],
+    out: TextIO | None = None
+) -> None:
+    """
+    Write rows in a machine readable format.
+
+    - json: a single array of objects
+    - jsonl: an object per line
+    - tsv: a header line with `columns`, then the values of every row, tabs
+      and newlines escaped, nested values as JSON
+
+    :param rows: The rows, consumed one at a time.
+    :type rows: Iterable[dict[str, Any]]
+    :param fmt: Any format but "text", which every command prints its own way.
+    :type fmt: Format
+    :param columns: Keys of the rows, in tsv column order.
+    :type columns: list[str]
+    :param out: Stream written to, defaults to the current `sys.stdout`.
+    :type out: TextIO | None
+    :raises ValueError: If the format is not a machine readable one.
+    """
+    out = out or sys.stdout
+    if fmt == "jsonl":
+        for row in rows:
+            out.write(json.dumps(row) + "\n")
+    elif fmt == "json":
+        sep: str = "[\n"
+        for row in rows:
+            out.write(sep + json.dumps(row))
+            sep = ",\n"
+        out.write("[]\n" if sep == "[\n" else "\n]\n")
+    elif fmt == "tsv":
+        out.write("\t".join(columns) + "\n")
+        for row in rows:
+            out.write("\t".join(_tsv_field(row.get(c)) for c in columns) + "\n")
+    else:
+        raise ValueError(f"Unknown output format {fmt}, expected one of {', '.join(FORMATS[1:])}")
@@ -0,0 +1,281 @@
+"""
+Child process runner shared by the build tool and git wrappers.
+
+Both stdout and stderr are drained at the same time, so a child writing a lot
+to one of them can never block on a full pipe. Output is read in bounded chunks,
+scanned for compiler diagnostics (see `nxtool.utils.diagnostics`), optionally
+teed to a compressed, timestamped log file, and shown according to the output mode:
+
+- stream: forward every line as it arrives
+- quiet: show nothing
+- summary: show one status line per process, plus the tail of its output on failure
+"""
+
+import asyncio
+import collections
+import gzip
+import os
+import signal
+import sys
+import time
+
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import IO, Literal
+
+from nxtool.utils.diagnostics import Collector, prune_logs
+
+OutputMode = Literal["stream", "quiet", "summary"]
+
+@dataclass
+class ProcessResult():
+    """
+    Outcome of a child process.
+    """
+    args: list[str]
+    returncode: int
+    duration: float
+    timed_out: bool = False
+    tail: list[str] = field(default_factory=list)
+    log: Path | None = None
+    diagnostics: Collector = field(default_factory=Collector)
+
+@dataclass
+class ProcessSpec():
+    """
+    A child process to be started by `ProcessRunner.run_many`.
+    """
+    args: list[str]
+    env: dict[str, str] | None = None
+    cwd: Path | None = None
+    log_name: str | None = None
+    timeout: float | None = None
+
+@dataclass
+class ProcessRunner():
+    """
+    Runs child processes and handles their output.
+
+    Attributes:
+        mode (OutputMode): How output is shown, "stream", "quiet" or "summary".
+        prefix (str): Prepended to every shown line, tells concurrent processes apart.
+        log_dir (Path | None): If set, output is also written to a gzip compressed
+            log file in this directory.
+        log_keep (int | None): Number of newest log files kept in `log_dir`.
+        log_quota (int | None): Total size in bytes of the log files kept in `log_dir`.
+        tail_lines (int): Number of last output lines kept for summaries.
+        chunk (int): Maximum number of bytes read from a pipe at once, longer
+            lines are split so memory use stays bounded.
+        deadline (float | None): `time.monotonic()` value after which children
+            are killed, bounds a whole sequence of runs.
+    """
+    mode: OutputMode = "stream"
+    prefix: str = ""
+    log_dir: Path | None = None
+    log_keep: int | None = None
+    log_quota: int | None = None
+    tail_lines: int = 20
+    chunk: int = 64 * 1024
+    deadline: float | None = None
+
+    def _log_path(self, args: list[str], log_name: str | None) -> Path | None:
+        if self.log_dir is None:
+            return None
+        self.log_dir.mkdir(parents=True, exist_ok=True)
+        name: str = log_name or Path(args[0]).name
+        stamp: str = time.strftime("%Y%m%d-%H%M%S")
+        return self.log_dir / f"{name}-{stamp}-{time.monotonic_ns() % 10**6:06d}.log.gz"
+
+    async def _pump(
+        self,
+        reader: asyncio.StreamReader,
+        stream: Literal["out", "err"],
+        log: IO[str] | None,
+        tail: collections.deque[str],
+        diagnostics: Collector,
+    ) -> None:
+        dest: IO[str] = sys.stdout if stream == "out" else sys.stderr
+        partial: bytes = b""
+        while True:
+            data: bytes = await reader.read(self.chunk)
+            if not data:
+                lines: list[bytes] = [partial] if partial else []
+            else:
+                *lines, partial = (partial + data).split(b"\n")
+                # A line longer than a chunk is flushed in pieces
+                if len(partial) >= self.chunk:
+                    lines.append(partial)
+                    partial = b""
+
+            for raw in lines:
+                line: str = raw.decode(errors="replace").rstrip("\r")
+                tail.append(line)
+                diagnostics.feed(line)
+                if log is not None:
+                    now: float = time.time()
+                    stamp: str = time.strftime("%H:%M:%S", time.localtime(now))
+                    log.write(f"{stamp}.{int(now * 1000) % 1000:03d} {stream} {line}\n")
+                if self.mode == "stream":
+                    dest.write(f"{self.prefix}{line}\n")
+                    dest.flush()
+
+            if not data:
+                return
+
+    async def run_async(
+        self,
+        args: list[str],
+        env: dict[str, str] | None = None,
+        cwd: Path | None = None,
+        log_name: str | None = None,
+        timeout: float | None = None,
+    ) -> ProcessResult:
+        """
+        Run a child process to completion.
+
+        :param args: Program and arguments.
+        :type args: list[str]
+        :param env: Environment of the child, defaults to the current one.
+        :type env: dict[str, str] | None
+        :param cwd: Working directory of the child.
+        :type cwd: Path | None
+        :param log_name: Log file name prefix, defaults to the program name.
+        :type log_name: str | None
+        :param timeout: Seconds after which the child is killed, capped by `deadline`.
+        :type timeout: float | None
+        :return: The process result, a timed out process has `timed_out` set.
+        :rtype: ProcessResult
+        :raises OSError: If the program cannot be started.
+        """
+        start: float = time.monotonic()
+        if self.deadline is not None:
+            remaining: float = max(0.0, self.deadline - start)
+            timeout = remaining if timeout is None else min(timeout, remaining)
+        tail: collections.deque[str] = collections.deque(maxlen=self.tail_lines)
+        diagnostics: Collector = Collector()
+        log_path: Path | None = self._log_path(args, log_name)
+        log: IO[str] | None = (
+            gzip.open(log_path, 'wt', compresslevel=3, encoding='utf-8')
+            if log_path is not None else None
+        )
+
+        try:
+            if log is not None:
+                log.write(f"$ {' '.join(args)}\n")
+            proc = await asyncio.create_subprocess_exec(
+                *args,
+                stdin=asyncio.subprocess.DEVNULL,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                env=env,
+                cwd=cwd,
+                limit=self.chunk,
+                # A timed out child is killed along with everything it spawned
+                process_group=0 if timeout is not None else None,
+            )
+            assert proc.stdout is not None and proc.stderr is not None
+
+            pumps = asyncio.gather(
+                self._pump(proc.stdout, "out", log, tail, diagnostics),
+                self._pump(proc.stderr, "err", log, tail, diagnostics),
+            )
+            timed_out: bool = False
+            try:
+                await asyncio.wait_for(asyncio.shield(pumps), timeout)
+            except asyncio.TimeoutError:
+                timed_out = True
+                os.killpg(proc.pid, signal.SIGKILL)
+                await pumps
+            except asyncio.CancelledError:
+                if timeout is not None:
+                    os.killpg(proc.pid, signal.SIGKILL)
+                else:
+                    proc.kill()
+                raise
+            returncode: int = await proc.wait()
+        finally:
+            if log is not None:
+                log.close()
+                self._prune_logs()
+
+        result = ProcessResult(
+            args, returncode, time.monotonic() - start, timed_out, list(tail), log_path,
+            diagnostics
+        )
+        if self.mode == "summary":
+            self._summary(result)
+        return result
+
+    def _prune_logs(self) -> None:
+        if self.log_dir is None or (self.log_keep is None and self.log_quota is None):
+            return
+        try:
+            prune_logs(self.log_dir, self.log_keep, self.log_quota)
+        except OSError as e:
+            print(f"{self.prefix}Cannot prune {self.log_dir}: {e}")
+
+    def _summary(self, result: ProcessResult) -> None:
+        cmd: str = " ".join([Path(result.args[0]).name] + result.args[1:])
+        if result.returncode == 0:
+            print(f"{self.prefix}ok     {cmd} ({result.duration:.1f}s)")
+            return
+
+        status: str = "TIMEOUT" if result.timed_out is True else f"FAILED ({result.returncode})"
+        print(f"{self.prefix}{status} {cmd} ({result.duration:.1f}s)")
+        for line in result.tail:
+            print(f"{self.prefix}  {line}")
+        if result.log is not None:
+            print(f"{self.prefix}full log: {result.log}")
+
+    def run(
+        self,
+        args: list[str],
+        env: dict[str, str] | None = None,
+        cwd: Path | None = None,
+        log_name: str | None = None,
+        timeout: float | None = None,
+    ) -> ProcessResult:
+        """
+        Blocking version of `run_async`.
+        """
+        return asyncio.run(self.run_async(args, env, cwd, log_name, timeout))
+
+    async def run_many_async(
+        self,
+        specs: list[ProcessSpec],
+        limit: int | None = None
+    ) -> list[ProcessResult]:
+        """
+        Run several child processes concurrently.
+
+        :param specs: Processes to run.
+        :type specs: list[ProcessSpec]
+        :param limit: Maximum number of processes running at once, defaults to cpu count.
+        :type limit: int | None
+        :return: Results, in the order of `specs`. A process that could not
+            be started has returncode 127.
+        :rtype: list[ProcessResult]
+        """
+        sem = asyncio.Semaphore(max(1, limit or os.cpu_count() or 1))
+
+        async def one(spec: ProcessSpec) -> ProcessResult:
+            async with sem:
+                try:
+                    return await self.run_async(
+                        spec.args, spec.env, spec.cwd, spec.log_name, spec.timeout
+                    )
+                except OSError as e:
+                    print(f"{self.prefix}{e}")
+                    return ProcessResult(spec.args, 127, 0.0)
+
+        return list(await asyncio.gather(*(one(s) for s in specs)))
+
+    def run_many(
+        self,
+        specs: list[ProcessSpec],
+        limit: int | None = None
+    ) -> list[ProcessResult]:
+        """
+        Blocking version of `run_many_async`.
+        """
+        return asyncio.run(self.run_many_async(specs, limit))
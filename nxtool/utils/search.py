@@ -0,0 +1,106 @@
+"""
+Fuzzy search over names, e.g. the `board:config` names of the nuttx tree.
+
+Names are indexed by the trigrams they contain and by the prefixes of their
+words, so a query only scores the names it shares something with:
+
+- the whole name, or one of its words, equal to the query
+- a word starting with the query ("stm32" finds "stm32f4discovery:nsh")
+- the query found anywhere in the name
+- enough trigrams in common, which tolerates typos ("stm32f4dsico")
+"""
+import re
+
+from bisect import bisect_left
+from collections import defaultdict
+from collections.abc import Iterable
+
+_WORDS = re.compile(r"[:/_\-.]")
+
+# Least trigram similarity for a name to be a fuzzy match of the query
+MIN_SIMILARITY: float = 0.3
+
+def trigrams(text: str) -> set[str]:
+    """
+    Trigrams of `text`, padded so its start and end form trigrams too.
+    """
+    padded: str = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+class TrigramIndex():
+    """
+    Ranked fuzzy search over a fixed set of names.
+
+    Indexing the configurations of the nuttx tree takes a couple dozen
+    milliseconds, searching them about one. `BoardsStore` builds the index
+    once and keeps it with the boards, for as long as the daemon runs.
+    """
+    def __init__(self, names: Iterable[str]):
+        """
+        :param names: The names to search, case is ignored.
+        :type names: Iterable[str]
+        """
+        self.names: list[str] = sorted(set(names))
+        self._lower: list[str] = [n.lower() for n in self.names]
+        self._grams: defaultdict[str, list[int]] = defaultdict(list)
+        self._sizes: list[int] = []
+        words: list[tuple[str, int]] = []
+        for i, name in enumerate(self._lower):
+            grams: set[str] = trigrams(name)
+            self._sizes.append(len(grams))
+            for gram in grams:
+                self._grams[gram].append(i)
+            words.extend((w, i) for w in {name, *_WORDS.split(name)} if w)
+        words.sort()
+        self._words: list[str] = [w for w, _ in words]
+        self._word_ids: list[int] = [i for _, i in words]
+
+    def search(self, query: str, limit: int | None = None) -> list[tuple[str, float]]:
+        """
+        Names matching `query`, best first.
+
+        :param query: Text to look for, case is ignored.
+        :type query: str
+        :param limit: Maximum number of results, `None` for all of them.
+        :type limit: int | None
+        :return: Names with their score: 1.0 for an exact match, above 0.7
+            for a prefix, above 0.5 for a substring and below for fuzzy matches.
+        :rtype: list[tuple[str, float]]
+        """
+        q: str = query.strip().lower()
+        if not q:
+            return []
+        scores: dict[int, float] = {}
+
+        # Words starting with the query, the longer the match the better
+        pos: int = bisect_left(self._words, q)
+        while pos < len(self._words) and self._words[pos].startswith(q):
+            word: str = self._words[pos]
+            score: float = 1.0 if word == q else 0.7 + 0.25 * len(q) / len(word)
+            i: int = self._word_ids[pos]
+            scores[i] = max(scores.get(i, 0.0), score)
+            pos += 1
+
+        # Shared trigrams, then substring and similarity of each candidate
+        grams: set[str] = trigrams(q)
+        shared: dict[int, int] = {}
+        for gram in grams:
+            for i in self._grams.get(gram, ()):
+                shared[i] = shared.get(i, 0) + 1
+        for i, count in shared.items():
+            if q in self._lower[i]:
+                score = 0.5 + 0.2 * len(q) / len(self._lower[i])
+            else:
+                # Dice coefficient of the trigram sets
+                similarity: float = 2 * count / (len(grams) + self._sizes[i])
+                if similarity < MIN_SIMILARITY:
+                    continue
+                score = 0.5 * similarity
+            scores[i] = max(scores.get(i, 0.0), score)
+
+        ranked: list[tuple[int, float]] = sorted(
+            scores.items(), key=lambda s: (-s[1], self.names[s[0]])
+        )
+        if limit is not None:
+            ranked = ranked[:limit]
+        return [(self.names[i], round(score, 3)) for i, score in ranked]
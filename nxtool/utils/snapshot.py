@@ -0,0 +1,140 @@
+"""
+Source snapshots for in-tree builds.
+
+nuttx and apps make builds write their outputs (.config, objects, libraries)
+into the source tree, so only one configuration can be built per checkout.
+A snapshot gives every build its own copy of the sources:
+
+- hardlink: the files git knows about (tracked, and untracked but not
+  ignored) are hard linked, uncommitted changes are part of the snapshot.
+  Links of files that changed in the checkout are renewed on every sync.
+  Tools modifying a source file in place would write through to the checkout,
+  the nuttx build only ever creates new files.
+- worktree: a detached `git worktree` following the checkout HEAD, only
+  committed changes are part of the snapshot.
+"""
+
+import os
+import shutil
+import stat
+import subprocess
+
+from pathlib import Path
+from typing import Literal
+
+from nxtool.utils.fs import atomic_write
+from nxtool.utils.git import GitWrapper, head
+from nxtool.utils.process import ProcessRunner
+
+SnapshotMode = Literal["none", "hardlink", "worktree"]
+
+# Files linked by the last sync, kept in the snapshot root
+MANIFEST: str = ".nxtool_snapshot"
+
+def _git_files(repo: Path) -> list[str]:
+    out: bytes = subprocess.run(
+        ["git", "-C", f"{repo}", "ls-files", "-z", "--cached", "--others", "--exclude-standard"],
+        check=True, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+    ).stdout
+    return [f for f in out.decode('utf-8', errors='surrogateescape').split("\0") if f]
+
+def _link(src: Path, dest: Path) -> None:
+    dest.unlink(missing_ok=True)
+    try:
+        os.link(src, dest)
+    except OSError:
+        # Different file system, or links not supported
+        shutil.copy2(src, dest)
+
+def sync_hardlink(src: Path, dest: Path) -> None:
+    """
+    Bring a hard link snapshot of `src` up to date.
+
+    :param src: The checkout.
+    :type src: Path
+    :param dest: The snapshot, created if needed.
+    :type dest: Path
+    :raises subprocess.CalledProcessError: If `src` is not a git checkout.
+    """
+    files: list[str] = _git_files(src)
+    try:
+        previous: set[str] = set(
+            (dest / MANIFEST).read_text(encoding='utf-8').split("\0")
+        )
+    except OSError:
+        previous = set()
+
+    made: set[Path] = set()
+    for name in files:
+        s: Path = src / name
+        d: Path = dest / name
+        try:
+            st = s.lstat()
+        except OSError:
+            # Deleted in the checkout but not staged
+            continue
+        if stat.S_ISDIR(st.st_mode):
+            # Submodule, not part of the snapshot
+            continue
+        if d.parent not in made:
+            d.parent.mkdir(parents=True, exist_ok=True)
+            made.add(d.parent)
+        try:
+            dt = d.lstat()
+            if dt.st_ino == st.st_ino and dt.st_dev == st.st_dev:
+                continue
+            # Copies made across file systems are kept until the source changes
+            if dt.st_nlink == 1 and dt.st_mtime_ns == st.st_mtime_ns and dt.st_size == st.st_size:
+                continue
+        except OSError:
+            pass
+        if s.is_symlink():
+            d.unlink(missing_ok=True)
+            d.symlink_to(os.readlink(s))
+        else:
+            _link(s, d)
+
+    for name in previous.difference(files):
+        if name:
+            (dest / name).unlink(missing_ok=True)
+    atomic_write(dest / MANIFEST, "\0".join(files))
+
+def sync_worktree(src: Path, dest: Path, runner: ProcessRunner) -> bool:
+    """
+    Bring a worktree snapshot of `src` to the HEAD of `src`.
+
+    :param src: The checkout.
+    :type src: Path
+    :param dest: The worktree, added if needed.
+    :type dest: Path
+    :param runner: Runs git.
+    :type runner: ProcessRunner
+    :return: `True` on success.
+    :rtype: bool
+    """
+    rev: str | None = head(src)
+    if rev is None:
+        return False
+    git: GitWrapper = GitWrapper(f"{src}", runner)
+    if not (dest / ".git").exists():
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        return git.worktree_add(src, dest, rev) == 0
+    if head(dest) == rev:
+        return True
+    return git.checkout(dest, rev) == 0
+
+def sync(src: Path, dest: Path, mode: SnapshotMode, runner: ProcessRunner) -> bool:
+    """
+    Bring the snapshot of `src` at `dest` up to date.
+
+    :return: `True` on success.
+    :rtype: bool
+    """
+    if mode == "worktree":
+        return sync_worktree(src, dest, runner)
+    try:
+        sync_hardlink(src, dest)
+    except (OSError, subprocess.CalledProcessError) as e:
+        print(f"{runner.prefix}snapshot of {src} failed: {e}")
+        return False
+    return True
@@ -0,0 +1,45 @@
+"""
+Compiler launcher recording step timings for make based builds.
+
+Used as `python -m nxtool.utils.timing <log> <command...>`, it runs the command
+and appends a ninja log line for it, so make builds can be analysed the same
+way as ninja ones. Times are absolute (ms since epoch), the analysis only
+looks at differences. Kept free of nxtool imports, it runs once per compile.
+"""
+
+import os
+import subprocess
+import sys
+import time
+import zlib
+
+def _output(args: list[str]) -> str:
+    for i, arg in enumerate(args):
+        if arg == "-o" and i + 1 < len(args):
+            return args[i + 1]
+        if arg.startswith("-o") and len(arg) > 2:
+            return arg[2:]
+    return args[-1]
+
+def main() -> int:
+    if len(sys.argv) < 3:
+        print("usage: python -m nxtool.utils.timing <log> <command...>", file=sys.stderr)
+        return 2
+
+    log, args = sys.argv[1], sys.argv[2:]
+    start: int = time.time_ns() // 10**6
+    ret: int = subprocess.call(args)
+    end: int = time.time_ns() // 10**6
+
+    output: str = os.path.abspath(_output(args))
+    cmdhash: str = f"{zlib.crc32(' '.join(args).encode()):08x}"
+    # A single small O_APPEND write keeps lines from parallel jobs intact
+    fd: int = os.open(log, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, f"{start}\t{end}\t0\t{output}\t{cmdhash}\n".encode())
+    finally:
+        os.close(fd)
+    return ret
+
+if __name__ == "__main__":
+    sys.exit(main())
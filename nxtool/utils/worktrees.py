@@ -0,0 +1,162 @@
+"""
+Pinned nuttx and apps revisions.
+
+A project pinning a revision with the "nuttx_rev" or "apps_rev" option
+builds from git worktrees of the workspace checkouts instead of the checkouts
+themselves. Worktrees share the objects of the checkout, adding one takes
+seconds where a clone takes minutes, and moving it to another revision only
+rewrites the files that differ.
+
+Every set of pinned revisions has its own directory in .nxtool/worktrees
+holding a nuttx and an apps worktree side by side, the way the build expects
+them. The repository left unpinned follows the HEAD of its checkout, like
+pinned branches follow the branch. Projects pinning the same revisions share
+the worktrees.
+
+Worktrees are added by the first configure or build of a project, not when
+the option is set, and removed by `prune` once no project pins their
+revisions anymore.
+"""
+
+import hashlib
+import json
+import shutil
+
+from collections.abc import Iterable
+from pathlib import Path
+
+from nxtool.config.configuration import PathsStore, ProjectInstance, ProjectOpts
+from nxtool.utils.fs import file_lock
+from nxtool.utils.git import GitWrapper, head, resolve
+from nxtool.utils.process import ProcessRunner
+
+# Project option pinning the revision of every repository
+OPTS: dict[str, str] = {"nuttx": "nuttx_rev", "apps": "apps_rev"}
+
+# Touched by every sync, its mtime is the last use of the worktrees
+STAMP: str = ".nxtool_worktree"
+
+def pins(opts: ProjectOpts) -> dict[str, str]:
+    """
+    Revisions pinned by project options, by repository.
+    """
+    return {
+        repo: opts[opt] for repo, opt in OPTS.items()  # type: ignore[literal-required]
+        if opts.get(opt)
+    }
+
+class Worktree():
+    """
+    nuttx and apps worktrees of a set of pinned revisions.
+
+    Attributes:
+        pins (dict[str, str]): Pinned revision by repository.
+        root (Path): Directory holding the nuttx and apps worktrees.
+    """
+    def __init__(self, revisions: dict[str, str]):
+        """
+        :param revisions: Pinned revision by repository, see `pins`.
+        :type revisions: dict[str, str]
+        """
+        self.pins: dict[str, str] = revisions
+        key: str = hashlib.sha1(json.dumps(revisions, sort_keys=True).encode()).hexdigest()
+        self.root: Path = PathsStore.nxtool_worktrees_dir / key[:12]
+
+    @classmethod
+    def of(cls, inst: ProjectInstance) -> "Worktree | None":
+        """
+        Worktrees a project builds from, `None` if it pins no revision.
+        """
+        revisions: dict[str, str] = pins(inst.opts)
+        return cls(revisions) if revisions else None
+
+    @property
+    def nuttx(self) -> Path:
+        """
+        The nuttx worktree, source of the build.
+        """
+        return self.root / "nuttx"
+
+    @staticmethod
+    def checkout(repo: str) -> Path:
+        """
+        Workspace checkout of a repository, the worktrees are added to it.
+        """
+        return PathsStore.nxtool_root / repo
+
+    def commit(self, repo: str, runner: ProcessRunner) -> str | None:
+        """
+        Commit a worktree has to be at, revisions missing from the checkout
+        are fetched first.
+        """
+        src: Path = self.checkout(repo)
+        rev: str | None = self.pins.get(repo)
+        if rev is None:
+            return head(src)
+        commit: str | None = resolve(src, rev)
+        if commit is None and GitWrapper(f"{src}", runner).fetch(src) == 0:
+            commit = resolve(src, rev)
+        return commit
+
+    def sync(self, runner: ProcessRunner) -> bool:
+        """
+        Add the worktrees if needed and bring them to their revisions.
+
+        :param runner: Runs git.
+        :type runner: ProcessRunner
+        :return: `True` on success.
+        :rtype: bool
+        """
+        self.root.mkdir(parents=True, exist_ok=True)
+        with file_lock(self.root):
+            for repo in OPTS:
+                src: Path = self.checkout(repo)
+                dest: Path = self.root / repo
+                commit: str | None = self.commit(repo, runner)
+                if commit is None:
+                    print(f"{runner.prefix}unknown {repo} revision {self.pins.get(repo, 'HEAD')}")
+                    return False
+
+                git: GitWrapper = GitWrapper(f"{src}", runner)
+                if not (dest / ".git").exists():
+                    # Left behind by a removed worktree
+                    git.worktree_prune(src)
+                    if git.worktree_add(src, dest, commit) != 0:
+                        return False
+                elif head(dest) != commit and git.checkout(dest, commit) != 0:
+                    return False
+            (self.root / STAMP).touch()
+        return True
+
+def prune(used: Iterable[Worktree]) -> list[Path]:
+    """
+    Remove the worktrees of revisions no project pins anymore.
+
+    :param used: Worktrees of the workspace projects, kept.
+    :type used: Iterable[Worktree]
+    :return: The removed worktree directories.
+    :rtype: list[Path]
+    """
+    keep: set[Path] = {w.root for w in used}
+    root: Path = PathsStore.nxtool_worktrees_dir
+    if not root.is_dir():
+        return []
+
+    removed: list[Path] = []
+    for path in sorted(root.iterdir()):
+        if not path.is_dir() or path in keep:
+            continue
+        with file_lock(path):
+            for repo in OPTS:
+                if (path / repo / ".git").exists():
+                    GitWrapper(f"{Worktree.checkout(repo)}").worktree_remove(
+                        Worktree.checkout(repo), path / repo
+                    )
+            shutil.rmtree(path, ignore_errors=True)
+        path.with_name(f"{path.name}.lock").unlink(missing_ok=True)
+        removed.append(path)
+
+    if len(removed) > 0:
+        for repo in OPTS:
+            GitWrapper(f"{Worktree.checkout(repo)}").worktree_prune(Worktree.checkout(repo))
+    return removed
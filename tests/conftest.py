@@ -0,0 +1,50 @@
+"""
+Shared fixtures: synthetic workspaces (see benchmarks/synthetic.py) and a
+helper running nxtool in a separate process, like users and CI do.
+"""
+import os
+import subprocess
+import sys
+
+from pathlib import Path
+
+import pytest
+
+REPO: Path = Path(__file__).resolve().parents[1]
+sys.path.insert(0, f"{REPO}")
+sys.path.insert(0, f"{REPO / 'benchmarks'}")
+
+from synthetic import TreeSize, generate  # noqa: E402  pylint: disable=wrong-import-position
+
+# Enough boards and configurations to shard and switch between, nothing more
+SIZE: TreeSize = TreeSize(boards=6, configs=3, symbols=40, tools=2, projects=1)
+
+def nxtool_env(root: Path, stand_ins: bool = True) -> dict[str, str]:
+    """
+    Environment running nxtool from this checkout in the workspace `root`,
+    with the cmake, make and git stand-ins of the workspace first in PATH.
+    """
+    env: dict[str, str] = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [f"{REPO}", env.get("PYTHONPATH")]))
+    if stand_ins is True:
+        env["PATH"] = os.pathsep.join([f"{root / 'bin'}", env.get("PATH", "")])
+    return env
+
+def nxtool(root: Path, *args: str, stand_ins: bool = True) -> subprocess.CompletedProcess:
+    """
+    Run nxtool in the workspace `root` and wait for it.
+    """
+    return subprocess.run(
+        [sys.executable, "-m", "nxtool", *args],
+        cwd=root, env=nxtool_env(root, stand_ins), check=False,
+        stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True
+    )
+
+@pytest.fixture
+def workspace(tmp_path: Path) -> Path:
+    """
+    A small synthetic workspace with a single project "p0".
+    """
+    root: Path = tmp_path / "ws"
+    generate(root, SIZE)
+    return root
@@ -0,0 +1,43 @@
+"""
+Artifact cache storage and eviction, see `nxtool.utils.artifacts`.
+"""
+import os
+
+from pathlib import Path
+
+import pytest
+
+from nxtool.config.paths import PathsStore
+from nxtool.utils.artifacts import ArtifactCache
+
+@pytest.fixture
+def cache(workspace: Path, monkeypatch: pytest.MonkeyPatch) -> ArtifactCache:
+    monkeypatch.chdir(workspace)
+    PathsStore.setup()
+    # Room for the shared map and two firmwares
+    return ArtifactCache(quota=3 * 1000)
+
+def outputs(root: Path, firmware: bytes) -> Path:
+    root.mkdir(parents=True)
+    (root / "nuttx").write_bytes(firmware)
+    (root / "nuttx.map").write_bytes(b"m" * 1000)
+    return root
+
+def test_least_recently_used_evicted(cache: ArtifactCache, tmp_path: Path):
+    for i, key in enumerate(("k0", "k1", "k2")):
+        assert cache.store(key, outputs(tmp_path / key, bytes([i]) * 1000))
+        # Distinct last use times, oldest first
+        os.utime(cache.entries / f"{key}.json", (i, i))
+
+    dest: Path = tmp_path / "dest"
+    dest.mkdir()
+    assert cache.restore("k0", dest) is False
+    assert cache.restore("k2", dest) is True
+    assert (dest / "nuttx").read_bytes() == bytes([2]) * 1000
+    # The map shared by every entry stays, the firmware of k0 is gone
+    assert cache.usage() == (2, 3 * 1000)
+
+def test_shared_objects_count_once(cache: ArtifactCache, tmp_path: Path):
+    for key in ("k0", "k1", "k2", "k3"):
+        assert cache.store(key, outputs(tmp_path / key, b"f" * 1000))
+    assert cache.usage() == (4, 2 * 1000)
@@ -0,0 +1,66 @@
+"""
+Boards index invalidation, see `BoardsStore.load`.
+"""
+import os
+import shutil
+
+from pathlib import Path
+
+import pytest
+
+from nxtool.config.configuration import BoardsStore
+from nxtool.config.paths import PathsStore
+
+@pytest.fixture
+def nuttx(workspace: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    monkeypatch.chdir(workspace)
+    PathsStore.setup()
+    return workspace / "nuttx"
+
+def scans(monkeypatch: pytest.MonkeyPatch) -> list[Path]:
+    scanned: list[Path] = []
+    scan = BoardsStore._scan_configs_dir  # pylint: disable=protected-access
+
+    def counting(path: Path) -> list[str]:
+        scanned.append(path)
+        return scan(path)
+    monkeypatch.setattr(BoardsStore, "_scan_configs_dir", staticmethod(counting))
+    return scanned
+
+def touch_later(path: Path) -> None:
+    # Coarse filesystem timestamps must not hide the change
+    mtime: int = path.stat().st_mtime_ns + 10**9
+    os.utime(path, ns=(mtime, mtime))
+
+def test_index_reused_without_git(nuttx: Path, monkeypatch: pytest.MonkeyPatch):
+    shutil.rmtree(nuttx / ".git")
+    BoardsStore().load()
+    scanned: list[Path] = scans(monkeypatch)
+    written: int = PathsStore.nxtool_boards_index.stat().st_mtime_ns
+
+    store: BoardsStore = BoardsStore()
+    store.load()
+    assert scanned == []
+    assert PathsStore.nxtool_boards_index.stat().st_mtime_ns == written
+    assert store.search("board0:nsh") is not None
+
+def test_defconfig_added_and_removed_in_place(nuttx: Path):
+    configs: Path = nuttx / "boards" / "arm" / "chip0" / "board0" / "configs"
+    (configs / "late").mkdir()
+    assert BoardsStore().search("board0:late") is None
+
+    # Only the mtime of the configuration directory changes
+    (configs / "late" / "defconfig").write_text('CONFIG_ARCH="arm"\n', encoding='utf-8')
+    touch_later(configs / "late")
+    assert BoardsStore().search("board0:late") is not None
+
+    (configs / "nsh" / "defconfig").unlink()
+    touch_later(configs / "nsh")
+    assert BoardsStore().search("board0:nsh") is None
+
+def test_new_head_rescans(nuttx: Path, monkeypatch: pytest.MonkeyPatch):
+    BoardsStore().load()
+    scanned: list[Path] = scans(monkeypatch)
+    (nuttx / ".git" / "HEAD").write_text("f" * 40 + "\n", encoding='utf-8')
+    BoardsStore().load()
+    assert len(scanned) > 0
@@ -0,0 +1,59 @@
+"""
+Include graphs of make projects, see `ProjectIndex.includes`.
+"""
+from pathlib import Path
+
+import pytest
+
+from nxtool.config.configuration import ProjectInstance
+from nxtool.config.paths import PathsStore
+from nxtool.utils import compdb
+from nxtool.utils.compdb import ProjectIndex
+
+@pytest.fixture
+def index(workspace: Path, monkeypatch: pytest.MonkeyPatch) -> ProjectIndex:
+    monkeypatch.chdir(workspace)
+    PathsStore.setup()
+    return ProjectIndex(ProjectInstance("mk", "board0:nsh", {"generator": "make"}))
+
+def depfile(path: Path, unit: str, *headers: str) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(f"{path.with_suffix('.o').name}: {unit} {' '.join(headers)}\n", encoding='utf-8')
+
+def walks(monkeypatch: pytest.MonkeyPatch) -> list[Path]:
+    walked: list[Path] = []
+    find = compdb.depfiles
+
+    def counting(root: Path):
+        walked.append(root)
+        return find(root)
+    monkeypatch.setattr(compdb, "depfiles", counting)
+    return walked
+
+def test_apps_dependencies_of_in_tree_builds(workspace: Path, index: ProjectIndex):
+    depfile(workspace / "nuttx" / "sched" / "init.d", "init.c", "sched.h")
+    depfile(workspace / "apps" / "system" / "nsh" / "nsh.d", "nsh.c", "sched.h", "nsh.h")
+
+    graph = index.includes()
+    assert graph is not None
+    nsh: str = f"{workspace / 'apps' / 'system' / 'nsh'}"
+    assert [graph["units"][u] for u in graph["headers"][f"{nsh}/nsh.h"]] == [f"{nsh}/nsh.c"]
+
+def test_queries_reuse_the_depfiles(workspace: Path, index: ProjectIndex,
+                                    monkeypatch: pytest.MonkeyPatch):
+    nsh: Path = workspace / "apps" / "system" / "nsh" / "nsh.d"
+    depfile(nsh, "nsh.c", "nsh.h")
+    index.includes()
+    walked: list[Path] = walks(monkeypatch)
+
+    # A rebuilt depfile is still noticed without walking the trees
+    depfile(nsh, "nsh.c", "nsh.h", "readline.h")
+    graph = index.includes(refresh=False)
+    assert graph is not None and f"{nsh.parent / 'readline.h'}" in graph["headers"]
+    assert not walked
+
+    # New depfiles are found after a build
+    depfile(workspace / "apps" / "system" / "cu" / "cu.d", "cu.c", "termios.h")
+    graph = index.includes()
+    assert graph is not None and f"{workspace / 'apps/system/cu/termios.h'}" in graph["headers"]
+    assert walked == index.roots
@@ -0,0 +1,212 @@
+"""
+Change impact analysis over a small boards, arch and drivers tree, see
+`nxtool.utils.impact`. Whenever the build files cannot tell, the analysis
+must keep the wider set of configurations, never a smaller one.
+"""
+import subprocess
+
+from pathlib import Path
+
+import pytest
+
+from nxtool.utils.impact import ImpactAnalysis, _cmake_gate, _make_gate, guards
+
+DEFCONFIGS: dict[str, str] = {
+    "b1:nsh": "boards/arm/stm32/b1/configs/nsh/defconfig",
+    "b1:sensors": "boards/arm/stm32/b1/configs/sensors/defconfig",
+    "b2:nsh": "boards/arm/nrf52/b2/configs/nsh/defconfig",
+    "b3:nsh": "boards/risc-v/esp32c3/b3/configs/nsh/defconfig",
+}
+ALL: frozenset[str] = frozenset(DEFCONFIGS)
+ENABLED: dict[str, frozenset[str]] = {
+    "SENSORS": frozenset({"b1:sensors", "b3:nsh"}),
+    "BMP180": frozenset({"b1:sensors"}),
+    "LPS25H": frozenset({"b3:nsh"}),
+    "NET": frozenset({"b2:nsh", "b3:nsh"}),
+    "ENC28J60": frozenset({"b2:nsh"}),
+    "DM90x0": frozenset({"b3:nsh"}),
+}
+SENSORS: frozenset[str] = ENABLED["SENSORS"]
+NET: frozenset[str] = ENABLED["NET"]
+
+FILES: dict[str, str] = {
+    "Kconfig": "",
+    "drivers/Makefile": "include sensors/Make.defs\n",
+    "drivers/CMakeLists.txt": "add_subdirectory(sensors)\nadd_subdirectory(net)\n",
+    "drivers/sensors/Make.defs": """\
+ifeq ($(CONFIG_SENSORS),y)
+
+ifeq ($(CONFIG_BMP180),y)
+  CSRCS += bmp180.c
+endif
+
+ifneq ($(CONFIG_LPS25H),y)
+  CSRCS += lps25h_stub.c
+else ifeq ($(CONFIG_BMP180),y)
+  CSRCS += lps25h_bmp180.c
+endif
+
+ifneq ($(CONFIG_LPS25H),)
+  CSRCS += lps25h.c
+endif
+
+ifeq ($(CONFIG_BMP180),n)
+  CSRCS += bmp180_none.c
+endif
+
+CSRCS += sensor.c
+
+DEPPATH += --dep-path sensors
+VPATH += :sensors
+endif
+""",
+    "drivers/net/CMakeLists.txt": """\
+if(CONFIG_NET)
+  set(SRCS netdev.c)
+  if(CONFIG_ENC28J60)
+    list(APPEND SRCS enc28j60.c)
+  elseif(CONFIG_DM90x0)
+    list(APPEND SRCS dm90x0.c)
+  endif()
+  if(NOT CONFIG_ENC28J60)
+    list(APPEND SRCS loopback.c)
+  endif()
+  target_sources(drivers PRIVATE ${SRCS})
+endif()
+""",
+    "arch/arm/src/stm32/Make.defs": "CHIP_CSRCS += stm32_start.c\n",
+}
+
+def git(root: Path, *args: str) -> None:
+    subprocess.run(
+        ["git", "-C", f"{root}", "-c", "user.name=nxtool", "-c", "user.email=nxtool@localhost",
+         *args],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True
+    )
+
+@pytest.fixture
+def nuttx(tmp_path: Path) -> Path:
+    """
+    A nuttx checkout with four configurations, every change compared with HEAD.
+    """
+    root: Path = tmp_path / "nuttx"
+    for label, defconfig in DEFCONFIGS.items():
+        chip: str = Path(defconfig).parts[2]
+        path: Path = root / defconfig
+        path.parent.mkdir(parents=True)
+        path.write_text(f'CONFIG_ARCH_CHIP="{chip}"\n', encoding='utf-8')
+    for name, text in FILES.items():
+        (root / name).parent.mkdir(parents=True, exist_ok=True)
+        (root / name).write_text(text, encoding='utf-8')
+    git(root, "init", "-q")
+    git(root, "add", ".")
+    git(root, "commit", "-q", "-m", "base")
+    return root
+
+def impact(root: Path, path: str, status: str = "M") -> frozenset[str]:
+    analysis: ImpactAnalysis = ImpactAnalysis(
+        DEFCONFIGS.items(), {"nuttx": root}, lambda name: ENABLED.get(name, frozenset())
+    )
+    return analysis.impact("nuttx", status, path, "HEAD").configs
+
+def edit(root: Path, name: str, old: str, new: str) -> None:
+    path: Path = root / name
+    text: str = path.read_text(encoding='utf-8')
+    assert old in text
+    path.write_text(text.replace(old, new, 1), encoding='utf-8')
+
+@pytest.mark.parametrize("kind, args, gate", [
+    ("ifeq", "($(CONFIG_X),y)", {"X"}),
+    ("ifneq", "($(CONFIG_X),)", {"X"}),
+    ("ifdef", "CONFIG_X", {"X"}),
+    ("ifneq", "($(CONFIG_X),y)", None),
+    ("ifeq", "($(CONFIG_X),n)", None),
+    ("ifeq", "($(CONFIG_X),)", None),
+    ("ifndef", "CONFIG_X", None),
+    ("ifeq", "($(CONFIG_X),$(CONFIG_Y))", None),
+])
+def test_make_gate(kind: str, args: str, gate: set[str] | None):
+    assert _make_gate(kind, args) == (frozenset(gate) if gate is not None else None)
+
+@pytest.mark.parametrize("condition, gate", [
+    ("CONFIG_X)", {"X"}),
+    ("CONFIG_X OR CONFIG_Y)", {"X", "Y"}),
+    ("NOT CONFIG_X)", None),
+    ('CONFIG_X STREQUAL "")', None),
+    ("WIN32)", None),
+])
+def test_cmake_gate(condition: str, gate: set[str] | None):
+    assert _cmake_gate(condition) == (frozenset(gate) if gate is not None else None)
+
+def test_guards_of_else_branches():
+    x, y = frozenset({"X"}), frozenset({"Y"})
+    make: list = guards(
+        "ifeq ($(CONFIG_X),y)\n  A\nelse ifeq ($(CONFIG_Y),y)\n  B\nelse\n  C\nendif\nD\n"
+    )
+    assert make == [(), (x,), (), (), (), (), (), ()]
+    cmake: list = guards(
+        "if(CONFIG_Y)\nif(CONFIG_X)\n  A\nelseif(CONFIG_X)\n  B\nendif()\nendif()\n"
+    )
+    assert cmake == [(), (y,), (y, x), (y,), (y,), (y,), ()]
+
+@pytest.mark.parametrize("source, configs", [
+    # Guarded by positive conditions, narrowed
+    ("drivers/sensors/bmp180.c", ENABLED["BMP180"]),
+    ("drivers/sensors/lps25h.c", ENABLED["LPS25H"]),
+    ("drivers/net/enc28j60.c", ENABLED["ENC28J60"]),
+    # Negated conditions and else branches only keep the enclosing block
+    ("drivers/sensors/lps25h_stub.c", SENSORS),
+    ("drivers/sensors/bmp180_none.c", SENSORS),
+    ("drivers/sensors/lps25h_bmp180.c", SENSORS),
+    ("drivers/net/dm90x0.c", NET),
+    ("drivers/net/loopback.c", NET),
+    # Mentioned outside of any block of the directory
+    ("drivers/sensors/sensor.c", SENSORS),
+])
+def test_guarded_sources(nuttx: Path, source: str, configs: frozenset[str]):
+    assert impact(nuttx, source) == configs
+
+def test_unmentioned_sources(nuttx: Path):
+    stm32: frozenset[str] = frozenset({"b1:nsh", "b1:sensors"})
+    arm: frozenset[str] = stm32 | {"b2:nsh"}
+    assert impact(nuttx, "arch/arm/src/stm32/stm32_start.c") == stm32
+    # Possibly built from another chip of the arch
+    assert impact(nuttx, "arch/arm/src/stm32/stm32_extra.c") == arm
+    # Possibly built from anywhere
+    assert impact(nuttx, "drivers/sensors/orphan.c") == ALL
+
+def test_private_headers(nuttx: Path):
+    # Included by any source of its directory
+    assert impact(nuttx, "drivers/sensors/bmp180.h") == SENSORS
+    assert impact(nuttx, "drivers/net/netdev.h") == NET
+    assert impact(nuttx, "arch/arm/src/stm32/stm32.h") == frozenset({"b1:nsh", "b1:sensors"})
+    # Public headers are included from anywhere
+    assert impact(nuttx, "include/nuttx/sensors/bmp180.h") == ALL
+
+def test_changed_build_file_lines(nuttx: Path):
+    sensors: str = "drivers/sensors/Make.defs"
+
+    edit(nuttx, sensors, "CSRCS += bmp180.c\n", "CSRCS += bmp180.c bmp180_i2c.c\n")
+    assert impact(nuttx, sensors) == ENABLED["BMP180"]
+
+    # In a negated block and in an else branch
+    git(nuttx, "checkout", "-q", "--", sensors)
+    edit(nuttx, sensors, "lps25h_stub.c", "lps25h_dummy.c")
+    assert impact(nuttx, sensors) == SENSORS
+    git(nuttx, "checkout", "-q", "--", sensors)
+    edit(nuttx, sensors, "lps25h_bmp180.c", "lps25h_bmp280.c")
+    assert impact(nuttx, sensors) == SENSORS
+
+    # The conditional wrapping the whole file changes which configurations build it
+    git(nuttx, "checkout", "-q", "--", sensors)
+    edit(nuttx, sensors, "ifeq ($(CONFIG_SENSORS),y)", "ifeq ($(CONFIG_SENSORS_X),y)")
+    assert impact(nuttx, sensors) == ALL
+
+    # Removed lines count on the old side
+    git(nuttx, "checkout", "-q", "--", sensors)
+    edit(nuttx, sensors, "ifneq ($(CONFIG_LPS25H),)\n  CSRCS += lps25h.c\nendif\n", "")
+    assert impact(nuttx, sensors) == SENSORS
+
+    net: str = "drivers/net/CMakeLists.txt"
+    edit(nuttx, net, "elseif(CONFIG_DM90x0)", "elseif(CONFIG_DM9000)")
+    assert impact(nuttx, net) == NET
@@ -0,0 +1,77 @@
+"""
+Sharded matrix builds, every shard run as its own process like on CI machines.
+"""
+import json
+import subprocess
+import sys
+
+from pathlib import Path
+
+from conftest import nxtool, nxtool_env
+
+SHARDS: int = 3
+
+def records(path: Path) -> list[dict]:
+    with open(path, 'r', encoding='utf-8') as file:
+        return [json.loads(line) for line in file if line.strip()]
+
+def run_shards(root: Path, count: int, *args: str) -> list[set[str]]:
+    """
+    Build all targets split in `count` shards running at the same time.
+
+    :return: Targets built by every shard.
+    """
+    procs: list[subprocess.Popen] = [
+        subprocess.Popen(
+            [sys.executable, "-m", "nxtool", "build", "matrix", "*", "--shard", f"{i}/{count}",
+             *args],
+            cwd=root, env=nxtool_env(root),
+            stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True
+        )
+        for i in range(1, count + 1)
+    ]
+    for proc in procs:
+        out, _ = proc.communicate(timeout=300)
+        assert proc.returncode == 0, out
+
+    matrix: Path = root / ".nxtool" / "build" / "matrix"
+    return [
+        {r["target"] for r in records(matrix / f"results-{i}-of-{count}.jsonl")}
+        for i in range(1, count + 1)
+    ]
+
+def all_targets(root: Path) -> set[str]:
+    proc = nxtool(root, "info", "boards", "--format", "jsonl")
+    assert proc.returncode == 0, proc.stdout
+    rows: list[dict] = [json.loads(line) for line in proc.stdout.splitlines()]
+    return {f"{r['board']}:{r['config']}" for r in rows}
+
+def test_shards_partition_targets(workspace: Path):
+    shards: list[set[str]] = run_shards(workspace, SHARDS)
+
+    assert set().union(*shards) == all_targets(workspace)
+    assert sum(len(s) for s in shards) == len(all_targets(workspace))
+    assert all(len(s) > 0 for s in shards)
+
+    matrix: Path = workspace / ".nxtool" / "build" / "matrix"
+    proc = nxtool(workspace, "build", "merge", *(
+        f"{matrix / f'results-{i}-of-{SHARDS}.jsonl'}" for i in range(1, SHARDS + 1)
+    ))
+    assert proc.returncode == 0, proc.stdout
+    assert {r["target"] for r in records(matrix / "results.jsonl")} == all_targets(workspace)
+
+def test_cache_hits_keep_build_durations(workspace: Path):
+    matrix: Path = workspace / ".nxtool" / "build" / "matrix"
+    assert nxtool(workspace, "build", "matrix", "*").returncode == 0
+    built: dict[str, float] = {r["target"]: r["duration"] for r in records(matrix / "results.jsonl")}
+
+    # Same sources and configurations, every output comes from the artifact cache
+    assert nxtool(workspace, "build", "matrix", "*").returncode == 0
+    for record in records(matrix / "results.jsonl"):
+        assert record["cached"] is True
+        assert record["built_duration"] == built[record["target"]]
+
+    # Balanced with the history of the cached run, still a partition
+    shards: list[set[str]] = run_shards(workspace, SHARDS)
+    assert set().union(*shards) == all_targets(workspace)
+    assert sum(len(s) for s in shards) == len(all_targets(workspace))
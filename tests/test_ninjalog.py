@@ -0,0 +1,41 @@
+"""
+Timing log parsing, see `nxtool.utils.ninjalog`.
+"""
+from pathlib import Path
+
+from nxtool.utils.ninjalog import NINJA_LOG, TIMING_LOG, parse
+
+def write_log(path: Path, lines: list[tuple[int, int, str, str]]) -> Path:
+    path.write_text("# ninja log v5\n" + "".join(
+        f"{start}\t{end}\t0\t{output}\t{cmdhash}\n" for start, end, output, cmdhash in lines
+    ), encoding='utf-8')
+    return path
+
+def test_make_log_lines_out_of_order(tmp_path: Path):
+    # Parallel make jobs append their line when they finish, /b.o started
+    # first but its line landed after the one of /a.o
+    log: Path = write_log(tmp_path / TIMING_LOG, [
+        (1000, 1500, "/a.o", "1"),
+        (1000, 1400, "/b.o", "2"),
+        (1500, 1700, "/c.o", "3"),
+        (1700, 2000, "/nuttx", "4"),
+    ])
+    assert [s.name for s in parse(log)] == ["/b.o", "/a.o", "/c.o", "/nuttx"]
+
+def test_ninja_log_keeps_last_build(tmp_path: Path):
+    log: Path = write_log(tmp_path / NINJA_LOG, [
+        (0, 500, "a.o", "1"),
+        (500, 900, "nuttx", "2"),
+        # ninja restarts its clock on every run
+        (0, 300, "a.o", "1"),
+        (300, 600, "nuttx", "2"),
+    ])
+    assert [(s.name, s.duration) for s in parse(log)] == [("a.o", 300), ("nuttx", 300)]
+
+def test_outputs_of_one_command_merged(tmp_path: Path):
+    log: Path = write_log(tmp_path / NINJA_LOG, [
+        (0, 500, "nuttx", "1"),
+        (0, 500, "nuttx.map", "1"),
+    ])
+    steps = parse(log)
+    assert len(steps) == 1 and steps[0].outputs == ["nuttx", "nuttx.map"]
@@ -0,0 +1,63 @@
+"""
+ProjectStore transactions under concurrent writers, see `ProjectStore.transaction`.
+"""
+import subprocess
+import sys
+import tomllib
+
+from pathlib import Path
+
+from conftest import nxtool, nxtool_env
+
+WORKERS: int = 32
+ROUNDS: int = 5
+
+# Every worker adds its own project, then repeatedly adds, switches to and
+# removes a temporary one. Only the worker itself switches to its projects,
+# so its temporary project is never current when it removes it.
+WORKER: str = """
+import sys
+from nxtool.config.paths import PathsStore
+PathsStore.setup()
+from nxtool.cmd.project import ProjectCmd
+
+i, rounds = sys.argv[1], int(sys.argv[2])
+cmd = ProjectCmd()
+assert cmd.add(f"w{i}", "board0:nsh"), "add"
+for _ in range(rounds):
+    assert cmd.add(f"t{i}", "board1:cfg1"), "add temporary"
+    assert cmd.set_project(f"t{i}"), "switch to temporary"
+    assert cmd.set_project(f"w{i}"), "switch back"
+    assert cmd.remove(f"t{i}"), "remove temporary"
+"""
+
+def test_concurrent_writers_keep_every_project(workspace: Path):
+    procs: list[subprocess.Popen] = [
+        subprocess.Popen(
+            [sys.executable, "-c", WORKER, f"{i}", f"{ROUNDS}"],
+            cwd=workspace, env=nxtool_env(workspace),
+            stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True
+        )
+        for i in range(WORKERS)
+    ]
+    for proc in procs:
+        out, _ = proc.communicate(timeout=300)
+        assert proc.returncode == 0, out
+
+    with open(workspace / ".nxtool" / "projects.toml", 'rb') as file:
+        data: dict = tomllib.load(file)
+    names: list[str] = [p["name"] for p in data["projects"]]
+    assert sorted(names) == sorted(["p0"] + [f"w{i}" for i in range(WORKERS)])
+    assert data["current"]["name"] in names
+
+def test_cli_add_switch_remove(workspace: Path):
+    assert nxtool(workspace, "project", "add", "p1", "board2:nsh", "--change").returncode == 0
+    assert "name='p1'" in nxtool(workspace, "info", "project").stdout
+
+    # The current project cannot be removed
+    nxtool(workspace, "project", "rm", "p1")
+    assert "name='p1'" in nxtool(workspace, "info", "projects").stdout
+
+    nxtool(workspace, "project", "switch", "p0")
+    nxtool(workspace, "project", "rm", "p1")
+    assert "name='p1'" not in nxtool(workspace, "info", "projects").stdout
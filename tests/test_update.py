@@ -0,0 +1,85 @@
+"""
+workspace update against local bare repositories standing in for the remotes.
+"""
+import subprocess
+
+from pathlib import Path
+
+import pytest
+
+from conftest import REPO, nxtool
+
+def git(*args: str) -> str:
+    return subprocess.run(
+        ["git", "-c", "user.name=nxtool", "-c", "user.email=nxtool@localhost", *args],
+        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, check=True, text=True
+    ).stdout.strip()
+
+def commit(work: Path, name: str) -> str:
+    (work / name).write_text(name, encoding='utf-8')
+    git("-C", f"{work}", "add", name)
+    git("-C", f"{work}", "commit", "-q", "-m", name)
+    git("-C", f"{work}", "push", "-q", "origin", "HEAD")
+    return git("-C", f"{work}", "rev-parse", "HEAD")
+
+@pytest.fixture
+def remotes(tmp_path: Path) -> dict[str, Path]:
+    """
+    Bare "nuttx" and "apps" remotes, each with a work clone pushing to it.
+    """
+    found: dict[str, Path] = {}
+    for name in ("nuttx", "apps"):
+        bare: Path = tmp_path / "remotes" / f"{name}.git"
+        git("init", "-q", "--bare", "-b", "master", f"{bare}")
+        work: Path = tmp_path / "work" / name
+        git("clone", "-q", f"{bare}", f"{work}")
+        for i in range(3):
+            commit(work, f"{name}{i}")
+        found[name] = bare
+    return found
+
+def make_workspace(root: Path, remotes: dict[str, str]) -> Path:
+    nxdir: Path = root / ".nxtool"
+    nxdir.mkdir(parents=True)
+    config: str = (REPO / "nxtool" / "data" / "config.toml").read_text(encoding='utf-8')
+    config = config.replace("https://github.com/apache/nuttx-apps", remotes["apps"])
+    config = config.replace("https://github.com/apache/nuttx", remotes["nuttx"])
+    (nxdir / "config.toml").write_text(config, encoding='utf-8')
+    (nxdir / "projects.toml").write_text("", encoding='utf-8')
+    return root
+
+def test_clone_then_fetch(tmp_path: Path, remotes: dict[str, Path]):
+    root: Path = make_workspace(tmp_path / "ws", {k: f"{v}" for k, v in remotes.items()})
+
+    proc = nxtool(root, "workspace", "update", stand_ins=False)
+    assert proc.returncode == 0, proc.stdout
+    for name in ("nuttx", "apps"):
+        assert (root / name / f"{name}2").is_file()
+
+    # New commits only reach the existing checkouts through a fetch
+    new: str = commit(tmp_path / "work" / "nuttx", "nuttx3")
+    proc = nxtool(root, "workspace", "update", stand_ins=False)
+    assert proc.returncode == 0, proc.stdout
+    assert "fetch" in proc.stdout
+    assert git("-C", f"{root / 'nuttx'}", "rev-parse", "origin/master") == new
+
+def test_shallow_mirror_clone(tmp_path: Path, remotes: dict[str, Path]):
+    # git ignores --depth for plain paths, file:// urls honour it
+    root: Path = make_workspace(tmp_path / "ws", {k: v.as_uri() for k, v in remotes.items()})
+
+    proc = nxtool(root, "workspace", "update", "--depth", "1", "--mirror", stand_ins=False)
+    assert proc.returncode == 0, proc.stdout
+    for name in ("nuttx", "apps"):
+        assert (root / ".nxtool" / "git" / f"{name}.git").is_dir()
+        assert git("-C", f"{root / name}", "rev-list", "--count", "HEAD") == "1"
+
+def test_failed_remote_fails_update(tmp_path: Path, remotes: dict[str, Path]):
+    root: Path = make_workspace(tmp_path / "ws", {
+        "nuttx": f"{remotes['nuttx']}", "apps": f"{tmp_path / 'remotes' / 'missing.git'}"
+    })
+
+    proc = nxtool(root, "workspace", "update", stand_ins=False)
+    assert proc.returncode != 0
+    # The other remote is still updated
+    assert (root / "nuttx" / "nuttx2").is_file()
+    assert "FAIL" in proc.stdout